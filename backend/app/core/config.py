@@ -3,23 +3,161 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # Mongo
     MONGO_URI: str
     MONGO_DB: str
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
 
     # AWS
     AWS_ACCESS_KEY_ID: str
     AWS_SECRET_ACCESS_KEY: str
     AWS_REGION: str
     AWS_BUCKET_NAME: str
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO / moto / LocalStack
+    S3_ADDRESSING_STYLE: str = "auto"       # "path" for most S3 stand-ins
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    S3_MAX_CONCURRENCY: int = 8
 
     # LLM settings
     LLM_PROVIDER: str
     LLM_MODEL: str
     LLM_API_KEY: str
+    OLLAMA_BASE_URL: str = "http://localhost:11434"
+    LLM_TIMEOUT_SECONDS: float = 120.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BACKOFF_SECONDS: float = 0.5
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_RATE_LIMITS: dict = {"GEMINI": 5.0, "HUGGINGFACE": 5.0}  # requests/s per provider during /query/batch fan-out; absent = unlimited
+    LLM_RATE_BURST: int = 5
+
+    # Multi-worker deployments: one process writes the local indexes, the others only read them.
+    # Single host only: the BM25 / numpy / faiss indexes, upload spool and writer lock are local
+    # files, so every host would elect its own writer and build diverging indexes
+    INDEX_WRITER: str = "auto"           # auto (first process to lock INDEX_WRITER_LOCK) | true | false
+    INDEX_WRITER_LOCK: str = ".index_writer.lock"
+    INDEX_REFRESH_SECONDS: float = 2.0   # readers pick up the writer's changes this often
+
+    # Ingestion jobs
+    INGEST_WORKERS: int = 2          # concurrent ingestion jobs
+    INGEST_SPOOL_DIR: str = ".ingest_spool"
+    INGEST_POLL_INTERVAL: float = 1.0
+    UPLOAD_READ_CHUNK_SIZE: int = 1024 * 1024
+    INGEST_CHUNK_BATCH_SIZE: int = 256  # chunks per store_embeddings call
+
+    # PDF extraction
+    PDF_EXTRACT_WORKERS: int = 4         # <= 1 disables the process pool
+    PDF_PARALLEL_MIN_PAGES: int = 32     # smaller files take the sequential path
+    PDF_PAGES_PER_TASK: int = 16
+
+    # OCR fallback for scanned pages (needs pytesseract + the tesseract binary; skipped when missing)
+    OCR_ENABLED: bool = True
+    OCR_MIN_CHARS_PER_PAGE: int = 50     # pages with less extracted text ...
+    OCR_MIN_IMAGE_COVERAGE: float = 0.5  # ... and at least this fraction covered by images get OCR'd
+    OCR_DPI: int = 300
+    OCR_LANG: str = "eng"                # tesseract language(s), e.g. "eng+deu"
+    OCR_WORKERS: int = 2                 # concurrent tesseract processes (sequential extraction path)
+    OCR_PAGE_TIMEOUT_SECONDS: float = 60.0
+    OCR_DOCUMENT_BUDGET_SECONDS: float = 600.0  # no new page is OCR'd after this; the rest are skipped
+    OCR_CACHE_ENABLED: bool = True       # recognized text per page content, on disk
+    OCR_CACHE_DIR: str = ".ocr_cache"
+
+    # Chunking: "token" (structure-aware, embedding-tokenizer lengths) or "char" (fixed windows)
+    CHUNKER: str = "token"
+    CHUNK_MAX_TOKENS: int = 200          # capped at EMBED_MAX_SEQ_TOKENS - 2 (special tokens)
+    CHUNK_OVERLAP_TOKENS: int = 32
+    CHUNK_SIZE: int = 500                # "char" chunker only
+    CHUNK_OVERLAP: int = 50
+
+    # Chunk persistence
+    CHUNK_INSERT_BATCH_SIZE: int = 500
+    CHUNK_INSERT_ORDERED: bool = False
+    CHUNKS_PAGE_SIZE: int = 100
+
+    # Vector store
+    VECTOR_BACKEND: str = "chroma"       # chroma | numpy | faiss
+    CHROMA_HOST: Optional[str] = None    # set: shared Chroma server (HttpClient) instead of ./.chromadb
+    CHROMA_PORT: int = 8000
+    CHROMA_SSL: bool = False
+    CHROMA_COLLECTION: str = "rag_collection"
+    HNSW_M: int = 16                     # chroma / faiss hnsw
+    HNSW_EF_CONSTRUCTION: int = 100
+    HNSW_EF_SEARCH: int = 100
+    LOCAL_VECTOR_DIR: str = ".vector_store"
+    NUMPY_VECTOR_DTYPE: str = "float32"  # float32 | float16 | int8
+    NUMPY_RESCORE_FACTOR: int = 4        # float16/int8: rescore top_k * factor in float32 (0 = off)
+    FAISS_INDEX_TYPE: str = "hnsw"       # hnsw | ivf
+    FAISS_IVF_NLIST: int = 256
+    FAISS_IVF_NPROBE: int = 16
+
+    # Hybrid retrieval (BM25 + vectors, reciprocal-rank fusion)
+    HYBRID_SEARCH_ENABLED: bool = True
+    LEXICAL_INDEX_DIR: str = ".lexical_index"
+    HYBRID_CANDIDATES: int = 20          # per retriever, before fusion
+    RRF_K: int = 60
+
+    # Cross-encoder rerank (over-fetch RERANK_CANDIDATES, keep top_k)
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_BACKEND: str = "onnx"         # "onnx" | "torch"
+    RERANK_ONNX_FILE: str = "onnx/model_quint8_avx2.onnx"
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_CANDIDATES: int = 20
+    RERANK_BATCH_SIZE: int = 8
+    RERANK_TIMEOUT_MS: int = 300         # no new batch starts past this
+
+    # Prompt context packing
+    CONTEXT_TOKEN_BUDGET: int = 2000
+    CONTEXT_TOKEN_BUDGETS: dict = {"GEMINI": 6000, "OLLAMA": 2000, "HUGGINGFACE": 1500}
+    CONTEXT_DEDUP_THRESHOLD: float = 0.8  # shingle Jaccard at/above this is a duplicate
+
+    DEFAULT_TOP_K: int = 4
+    MAX_TOP_K: int = 50
+
+    # POST /query/batch
+    BATCH_MAX_QUESTIONS: int = 500
+    BATCH_LLM_CONCURRENCY: int = 8
+
+    # Embeddings
+    EMBED_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    EMBED_BACKEND: str = "sentence-transformers"  # | "onnx" (ONNX Runtime, no torch)
+    EMBED_ONNX_DIR: str = ".onnx_models"
+    EMBED_ONNX_QUANTIZE: bool = True     # dynamic int8 weights
+    EMBED_ONNX_THREADS: int = 0          # 0 = ONNX Runtime default
+    EMBED_MAX_SEQ_TOKENS: int = 256      # model truncates beyond this
+    EMBED_BATCH_TOKENS: int = 8192       # token budget per ingestion batch
+    EMBED_MAX_BATCH_SIZE: int = 64
+    QUERY_BATCH_WINDOW_MS: float = 5.0   # coalescing window for query embeddings
+    QUERY_MAX_BATCH_SIZE: int = 32
+    EMBED_SERVER_URL: Optional[str] = None  # set: embed via app.embedding_server instead of a local model
+    EMBED_SERVER_TIMEOUT_SECONDS: float = 30.0
+
+    # Embedding cache (content-addressed, on disk)
+    EMBED_CACHE_ENABLED: bool = True
+    EMBED_CACHE_PATH: str = ".embedding_cache.sqlite3"
+    EMBED_CACHE_MAX_ENTRIES: int = 500_000
+
+    # In-process LRU caches on the query path: question -> embedding, and
+    # question + scope + top_k -> retrieved chunks (dropped whenever the indexes change)
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_EMBED_CACHE_MAX_ENTRIES: int = 4096
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = 2048
+
+    # LLM answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 1024
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # cosine similarity between questions
+
+    # Observability
+    METRICS_ENABLED: bool = True         # Prometheus histograms on GET /metrics (needs prometheus_client)
+    TRACING_ENABLED: bool = False        # OpenTelemetry spans per stage (needs opentelemetry-api + an SDK/exporter)
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,136 @@
+# container.py
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_stopping = threading.Event()
+
+
+class Lazy:
+    """
+    Thread-safe lazily built singleton.
+
+    Stands in for the object it builds: attribute access and calls are
+    forwarded, so module globals like `documents` or `vector_store` keep
+    working while nothing is constructed at import time.
+    """
+
+    def __init__(self, name, factory, close=None):
+        self._name = name
+        self._factory = factory
+        self._close = close
+        self._lock = threading.Lock()
+        self._instance = None
+        self._error = None
+        self._load_seconds = None
+
+    def instance(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    try:
+                        self._instance = self._factory()
+                    except Exception as e:
+                        self._error = f"{type(e).__name__}: {e}"
+                        raise
+                    self._error = None
+                    self._load_seconds = time.perf_counter() - start
+                    logger.info("Initialized %s in %.2fs", self._name, self._load_seconds)
+                instance = self._instance
+        return instance
+
+    def override(self, instance):
+        """Installs a ready-made object instead of building one (offline stand-ins)."""
+        with self._lock:
+            self._instance = instance
+            self._error = None
+            self._load_seconds = 0.0
+
+    @property
+    def initialized(self):
+        return self._instance is not None
+
+    def status(self):
+        if self._instance is not None:
+            return {"ready": True, "load_seconds": round(self._load_seconds, 3)}
+        return {"ready": False, "error": self._error}
+
+    def close(self):
+        with self._lock:
+            if self._instance is not None and self._close is not None:
+                self._close(self._instance)
+            self._instance = None
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.instance(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self.instance()(*args, **kwargs)
+
+
+def lazy(name, factory, close=None):
+    """Creates and registers a Lazy singleton (see readiness())."""
+    service = Lazy(name, factory, close)
+    _registry[name] = service
+    return service
+
+
+def readiness(names=None):
+    """{name: status} for registered services (all when names is None)."""
+    return {
+        name: service.status()
+        for name, service in _registry.items()
+        if names is None or name in names
+    }
+
+
+def warm_up(names, then=None, backoff=1.0, max_backoff=30.0):
+    """
+    Builds the named services in a daemon thread, then runs `then()` once
+    they are all up. A failure doesn't hold up the other services; the ones
+    that failed are retried with exponential backoff until they come up or
+    close_all() is called.
+    """
+    _stopping.clear()
+
+    def run():
+        pending, delay = list(names), backoff
+        while pending:
+            failed = []
+            for name in pending:
+                try:
+                    _registry[name].instance()
+                except Exception as e:
+                    logger.warning("Warm-up of %s failed: %s: %s", name, type(e).__name__, e)
+                    failed.append(name)
+            pending = failed
+            if pending:
+                logger.info("Retrying warm-up of %s in %.1fs", ", ".join(pending), delay)
+                if _stopping.wait(delay):
+                    return
+                delay = min(delay * 2, max_backoff)
+        if then is not None:
+            try:
+                then()
+            except Exception:
+                logger.exception("Post warm-up step failed")
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def close_all():
+    _stopping.set()
+    for service in reversed(list(_registry.values())):
+        try:
+            service.close()
+        except Exception:
+            logger.exception("Closing %s failed", service._name)
@@ -0,0 +1,57 @@
+# index_writer.py
+import os
+import logging
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_is_writer = None
+_lock_file = None  # held open for the life of the process
+
+
+def _try_lock(path):
+    global _lock_file
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): single-process deployments only
+        return True
+
+    f = open(path, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _lock_file = f
+    return True
+
+
+def is_index_writer():
+    """
+    Whether this process owns the local indexes (BM25, numpy / faiss vectors)
+    and runs the ingestion workers.
+
+    With several API processes sharing a working directory (uvicorn
+    --workers N), INDEX_WRITER=auto lets the first one to take an exclusive
+    lock on INDEX_WRITER_LOCK write; the others open the indexes read-only
+    and refresh them (see refresh_indexes in vector_service). The lock dies
+    with its process, so a restarted worker can take over.
+
+    The election is per host, like the indexes it guards: processes on
+    other hosts would each elect their own writer, so don't run API
+    processes on more than one host against the same Mongo database.
+    """
+    global _is_writer
+    with _lock:
+        if _is_writer is None:
+            mode = settings.INDEX_WRITER.lower()
+            if mode == "auto":
+                _is_writer = _try_lock(os.path.join(os.getcwd(), settings.INDEX_WRITER_LOCK))
+            else:
+                _is_writer = mode in ("true", "1", "yes")
+            logger.info("Index role (pid %d): %s", os.getpid(), "writer" if _is_writer else "reader")
+        return _is_writer
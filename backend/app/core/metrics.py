@@ -0,0 +1,152 @@
+# metrics.py
+import time
+import logging
+from contextlib import nullcontext
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds: 1 ms .. 2 min covers a vector query up to a slow LLM answer
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_NOOP = nullcontext()
+
+_stage_seconds = None
+_request_seconds = None
+_llm_tokens = None
+_tracer = None
+
+
+def _setup():
+    """
+    Builds the Prometheus metrics (METRICS_ENABLED, needs prometheus_client)
+    and the OpenTelemetry tracer (TRACING_ENABLED, needs opentelemetry-api;
+    exporters come from the SDK / opentelemetry-instrument configuration).
+    """
+    global _stage_seconds, _request_seconds, _llm_tokens, _tracer
+
+    if settings.METRICS_ENABLED:
+        try:
+            from prometheus_client import Counter, Histogram
+        except ImportError:
+            logger.warning("METRICS_ENABLED but prometheus_client is not installed; metrics are off")
+        else:
+            _stage_seconds = Histogram(
+                "rag_stage_seconds", "Time spent per pipeline stage", ["stage"], buckets=_BUCKETS
+            )
+            _request_seconds = Histogram(
+                "rag_http_request_seconds", "HTTP request time, until the last body byte",
+                ["method", "route", "status"], buckets=_BUCKETS
+            )
+            _llm_tokens = Counter(
+                "rag_llm_tokens", "Estimated LLM tokens", ["provider", "kind"]
+            )
+
+    if settings.TRACING_ENABLED:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logger.warning("TRACING_ENABLED but opentelemetry-api is not installed; tracing is off")
+        else:
+            _tracer = trace.get_tracer("rag-research-assistant")
+
+
+_setup()
+
+
+class _Stage:
+    __slots__ = ("name", "attributes", "start", "span")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self.span = _tracer.start_as_current_span(self.name, attributes=self.attributes or None)
+            self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _stage_seconds is not None:
+            _stage_seconds.labels(self.name).observe(time.perf_counter() - self.start)
+        if self.span is not None:
+            return self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def stage(name, **attributes):
+    """
+    Times a block as one pipeline stage:
+
+        with stage("vector_query", queries=len(embeddings)):
+            ...
+
+    - Observed in the rag_stage_seconds{stage=name} histogram
+    - Also an OpenTelemetry span (with the attributes) when tracing is on
+    - A shared no-op context manager when both are off
+    """
+    if _stage_seconds is None and _tracer is None:
+        return _NOOP
+    return _Stage(name, attributes)
+
+
+def observe(name, seconds):
+    """Records a duration measured elsewhere (e.g. time spent inside a generator)."""
+    if _stage_seconds is not None:
+        _stage_seconds.labels(name).observe(seconds)
+
+
+def record_llm_tokens(provider, prompt_tokens, completion_tokens):
+    if _llm_tokens is not None:
+        _llm_tokens.labels(provider, "prompt").inc(prompt_tokens)
+        _llm_tokens.labels(provider, "completion").inc(completion_tokens)
+
+
+def metrics_enabled():
+    return _stage_seconds is not None
+
+
+def render_metrics():
+    """(body, content_type) for GET /metrics."""
+    from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware observing rag_http_request_seconds per route template
+    (not raw path, to keep label cardinality bounded). Streaming responses
+    are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _request_seconds is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send=timed_send)
+        finally:
+            route = scope.get("route")
+            _request_seconds.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)
+            ).observe(time.perf_counter() - start)
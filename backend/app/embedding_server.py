@@ -0,0 +1,82 @@
+# embedding_server.py
+"""
+Standalone embedding service shared by several API processes.
+
+Run from backend/ (one process; it owns the model and the embedding cache):
+    uvicorn app.embedding_server:app --host 0.0.0.0 --port 8001
+
+then start the API with EMBED_SERVER_URL=http://<host>:8001 and as many
+workers as there are cores, e.g. uvicorn app.main:app --workers 8.
+Query-sized requests from all workers are coalesced into shared model
+batches (QUERY_BATCH_WINDOW_MS); ingestion batches run as sent.
+"""
+import os
+from contextlib import asynccontextmanager
+from typing import List
+
+from dotenv import load_dotenv
+
+# This process *is* the embedding server: always load the model locally
+os.environ["EMBED_SERVER_URL"] = ""
+load_dotenv()
+
+import numpy as np
+from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
+
+from app.core.container import warm_up, readiness, close_all
+from app.core.metrics import MetricsMiddleware, metrics_enabled, render_metrics
+from app.services.vector_service import embed_texts_async
+
+SERVICES = ("embedding_model", "embedding_cache")
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up(list(readiness(SERVICES)))
+    yield
+    close_all()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    # Query-sized requests share model batches with the other workers' requests
+    vectors = await embed_texts_async(request.texts)
+    matrix = np.asarray(vectors, dtype="<f4")
+    return Response(
+        content=matrix.tobytes(),
+        media_type="application/octet-stream",
+        headers={"X-Embedding-Dim": str(matrix.shape[1])}
+    )
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    services = readiness(SERVICES)
+    ready = all(service["ready"] for service in services.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "services": services}
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
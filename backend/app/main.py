@@ -1,13 +1,67 @@
 # main.py
 import os
+import time
+import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Make sure .env loads BEFORE importing config or other modules
 load_dotenv()
 
 from fastapi import FastAPI
+from pymongo.errors import PyMongoError
+from app.core.container import warm_up, close_all
+from app.core.index_writer import is_index_writer
+from app.core.metrics import MetricsMiddleware
 from app.routes.rag import router as rag_router
+from app.routes.health import router as health_router, READY_SERVICES
+from app.services.mongo_service import ensure_indexes
+from app.services.ingestion_service import start_workers, stop_workers
+from app.services.llm_service import close_llm_clients
+from app.services.vector_service import start_index_refresh, stop_index_refresh
+from app.services.vector_store import check_reader_backend
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
+
+def _start_ingestion():
+    # Mongo may still be coming up alongside this pod: retry instead of failing startup
+    while True:
+        try:
+            ensure_indexes()
+            break
+        except PyMongoError as e:
+            logger.warning("Mongo not ready (%s); retrying", e)
+            time.sleep(5)
+
+    # Background ingestion workers drain the persistent job queue; with several
+    # API processes only the index writer runs them, the others follow its writes
+    if is_index_writer():
+        start_workers()
+    else:
+        start_index_refresh()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A reader that couldn't follow the writer's index must not start serving
+    if not is_index_writer():
+        check_reader_backend()
+
+    # Startup returns immediately (/healthz is live); Mongo, the indexes and
+    # the embedding model load in the background (retried until they come up)
+    # and /readyz reports them
+    warm_up(["mongo"], then=_start_ingestion)
+    warm_up([name for name in READY_SERVICES if name != "mongo"])
+    yield
+    stop_workers()
+    stop_index_refresh()
+    await close_llm_clients()
+    close_all()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(health_router)
 app.include_router(rag_router, prefix="/api/v1")
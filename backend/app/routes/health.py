@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
+
+from app.core.container import readiness
+from app.core.metrics import metrics_enabled, render_metrics
+from app.services.mongo_service import ping
+
+router = APIRouter()
+
+# Services a replica needs before it can answer queries
+READY_SERVICES = ("mongo", "vector_store", "lexical_index", "embedding_model")
+
+
+@router.get("/healthz")
+def healthz():
+    # Liveness only: the process is up and serving requests
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz():
+    services = readiness(READY_SERVICES)
+    ready = all(service["ready"] for service in services.values())
+
+    if ready:
+        try:
+            await run_in_threadpool(ping)
+        except PyMongoError as e:
+            ready = False
+            services["mongo"] = {"ready": False, "error": f"{type(e).__name__}: {e}"}
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "services": services}
+    )
+
+
+@router.get("/metrics")
+def metrics():
+    # Prometheus scrape endpoint (stage / request histograms, LLM token counters)
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
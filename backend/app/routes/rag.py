@@ -1,69 +1,203 @@
-from fastapi import APIRouter, UploadFile, File
-import uuid
-import os
+import json
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse
 
-from app.services.s3_service import upload_to_s3
 from app.services.mongo_service import (
-    save_document,
-    update_document,
-    chunks_collection 
+    get_document,
+    get_job,
+    get_latest_job_for_document,
+    get_document_aliases,
+    get_chunks_page
 )
-from app.services.rag_pipeline import process_document
-from app.services.vector_service import get_similar_chunks
-from app.services.llm_service import ask_llm
+from app.services.ingestion_service import (
+    spool_upload,
+    enqueue_document,
+    reingest_document,
+    delete_document,
+    DocumentBusyError,
+    DuplicateContentError,
+)
+from app.services.vector_service import embedding_cache_stats, query_cache_stats
+from app.services.answer_cache import answer_cache
+from app.services.rerank_service import rerank_stats
+from app.services.rag_pipeline import answer_question, answer_batch, stream_answer, resolve_scope
+from app.core.config import settings
 
 router = APIRouter()
 
+
+class ScopedRequest(BaseModel):
+    top_k: int = Field(default=settings.DEFAULT_TOP_K, ge=1, le=settings.MAX_TOP_K)
+
+    # Optional scope; all filters are combined with AND
+    document_ids: Optional[List[str]] = None
+    filename: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+
+class QueryRequest(ScopedRequest):
+    question: str
+
+
+class BatchQueryRequest(ScopedRequest):
+    questions: List[str] = Field(..., min_length=1, max_length=settings.BATCH_MAX_QUESTIONS)
+
+
+def _query_scope(query: ScopedRequest):
+    return run_in_threadpool(
+        resolve_scope,
+        document_ids=query.document_ids,
+        filename=query.filename,
+        created_after=query.created_after,
+        created_before=query.created_before
+    )
+
+
+def _job_view(job):
+    return {
+        "job_id": str(job["_id"]),
+        "document_id": job["document_id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job.get("progress", {}),
+        "error": job.get("error"),
+        "attempts": job.get("attempts", 0),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+def _require_pdf(file: UploadFile):
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are accepted.")
+
+
 @router.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
-    if not file.filename.endswith(".pdf"):
-        raise ValueError("Only PDF files are accepted.")
+    _require_pdf(file)
+
+    # Stream bytes to the spool dir, hashing as we go
+    spool_path, content_hash = await spool_upload(file)
+
+    # Re-use an existing document or queue ingestion for the worker pool
+    return await run_in_threadpool(enqueue_document, file.filename, spool_path, content_hash)
+
 
-    file_id = str(uuid.uuid4())
+@router.put("/documents/{document_id}")
+async def replace_document(document_id: str, file: UploadFile = File(...)):
+    _require_pdf(file)
 
-    # Read file bytes (avoid local file)
-    file_bytes = await file.read()
+    spool_path, content_hash = await spool_upload(file)
+    try:
+        result = await run_in_threadpool(reingest_document, document_id, file.filename, spool_path, content_hash)
+    except (DocumentBusyError, DuplicateContentError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-    # Upload to S3 directly
-    s3_key = f"documents/{file_id}.pdf"
-    s3_url = upload_to_s3(file_bytes, s3_key, is_bytes=True)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return result
 
-    # Save base metadata in MongoDB
-    document_id = save_document(file.filename, s3_url)
 
-    # Process PDF from bytes
-    chunk_count = process_document(file_bytes, document_id, is_bytes=True)
+@router.delete("/documents/{document_id}")
+async def remove_document(document_id: str):
+    try:
+        result = await run_in_threadpool(delete_document, document_id)
+    except DocumentBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-    # Update Mongo with chunk count and status
-    update_document(document_id, chunk_count)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if not result["deleted"]:
+        # Queued for the index writer process
+        return JSONResponse(status_code=202, content=result)
+    return result
 
-    return {"document_id": document_id, "chunks": chunk_count}
+
+@router.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_view(job)
+
+
+@router.get("/documents/{document_id}/status")
+def get_document_status(document_id: str):
+    doc = get_document(document_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    job = get_latest_job_for_document(document_id)
+    return {
+        "document_id": document_id,
+        "filename": doc["filename"],
+        "status": doc["status"],
+        "chunk_count": doc.get("chunk_count", 0),
+        "error": doc.get("error"),
+        "aliases": get_document_aliases(document_id),
+        "job": _job_view(job) if job else None,
+    }
 
 
 @router.post("/query")
-async def query_rag(query: dict):
-    question = query["question"]
+async def query_rag(query: QueryRequest):
+    document_ids = await _query_scope(query)
+    return await answer_question(query.question, top_k=query.top_k, document_ids=document_ids)
+
+
+@router.post("/query/stream")
+async def query_rag_stream(query: QueryRequest):
+    document_ids = await _query_scope(query)
 
-    chunks = get_similar_chunks(question)
-    context = "\n\n".join(chunks)
+    async def events():
+        # Server-sent events: one JSON payload per token, then a "done" event
+        async for event in stream_answer(query.question, top_k=query.top_k, document_ids=document_ids):
+            yield f"data: {json.dumps(event)}\n\n"
 
-    prompt = f"""
-    Use the following context to answer the question.
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    Context:
-    {context}
 
-    Question:
-    {question}
+@router.post("/query/batch")
+async def query_rag_batch(query: BatchQueryRequest):
+    document_ids = await _query_scope(query)
 
-    Answer based only on the context:
-    """
+    async def lines():
+        # NDJSON: one result per line, in completion order ("index" maps it back)
+        async for result in answer_batch(query.questions, top_k=query.top_k, document_ids=document_ids):
+            yield json.dumps(result, default=str) + "\n"
 
-    answer = ask_llm(prompt)
-    return {"answer": answer}
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/chunks/{document_id}")
-def get_chunks(document_id: str):
-    items = chunks_collection.find({"document_id": document_id})
-    return [{"index": item["index"], "text": item["text"]} for item in items]
+def get_chunks(
+    document_id: str,
+    after: Optional[int] = None,
+    limit: int = Query(settings.CHUNKS_PAGE_SIZE, ge=1, le=1000),
+):
+    items, next_cursor = get_chunks_page(document_id, after=after, limit=limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/stats")
+def get_stats():
+    return {
+        "embedding_cache": embedding_cache_stats(),
+        "query_cache": query_cache_stats(),
+        "answer_cache": answer_cache.stats(),
+        "rerank": rerank_stats(),
+    }
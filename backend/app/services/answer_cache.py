@@ -0,0 +1,179 @@
+# answer_cache.py
+import time
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+import numpy as np
+
+from app.core.config import settings
+
+
+def _normalize_question(question):
+    return " ".join(question.lower().split())
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """
+    Two-level LLM answer cache.
+
+    - Exact: keyed by normalized question + the retrieved chunk ids, so a
+      hit means the LLM would have seen the same prompt
+    - Semantic (optional): reuses an answer when the question embedding is
+      within `semantic_threshold` cosine similarity of a cached question
+
+    Entries expire after `ttl` seconds, the least recently used are evicted
+    past `max_entries`, and every entry is tied to the documents it was
+    answered from so re-ingesting or deleting a document drops them.
+    """
+
+    def __init__(self, max_entries, ttl, semantic_enabled=False, semantic_threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_enabled = semantic_enabled
+        self.semantic_threshold = semantic_threshold
+
+        self._entries = OrderedDict()          # key -> entry dict
+        self._by_document = defaultdict(set)   # document_id -> keys
+        self._semantic_keys = []
+        self._semantic_matrix = None           # rows aligned with _semantic_keys
+        self._semantic_dirty = False
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(question, chunk_ids):
+        payload = _normalize_question(question) + "\0" + "\0".join(chunk_ids)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get_live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_semantic(self, query_embedding):
+        if not self.semantic_enabled:
+            return None
+
+        with self._lock:
+            self._rebuild_semantic_index()
+            if self._semantic_matrix is None:
+                return None
+
+            scores = self._semantic_matrix @ _unit(query_embedding)
+            best = int(np.argmax(scores))
+            if scores[best] < self.semantic_threshold:
+                return None
+
+            entry = self._get_live(self._semantic_keys[best], time.time())
+            if entry is None:
+                return None
+
+            self.semantic_hits += 1
+            return entry["answer"]
+
+    def get_exact(self, question, chunk_ids):
+        with self._lock:
+            entry = self._get_live(self._key(question, chunk_ids), time.time())
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.exact_hits += 1
+            return entry["answer"]
+
+    def put(self, question, chunk_ids, document_ids, answer, query_embedding=None):
+        key = self._key(question, chunk_ids)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = {
+                "answer": answer,
+                "document_ids": set(document_ids),
+                "embedding": _unit(query_embedding) if query_embedding is not None else None,
+                "expires_at": time.time() + self.ttl,
+            }
+            for document_id in document_ids:
+                self._by_document[document_id].add(key)
+            self._semantic_dirty = True
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_document(self, document_id):
+        with self._lock:
+            keys = self._by_document.pop(document_id, set())
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drops every entry (the indexes changed in a way this process can't attribute)."""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_document.clear()
+            self._semantic_dirty = True
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for document_id in entry["document_ids"]:
+            keys = self._by_document.get(document_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_document[document_id]
+        self._semantic_dirty = True
+
+    def _rebuild_semantic_index(self):
+        if not self._semantic_dirty:
+            return
+
+        keys = [k for k, e in self._entries.items() if e["embedding"] is not None]
+        self._semantic_keys = keys
+        self._semantic_matrix = (
+            np.vstack([self._entries[k]["embedding"] for k in keys]) if keys else None
+        )
+        self._semantic_dirty = False
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+answer_cache = AnswerCache(
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl=settings.ANSWER_CACHE_TTL_SECONDS,
+    semantic_enabled=settings.SEMANTIC_CACHE_ENABLED,
+    semantic_threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+)
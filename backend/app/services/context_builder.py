@@ -0,0 +1,167 @@
+# context_builder.py
+import functools
+import logging
+import re
+
+from app.core.config import settings
+from app.utils.token_utils import count_tokens, estimate_tokens, load_tokenizer
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+# Overlaps shorter than this are treated as coincidence, not chunk overlap
+_MIN_OVERLAP_CHARS = 8
+
+# Generous characters-per-token bound (English averages ~4) for turning the
+# token chunker's overlap into a character window
+_MAX_CHARS_PER_TOKEN = 8
+
+
+def context_budget(provider=None):
+    """Context token budget for an LLM provider (falls back to CONTEXT_TOKEN_BUDGET)."""
+    provider = (provider or settings.LLM_PROVIDER).upper()
+    return settings.CONTEXT_TOKEN_BUDGETS.get(provider, settings.CONTEXT_TOKEN_BUDGET)
+
+
+@functools.lru_cache(maxsize=1)
+def _tokenizer():
+    """The embedding model's tokenizer, or None when it can't be loaded (counts are then estimated)."""
+    try:
+        return load_tokenizer(settings.EMBED_MODEL_NAME)
+    except Exception as e:
+        logger.warning("Estimating context tokens: no tokenizer for %s (%s)", settings.EMBED_MODEL_NAME, e)
+        return None
+
+
+def _count(texts):
+    tokenizer = _tokenizer()
+    if tokenizer is None:
+        return [estimate_tokens(text) for text in texts]
+    return count_tokens(tokenizer, texts)
+
+
+def _head(text, budget):
+    """The longest prefix of text that fits in budget tokens."""
+    tokenizer = _tokenizer()
+    if tokenizer is None:
+        return text[:budget * 4]
+    offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+    return text if len(offsets) <= budget else text[:offsets[budget][0]].rstrip()
+
+
+def _max_overlap_chars():
+    """Longest text two consecutive chunks can share, from the chunker's overlap setting."""
+    if settings.CHUNKER.lower() == "char":
+        return settings.CHUNK_OVERLAP
+    return settings.CHUNK_OVERLAP_TOKENS * _MAX_CHARS_PER_TOKEN
+
+
+def _compress(text):
+    # PDF extraction leaves hard line breaks and runs of spaces; they cost tokens
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _join_overlapping(left, right):
+    """Appends right to left, dropping the longest suffix/prefix overlap."""
+    longest = min(len(left), len(right), _max_overlap_chars())
+    for size in range(longest, _MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left} {right}"
+
+
+def _merge_adjacent(hits):
+    """
+    Merges hits that are consecutive chunks of the same document into passages.
+
+    A passage keeps the best (lowest) retrieval rank of its chunks so packing
+    still follows relevance.
+    """
+    groups = {}
+    passages = []
+
+    for rank, hit in enumerate(hits):
+        text = _compress(hit["text"])
+        if not text:
+            continue
+        index = hit.get("index")
+        if index is None or hit.get("document_id") is None:
+            passages.append({"rank": rank, "text": text, "chunks": 1, "document_id": hit.get("document_id")})
+        else:
+            groups.setdefault(hit["document_id"], {})[index] = (rank, text)
+
+    for document_id, by_index in groups.items():
+        current = None
+        for index in sorted(by_index):
+            rank, text = by_index[index]
+            if current is not None and index == current["last_index"] + 1:
+                current["text"] = _join_overlapping(current["text"], text)
+                current["rank"] = min(current["rank"], rank)
+                current["chunks"] += 1
+                current["last_index"] = index
+            else:
+                current = {"rank": rank, "text": text, "chunks": 1,
+                           "document_id": document_id, "last_index": index}
+                passages.append(current)
+
+    passages.sort(key=lambda passage: passage["rank"])
+    return passages
+
+
+def _shingles(text, size=5):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _drop_near_duplicates(passages, threshold):
+    kept, kept_shingles = [], []
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        duplicate = any(
+            len(shingles & other) / len(shingles | other) >= threshold
+            for other in kept_shingles
+        )
+        if not duplicate:
+            kept.append(passage)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def build_context(hits, budget=None):
+    """
+    Turns ranked retrieval hits into prompt context within a token budget.
+    Tokens are counted with the embedding model's tokenizer when it loads.
+
+    - Adjacent/overlapping chunks of the same document become one passage
+    - Near-duplicate passages (word-shingle Jaccard) are dropped
+    - Passages are packed best-ranked first; ones that don't fit are skipped
+      so a smaller, lower-ranked passage can still use the remaining budget
+
+    Returns (context, usage) where usage holds the token counts.
+    """
+    budget = budget if budget is not None else context_budget()
+
+    passages = _drop_near_duplicates(_merge_adjacent(hits), settings.CONTEXT_DEDUP_THRESHOLD)
+
+    packed, used = [], 0
+    for passage, tokens in zip(passages, _count(passage["text"] for passage in passages)):
+        if used + tokens <= budget:
+            packed.append(passage["text"])
+            used += tokens
+        elif not packed:
+            # The best passage alone is over budget: keep its head
+            packed.append(_head(passage["text"], budget))
+            [used] = _count(packed)
+
+    usage = {
+        "retrieved_tokens": sum(_count(hit["text"] for hit in hits)),
+        "context_tokens": used,
+        "context_budget": budget,
+        "chunks_retrieved": len(hits),
+        "passages_used": len(packed),
+    }
+    return "\n\n".join(packed), usage
@@ -0,0 +1,132 @@
+# embedding_cache.py
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+# SQLite's default host-parameter limit is 999
+_LOOKUP_BATCH = 500
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def cache_key(model_name, text):
+    """
+    Content address of an embedding: sha256 over (model name, normalized text).
+    """
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_normalize(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache backed by SQLite.
+
+    - Vectors are stored as float32 blobs keyed by cache_key()
+    - Entries past max_entries are evicted least-recently-used first
+    - hits / misses / evictions are counted for the lifetime of the process
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_name, texts):
+        """
+        Returns a list aligned with texts: a float32 vector for hits, None for misses.
+        """
+        keys = [cache_key(model_name, t) for t in texts]
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+
+            result = [found.get(key) for key in keys]
+            hit_count = sum(1 for v in result if v is not None)
+            self.hits += hit_count
+            self.misses += len(result) - hit_count
+
+        return result
+
+    def put_many(self, model_name, texts, vectors):
+        now = time.time()
+        rows = [
+            (cache_key(model_name, t), model_name, np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._count += self._conn.total_changes - before
+            self._evict()
+
+    def _evict(self):
+        overflow = self._count - self.max_entries
+        if overflow <= 0:
+            return
+
+        # Evict a little extra so we don't pay for a DELETE on every insert
+        to_remove = overflow + max(1, self.max_entries // 20)
+        cur = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (to_remove,)
+        )
+        self._count -= cur.rowcount
+        self.evictions += cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
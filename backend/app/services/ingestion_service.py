@@ -0,0 +1,344 @@
+# ingestion_service.py
+import os
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.index_writer import is_index_writer
+from app.services.s3_service import upload_to_s3
+from app.services.mongo_service import (
+    save_document,
+    update_document,
+    find_document_by_hash,
+    save_document_alias,
+    get_latest_job_for_document,
+    set_document_fields,
+    mark_document_failed,
+    create_job,
+    claim_next_job,
+    update_job,
+    requeue_running_jobs,
+    get_document,
+    has_active_job,
+    delete_document_record,
+)
+from app.services.rag_pipeline import process_document, remove_document_chunks
+from app.utils.pdf_utils import shutdown_extract_pool
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = os.path.join(os.getcwd(), settings.INGEST_SPOOL_DIR)
+
+_job_pool = None
+_dispatcher = None
+_slots = None
+_stop = threading.Event()
+_wakeup = threading.Event()
+
+
+class DocumentBusyError(RuntimeError):
+    """The document has a queued or running ingestion job."""
+
+
+class DuplicateContentError(ValueError):
+    """Another live document was ingested from the same bytes."""
+
+
+# -------------------------------
+# Enqueue (called from /upload)
+# -------------------------------
+async def spool_upload(upload_file):
+    """
+    Streams an UploadFile into the spool directory, hashing it on the way.
+    Returns (spool_path, sha256 hex digest).
+    """
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+
+    spool_path = os.path.join(SPOOL_DIR, f"{uuid.uuid4()}.pdf")
+    digest = hashlib.sha256()
+
+    with open(spool_path, "wb") as f:
+        while True:
+            data = await upload_file.read(settings.UPLOAD_READ_CHUNK_SIZE)
+            if not data:
+                break
+            digest.update(data)
+            f.write(data)
+
+    return spool_path, digest.hexdigest()
+
+
+def enqueue_document(filename, spool_path, content_hash):
+    """
+    - Short-circuits to the existing document when these bytes were ingested before
+      (the new filename is recorded as an alias)
+    - Otherwise creates the document record (status "processing") and queues
+      an ingestion job for the spooled file
+
+    The spooled file is removed unless a queued job now owns it.
+    """
+    try:
+        return _enqueue_document(filename, spool_path, content_hash)
+    except Exception:
+        _remove_spool(spool_path)
+        raise
+
+
+def _enqueue_document(filename, spool_path, content_hash):
+    existing = find_document_by_hash(content_hash)
+    if existing is None:
+        try:
+            document_id = save_document(filename, None, content_hash=content_hash)
+        except DuplicateKeyError:
+            # A concurrent upload of the same bytes inserted first (unique
+            # content_hash index): answer as if the lookup had found it
+            existing = find_document_by_hash(content_hash)
+            if existing is None:
+                raise
+
+    if existing is not None:
+        _remove_spool(spool_path)
+
+        document_id = str(existing["_id"])
+        save_document_alias(document_id, filename)
+        job = get_latest_job_for_document(document_id)
+        return {
+            "document_id": document_id,
+            "job_id": str(job["_id"]) if job else None,
+            "status": existing["status"],
+            "chunks": existing.get("chunk_count", 0),
+            "duplicate": True,
+        }
+
+    # Content-addressed key: identical bytes always map to the same object
+    job_id = _queue_ingestion(document_id, filename, spool_path, f"documents/{content_hash}.pdf")
+    return {
+        "document_id": document_id,
+        "job_id": job_id,
+        "status": "queued",
+        "chunks": 0,
+        "duplicate": False,
+    }
+
+
+def _queue_ingestion(document_id, filename, spool_path, s3_key):
+    """
+    create_job for a document just set to "processing". If that fails the
+    document is marked failed: with no job it would stay "processing", and
+    keep answering uploads of the same bytes as a duplicate.
+    """
+    try:
+        job_id = create_job(document_id, filename, spool_path, s3_key)
+    except Exception as e:
+        mark_document_failed(document_id, f"Could not queue ingestion: {e}")
+        raise
+
+    _wakeup.set()
+    return job_id
+
+
+# -------------------------------
+# Document lifecycle (PUT / DELETE /documents/{id})
+# -------------------------------
+def reingest_document(document_id, filename, spool_path, content_hash):
+    """
+    Queues a new version of an existing document under the same id.
+    The job re-chunks it and only re-embeds / rewrites chunks whose text
+    changed (see process_document). Returns None when the document doesn't exist.
+
+    The spooled file is removed unless a queued job now owns it.
+    """
+    try:
+        return _reingest_document(document_id, filename, spool_path, content_hash)
+    except Exception:
+        _remove_spool(spool_path)
+        raise
+
+
+def _reingest_document(document_id, filename, spool_path, content_hash):
+    doc = get_document(document_id)
+    if doc is None or has_active_job(document_id):
+        _remove_spool(spool_path)
+        if doc is None:
+            return None
+        raise DocumentBusyError(f"Document {document_id} is already being ingested")
+
+    if doc.get("content_hash") == content_hash and doc["status"] == "ready":
+        _remove_spool(spool_path)
+        job = get_latest_job_for_document(document_id)
+        return {
+            "document_id": document_id,
+            "job_id": str(job["_id"]) if job else None,
+            "status": doc["status"],
+            "chunks": doc.get("chunk_count", 0),
+            "unchanged": True,
+        }
+
+    try:
+        set_document_fields(document_id, {
+            "filename": filename,
+            "content_hash": content_hash,
+            "status": "processing",
+            "error": None,
+        })
+    except DuplicateKeyError:
+        # Unique content_hash index: two live documents can't hold the same bytes
+        existing = find_document_by_hash(content_hash)
+        holder = f"document {existing['_id']}" if existing else "another document"
+        raise DuplicateContentError(f"This file is identical to {holder}")
+    job_id = _queue_ingestion(document_id, filename, spool_path, f"documents/{content_hash}.pdf")
+
+    return {
+        "document_id": document_id,
+        "job_id": job_id,
+        "status": "queued",
+        "chunks": doc.get("chunk_count", 0),
+        "unchanged": False,
+    }
+
+
+def delete_document(document_id):
+    """
+    Deletes a document's chunks (Mongo, vector store, BM25 index), cached
+    answers built from it, and its records. Returns None when it doesn't
+    exist. The S3 object is kept: keys are content-addressed and may be
+    shared with a later upload of the same bytes.
+
+    Only the index writer process can touch the indexes: elsewhere the
+    deletion is queued as a job ("deleted": False, status "deleting").
+    """
+    doc = get_document(document_id)
+    if doc is None:
+        return None
+    if has_active_job(document_id):
+        raise DocumentBusyError(f"Document {document_id} is being ingested")
+
+    if not is_index_writer():
+        set_document_fields(document_id, {"status": "deleting"})
+        job_id = create_job(document_id, doc["filename"], None, None, kind="delete")
+        return {"document_id": document_id, "deleted": False, "status": "deleting", "job_id": job_id}
+
+    return _delete_now(document_id)
+
+
+def _delete_now(document_id):
+    # Chunks first: if this fails the record is still there and DELETE can be retried
+    chunk_count = remove_document_chunks(document_id)
+    delete_document_record(document_id)
+    return {"document_id": document_id, "deleted": True, "chunks": chunk_count}
+
+
+# -------------------------------
+# Job execution (worker threads)
+# -------------------------------
+def _remove_spool(spool_path):
+    try:
+        os.remove(spool_path)
+    except FileNotFoundError:
+        pass
+
+
+def _run_job(job):
+    job_id = str(job["_id"])
+    document_id = job["document_id"]
+    spool_path = job["spool_path"]
+
+    if job.get("kind") == "delete":
+        try:
+            # Removes the job too, with the document's other records
+            _delete_now(document_id)
+        except Exception as e:
+            logger.exception("Deletion job %s failed", job_id)
+            update_job(job_id, {"status": "failed", "stage": "failed", "error": str(e)})
+        finally:
+            _slots.release()
+        return
+
+    try:
+        # 1️⃣ UPLOAD TO S3
+        update_job(job_id, {"stage": "uploading"})
+        s3_url = upload_to_s3(spool_path, job["s3_key"])
+        set_document_fields(document_id, {"s3_url": s3_url})
+
+        # 2️⃣ EXTRACT -> CHUNK -> EMBED -> STORE, streamed page by page
+        update_job(job_id, {"stage": "processing"})
+        chunk_count = process_document(
+            spool_path,
+            document_id,
+            on_progress=lambda stored: update_job(job_id, {"progress": {"chunks": stored}})
+        )
+
+        update_document(document_id, chunk_count)
+        update_job(job_id, {
+            "status": "done",
+            "stage": "done",
+            "progress": {"chunks": chunk_count},
+        })
+        _remove_spool(spool_path)
+
+    except Exception as e:
+        logger.exception("Ingestion job %s failed", job_id)
+        update_job(job_id, {"status": "failed", "stage": "failed", "error": str(e)})
+        mark_document_failed(document_id, str(e))
+        # Failed jobs are never retried: a new upload spools its own copy
+        _remove_spool(spool_path)
+
+    finally:
+        _slots.release()
+
+
+def _dispatch_loop():
+    while not _stop.is_set():
+        # Wait for a free worker before claiming anything from the queue
+        if not _slots.acquire(timeout=settings.INGEST_POLL_INTERVAL):
+            continue
+
+        try:
+            job = claim_next_job()
+        except Exception:
+            logger.exception("Failed to claim ingestion job")
+            job = None
+
+        if job is None:
+            _slots.release()
+            _wakeup.wait(settings.INGEST_POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+
+        _job_pool.submit(_run_job, job)
+
+
+# -------------------------------
+# Lifecycle (called from app lifespan)
+# -------------------------------
+def start_workers():
+    global _job_pool, _dispatcher, _slots
+
+    requeued = requeue_running_jobs()
+    if requeued:
+        logger.info("Re-queued %d interrupted ingestion jobs", requeued)
+
+    _stop.clear()
+    _slots = threading.BoundedSemaphore(settings.INGEST_WORKERS)
+    _job_pool = ThreadPoolExecutor(max_workers=settings.INGEST_WORKERS, thread_name_prefix="ingest")
+
+    _dispatcher = threading.Thread(target=_dispatch_loop, name="ingest-dispatcher", daemon=True)
+    _dispatcher.start()
+
+
+def stop_workers():
+    _stop.set()
+    _wakeup.set()
+
+    if _dispatcher is not None:
+        _dispatcher.join()
+
+    # Running jobs stay "running" and are re-queued on next start
+    if _job_pool is not None:
+        _job_pool.shutdown(wait=False, cancel_futures=True)
+    shutdown_extract_pool()
@@ -0,0 +1,463 @@
+# lexical_index.py
+import os
+import re
+import glob
+import json
+import math
+import bisect
+import threading
+from collections import Counter
+import numpy as np
+
+# Keeps identifiers like "BRCA1", "p53", "eq.3", "x-ray" as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_.]")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which with".split()
+)
+
+
+def tokenize(text):
+    """
+    Lowercased terms; compound tokens also emit their parts ("x-ray" -> x-ray, x, ray).
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        if _SPLIT_RE.search(token):
+            terms.extend(p for p in _SPLIT_RE.split(token) if p and p not in _STOPWORDS)
+    return terms
+
+
+class LexicalIndex:
+    """
+    Incremental BM25 inverted index.
+
+    - Postings are numpy arrays (row ids, term frequencies) per term
+    - add() buffers new rows; flush() appends them to disk as one segment
+      (.npz), and segments are merged once there are more than max_segments
+    - search() scores all query-term postings in one vectorized pass
+    - delete() tombstones rows as (segment, row) lines in tombstones.txt;
+      compaction drops them (and runs once more than max_deleted_ratio of
+      the rows are dead). Lines naming a segment that no longer exists are
+      ignored, so a crash mid-compaction can't hit the wrong rows.
+    - manifest.json lists the live segments in order and is replaced
+      atomically after every segment write, so a read_only index in another
+      process can refresh() by loading only the segments (and tombstone
+      lines) that are new, or reload everything after a compaction.
+    """
+
+    def __init__(self, path, k1=1.2, b=0.75, max_segments=16, max_deleted_ratio=0.2, read_only=False):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self.max_deleted_ratio = max_deleted_ratio
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._tombstones_path = os.path.join(path, "tombstones.txt")
+        self._manifest_path = os.path.join(path, "manifest.json")
+
+        self._chunk_ids = []
+        self._document_ids = []
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._deleted_count = 0
+        self._row_by_id = {}      # chunk_id -> live row
+        self._segments = []       # (segment file name, first row), in row order
+        self._postings = {}       # term -> [rows, tfs] (compacted arrays)
+        self._unmerged = {}       # term -> [(rows, tfs), ...] appended since last compaction
+        self._pending = []        # (chunk_id, document_id, Counter) not yet on disk
+        self._total_length = 0
+        self._tombstones_offset = 0
+
+        # Size first: lines written later may name segments newer than the manifest read below
+        tombstones_size = self._tombstones_size()
+        for name in self._manifest_segments():
+            self._load_segment(os.path.join(path, name))
+        self._load_tombstones(tombstones_size)
+
+        if not read_only and self._segments and not os.path.exists(self._manifest_path):
+            self._write_manifest()
+
+    # -------------------------------
+    # Persistence
+    # -------------------------------
+    def _segment_paths(self):
+        return sorted(
+            p for p in glob.glob(os.path.join(self.path, "segment_*.npz")) if ".tmp." not in os.path.basename(p)
+        )
+
+    def _manifest_segments(self):
+        """Live segment names, from manifest.json (indexes written before it existed: every segment file)."""
+        if not os.path.exists(self._manifest_path):
+            return [os.path.basename(p) for p in self._segment_paths()]
+        with open(self._manifest_path) as f:
+            return json.load(f)["segments"]
+
+    def _write_manifest(self):
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"segments": [name for name, _ in self._segments]}, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _tombstones_size(self):
+        return os.path.getsize(self._tombstones_path) if os.path.exists(self._tombstones_path) else 0
+
+    def _load_segment(self, segment_path):
+        with np.load(segment_path) as data:
+            base = len(self._chunk_ids)
+            self._segments.append((os.path.basename(segment_path), base))
+            self._append_rows(data["chunk_ids"].tolist(), data["document_ids"].tolist(), data["lengths"])
+
+            offsets = data["term_offsets"]
+            rows = data["rows"].astype(np.int32) + base
+            tfs = data["tfs"]
+            for i, term in enumerate(data["terms"].tolist()):
+                start, end = offsets[i], offsets[i + 1]
+                self._unmerged.setdefault(term, []).append((rows[start:end], tfs[start:end]))
+
+    @staticmethod
+    def _write_segment(segment_path, chunk_ids, document_ids, lengths, postings):
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        rows, tfs = [], []
+        for i, term in enumerate(terms):
+            term_rows, term_tfs = postings[term]
+            rows.append(term_rows)
+            tfs.append(term_tfs)
+            offsets[i + 1] = offsets[i] + len(term_rows)
+
+        tmp_path = segment_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            chunk_ids=np.array(chunk_ids, dtype=str),
+            document_ids=np.array(document_ids, dtype=str),
+            lengths=np.asarray(lengths, dtype=np.int32),
+            terms=np.array(terms, dtype=str),
+            term_offsets=offsets,
+            rows=np.concatenate(rows).astype(np.int32) if rows else np.zeros(0, dtype=np.int32),
+            tfs=np.concatenate(tfs).astype(np.uint16) if tfs else np.zeros(0, dtype=np.uint16),
+        )
+        # Atomic rename: readers never see a half-written segment
+        os.replace(tmp_path, segment_path)
+
+    def _load_tombstones(self, size):
+        """Applies the complete tombstone lines between the last offset read and `size`."""
+        if size <= self._tombstones_offset:
+            return
+
+        with open(self._tombstones_path, "rb") as f:
+            f.seek(self._tombstones_offset)
+            data = f.read(size - self._tombstones_offset)
+        data = data[:data.rfind(b"\n") + 1]
+        self._tombstones_offset += len(data)
+
+        bases = dict(self._segments)
+        for line in data.decode("utf-8").splitlines():
+            segment, _, local_row = line.partition(" ")
+            if segment in bases:
+                self._mark_deleted(bases[segment] + int(local_row))
+
+    def refresh(self):
+        """
+        Read-only indexes: picks up the segments and tombstones the writer
+        process flushed since the last call. A compaction replaces the
+        segment list, which triggers a full reload instead.
+        """
+        if not self.read_only:
+            return
+
+        tombstones_size = self._tombstones_size()
+        try:
+            names = self._manifest_segments()
+        except ValueError:
+            return  # manifest being replaced; next call
+
+        known = [name for name, _ in self._segments]
+        try:
+            if names[:len(known)] != known or tombstones_size < self._tombstones_offset:
+                fresh = LexicalIndex(self.path, self.k1, self.b, self.max_segments, self.max_deleted_ratio,
+                                     read_only=True)
+                with self._lock:
+                    vars(self).update({k: v for k, v in vars(fresh).items() if k != "_lock"})
+                return
+
+            with self._lock:
+                for name in names[len(known):]:
+                    self._load_segment(os.path.join(self.path, name))
+                self._load_tombstones(tombstones_size)
+        except OSError:
+            # A segment listed in the manifest was compacted away meanwhile; next call reloads
+            return
+
+    def _next_segment_path(self):
+        existing = self._segment_paths()
+        last = int(os.path.basename(existing[-1])[8:-4]) if existing else 0
+        return os.path.join(self.path, f"segment_{last + 1:08d}.npz")
+
+    # -------------------------------
+    # Writes
+    # -------------------------------
+    def _append_rows(self, chunk_ids, document_ids, lengths):
+        base = len(self._chunk_ids)
+        self._chunk_ids.extend(chunk_ids)
+        self._document_ids.extend(document_ids)
+        self._lengths = np.concatenate([self._lengths, np.asarray(lengths, dtype=np.int32)])
+        self._deleted = np.concatenate([self._deleted, np.zeros(len(chunk_ids), dtype=bool)])
+        self._total_length += int(np.sum(lengths))
+        for i, chunk_id in enumerate(chunk_ids):
+            self._row_by_id[chunk_id] = base + i
+
+    def _mark_deleted(self, row):
+        if self._deleted[row]:
+            return
+        self._deleted[row] = True
+        self._deleted_count += 1
+        self._total_length -= int(self._lengths[row])
+        if self._row_by_id.get(self._chunk_ids[row]) == row:
+            del self._row_by_id[self._chunk_ids[row]]
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("This lexical index is read-only (another process is the index writer)")
+
+    def add(self, chunk_ids, texts, document_id):
+        self._check_writable()
+        with self._lock:
+            base = len(self._chunk_ids)
+            lengths = []
+            segment_postings = {}
+
+            for i, (chunk_id, text) in enumerate(zip(chunk_ids, texts)):
+                counts = Counter(tokenize(text))
+                self._pending.append((chunk_id, document_id, counts))
+                lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    segment_postings.setdefault(term, ([], []))
+                    segment_postings[term][0].append(base + i)
+                    segment_postings[term][1].append(min(tf, 65535))
+
+            self._append_rows(chunk_ids, [document_id] * len(chunk_ids), lengths)
+
+            for term, (rows, tfs) in segment_postings.items():
+                self._unmerged.setdefault(term, []).append(
+                    (np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.uint16))
+                )
+
+    def upsert(self, chunk_ids, texts, document_id):
+        """add() that first deletes rows with the same chunk ids."""
+        self.delete(chunk_ids)
+        self.add(chunk_ids, texts, document_id)
+
+    def delete(self, chunk_ids):
+        self._check_writable()
+        with self._lock:
+            rows = [self._row_by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in self._row_by_id]
+            if not rows:
+                return
+
+            # Tombstones name segment rows, so buffered rows go to disk first
+            self._write_pending()
+            bases = [base for _, base in self._segments]
+            lines = []
+            for row in rows:
+                name, base = self._segments[bisect.bisect_right(bases, row) - 1]
+                lines.append(f"{name} {row - base}\n")
+                self._mark_deleted(row)
+
+            with open(self._tombstones_path, "a") as f:
+                f.write("".join(lines))
+
+    def delete_document(self, document_id):
+        with self._lock:
+            chunk_ids = [
+                chunk_id for chunk_id, row in self._row_by_id.items()
+                if self._document_ids[row] == document_id
+            ]
+        self.delete(chunk_ids)
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+
+            too_many_deleted = self._deleted_count > self.max_deleted_ratio * len(self._chunk_ids)
+            if len(self._segments) > self.max_segments or too_many_deleted:
+                self._compact()
+
+    def _write_pending(self):
+        """Writes the rows added since the last flush as one new segment."""
+        if not self._pending:
+            return
+
+        base = len(self._chunk_ids) - len(self._pending)
+        postings = {}
+        for i, (_, _, counts) in enumerate(self._pending):
+            for term, tf in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(min(tf, 65535))
+
+        segment_path = self._next_segment_path()
+        self._write_segment(
+            segment_path,
+            [chunk_id for chunk_id, _, _ in self._pending],
+            [document_id for _, document_id, _ in self._pending],
+            self._lengths[base:],
+            {t: (np.array(r, dtype=np.int32), np.array(f, dtype=np.uint16)) for t, (r, f) in postings.items()},
+        )
+        self._segments.append((os.path.basename(segment_path), base))
+        self._write_manifest()
+        self._pending = []
+
+    def _compact(self):
+        """Merges every segment into one, dropping deleted rows."""
+        old_segments = self._segment_paths()
+        self._merge_all()
+
+        live = ~self._deleted
+        if self._deleted_count:
+            # Renumber the surviving rows 0..n-1
+            new_rows = np.cumsum(live, dtype=np.int64) - 1
+            postings = {}
+            for term, (rows, tfs) in self._postings.items():
+                keep = live[rows]
+                if keep.any():
+                    postings[term] = [new_rows[rows[keep]].astype(np.int32), tfs[keep]]
+            self._postings = postings
+
+            self._chunk_ids = [c for c, alive in zip(self._chunk_ids, live) if alive]
+            self._document_ids = [d for d, alive in zip(self._document_ids, live) if alive]
+            self._lengths = self._lengths[live]
+            self._deleted = np.zeros(len(self._chunk_ids), dtype=bool)
+            self._deleted_count = 0
+            self._row_by_id = {chunk_id: row for row, chunk_id in enumerate(self._chunk_ids)}
+
+        segment_path = self._next_segment_path()
+        self._write_segment(
+            segment_path,
+            self._chunk_ids,
+            self._document_ids,
+            self._lengths,
+            self._postings,
+        )
+        self._segments = [(os.path.basename(segment_path), 0)]
+        self._write_manifest()
+        for segment in old_segments:
+            os.remove(segment)
+
+        # Every tombstone named one of the removed segments
+        if os.path.exists(self._tombstones_path):
+            os.remove(self._tombstones_path)
+
+    # -------------------------------
+    # Reads
+    # -------------------------------
+    def _merge_term(self, term):
+        parts = self._unmerged.pop(term, None)
+        if parts:
+            existing = self._postings.get(term)
+            if existing is not None:
+                parts = [tuple(existing)] + parts
+            self._postings[term] = [
+                np.concatenate([rows for rows, _ in parts]),
+                np.concatenate([tfs for _, tfs in parts]),
+            ]
+        return self._postings.get(term)
+
+    def _merge_all(self):
+        for term in list(self._unmerged):
+            self._merge_term(term)
+
+    def search(self, query, top_k, document_ids=None, excluded_document_ids=()):
+        """
+        Returns [(chunk_id, document_id, bm25_score)] best first.
+        document_ids optionally restricts the search to those documents;
+        excluded_document_ids leaves those out.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_rows = len(self._chunk_ids) - self._deleted_count
+            if n_rows == 0:
+                return []
+
+            avg_length = self._total_length / n_rows or 1.0
+            all_rows, all_scores = [], []
+
+            for term in terms:
+                postings = self._merge_term(term)
+                if postings is None:
+                    continue
+                rows, tfs = postings
+                if self._deleted_count:
+                    keep = ~self._deleted[rows]
+                    rows, tfs = rows[keep], tfs[keep]
+                    if not len(rows):
+                        continue
+                tfs = tfs.astype(np.float32)
+
+                idf = math.log(1 + (n_rows - len(rows) + 0.5) / (len(rows) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[rows] / avg_length)
+                all_rows.append(rows)
+                all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+            if not all_rows:
+                return []
+
+            rows = np.concatenate(all_rows)
+            scores = np.concatenate(all_scores)
+
+            # Sum contributions per row over the (sparse) candidate set only
+            unique_rows, inverse = np.unique(rows, return_inverse=True)
+            row_scores = np.bincount(inverse, weights=scores).astype(np.float32)
+
+            if document_ids is not None:
+                allowed = set(document_ids)
+                keep = np.fromiter(
+                    (self._document_ids[r] in allowed for r in unique_rows),
+                    dtype=bool,
+                    count=len(unique_rows)
+                )
+                unique_rows, row_scores = unique_rows[keep], row_scores[keep]
+            if excluded_document_ids:
+                excluded = set(excluded_document_ids)
+                keep = np.fromiter(
+                    (self._document_ids[r] not in excluded for r in unique_rows),
+                    dtype=bool,
+                    count=len(unique_rows)
+                )
+                unique_rows, row_scores = unique_rows[keep], row_scores[keep]
+
+            k = min(top_k, len(unique_rows))
+            if k == 0:
+                return []
+
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top])]
+            return [
+                (self._chunk_ids[unique_rows[i]], self._document_ids[unique_rows[i]], float(row_scores[i]))
+                for i in top
+            ]
+
+    def count(self):
+        return len(self._chunk_ids) - self._deleted_count
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuses ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    Returns [(id, score)] best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,57 +1,243 @@
 # llm_service.py
+import json
+import time
+import random
+import asyncio
+import logging
+
+import httpx
+
 from app.core.config import settings
-import google.generativeai as genai
-import requests
+from app.core.metrics import stage, observe, record_llm_tokens
+from app.utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableLLMError(RuntimeError):
+    """Provider returned a status worth retrying (429 / 5xx)."""
+
+
+def _retryable_errors():
+    errors = (httpx.TransportError, RetryableLLMError)
+    if settings.LLM_PROVIDER.upper() == "GEMINI":
+        # The Google SDK is only imported when it is the configured provider
+        from google.api_core import exceptions as google_exceptions
+
+        errors += (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError,
+            google_exceptions.DeadlineExceeded,
+        )
+    return errors
+
+
+_RETRYABLE = _retryable_errors()
+
+# One pooled client per provider, reused across requests
+_http_clients = {}
+_gemini_model = None
+_rate_limiters = {}
+
+
+class RateLimiter:
+    """
+    Async token bucket: `rate` requests per second on average, bursts of
+    up to `burst`. Callers wait in arrival order.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _rate_limiter():
+    """Per-provider limiter from LLM_RATE_LIMITS (None = unlimited)."""
+    provider = settings.LLM_PROVIDER.upper()
+    if provider not in _rate_limiters:
+        rate = settings.LLM_RATE_LIMITS.get(provider)
+        _rate_limiters[provider] = RateLimiter(rate, settings.LLM_RATE_BURST) if rate else None
+    return _rate_limiters[provider]
+
+
+async def _throttle():
+    limiter = _rate_limiter()
+    if limiter is not None:
+        await limiter.acquire()
+
+
+def _get_http_client(provider):
+    client = _http_clients.get(provider)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.LLM_TIMEOUT_SECONDS,
+                connect=settings.LLM_CONNECT_TIMEOUT_SECONDS
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+            ),
+        )
+        _http_clients[provider] = client
+    return client
+
+
+async def close_llm_clients():
+    global _gemini_model
+    for client in _http_clients.values():
+        await client.aclose()
+    _http_clients.clear()
+    _rate_limiters.clear()
+    _gemini_model = None
+
+
+def _check_response(provider, status_code, text):
+    if status_code == 429 or status_code >= 500:
+        raise RetryableLLMError(f"{provider} Error {status_code}: {text}")
+    if status_code != 200:
+        raise RuntimeError(f"{provider} Error {status_code}: {text}")
+
+
+async def _backoff(attempt):
+    delay = settings.LLM_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+    await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+
+async def _with_retries(call, prompt, throttle=False):
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        if throttle:
+            await _throttle()
+        try:
+            return await call(prompt)
+        except _RETRYABLE as e:
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise
+            logger.warning("LLM call failed (%s), retrying", e)
+            await _backoff(attempt)
+
+
+async def _stream_with_retries(stream, prompt):
+    # Only retry until the first token has been sent to the caller
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        started = False
+        try:
+            async for token in stream(prompt):
+                started = True
+                yield token
+            return
+        except _RETRYABLE as e:
+            if started or attempt == settings.LLM_MAX_RETRIES:
+                raise
+            logger.warning("LLM stream failed (%s), retrying", e)
+            await _backoff(attempt)
 
 
 # -------------------------------
 # Gemini Client (v1 API)
 # -------------------------------
-def _ask_gemini(prompt):
-    if not settings.LLM_API_KEY:
-        raise ValueError("Gemini API key missing. Check LLM_API_KEY in .env")
+def _get_gemini_model():
+    global _gemini_model
+    if _gemini_model is None:
+        if not settings.LLM_API_KEY:
+            raise ValueError("Gemini API key missing. Check LLM_API_KEY in .env")
 
-    # Configure Gemini API key
-    genai.configure(api_key=settings.LLM_API_KEY)
+        import google.generativeai as genai
 
-    # Use correct v1 constructor (avoid v1beta fallback)
-    model = genai.GenerativeModel(model_name=settings.LLM_MODEL)
+        # Configure once; the model object is reused across requests
+        genai.configure(api_key=settings.LLM_API_KEY)
+        _gemini_model = genai.GenerativeModel(model_name=settings.LLM_MODEL)
+    return _gemini_model
 
-    # Generate response
-    response = model.generate_content(prompt)
+
+async def _ask_gemini(prompt):
+    response = await _get_gemini_model().generate_content_async(
+        prompt,
+        request_options={"timeout": settings.LLM_TIMEOUT_SECONDS}
+    )
 
     # Extract Gemini text output
     return response.text
 
 
+async def _stream_gemini(prompt):
+    response = await _get_gemini_model().generate_content_async(
+        prompt,
+        stream=True,
+        request_options={"timeout": settings.LLM_TIMEOUT_SECONDS}
+    )
+    async for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
 # -------------------------------
 # Ollama Client (Local models)
 # -------------------------------
-def _ask_ollama(prompt):
-    payload = {"model": settings.LLM_MODEL, "prompt": prompt}
-    r = requests.post("http://localhost:11434/api/generate", json=payload)
-
-    if r.status_code != 200:
-        raise RuntimeError(f"Ollama Error {r.status_code}: {r.text}")
+async def _ask_ollama(prompt):
+    payload = {"model": settings.LLM_MODEL, "prompt": prompt, "stream": False}
+    r = await _get_http_client("OLLAMA").post(f"{settings.OLLAMA_BASE_URL}/api/generate", json=payload)
+    _check_response("Ollama", r.status_code, r.text)
 
     return r.json().get("response")
 
 
+async def _stream_ollama(prompt):
+    payload = {"model": settings.LLM_MODEL, "prompt": prompt, "stream": True}
+    client = _get_http_client("OLLAMA")
+
+    async with client.stream("POST", f"{settings.OLLAMA_BASE_URL}/api/generate", json=payload) as r:
+        if r.status_code != 200:
+            await r.aread()
+            _check_response("Ollama", r.status_code, r.text)
+
+        # Ollama streams one JSON object per line
+        async for line in r.aiter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done"):
+                break
+
+
 # -------------------------------
 # Hugging Face Inference API
 # -------------------------------
-def _ask_huggingface(prompt):
+def _huggingface_request():
     if not settings.LLM_API_KEY:
         raise ValueError("HuggingFace API key missing. Check LLM_API_KEY in .env")
 
-    API_URL = f"https://router.huggingface.co/hf-inference/models/{settings.LLM_MODEL}"
+    api_url = f"https://router.huggingface.co/hf-inference/models/{settings.LLM_MODEL}"
     headers = {"Authorization": f"Bearer {settings.LLM_API_KEY}"}
-    payload = {"inputs": prompt}
+    return api_url, headers
 
-    r = requests.post(API_URL, headers=headers, json=payload)
 
-    if r.status_code != 200:
-        raise RuntimeError(f"HuggingFace Error {r.status_code}: {r.text}")
+async def _ask_huggingface(prompt):
+    api_url, headers = _huggingface_request()
+    payload = {"inputs": prompt}
+
+    r = await _get_http_client("HUGGINGFACE").post(api_url, headers=headers, json=payload)
+    _check_response("HuggingFace", r.status_code, r.text)
 
     data = r.json()
 
@@ -63,20 +249,70 @@ def _ask_huggingface(prompt):
     return str(data)
 
 
+async def _stream_huggingface(prompt):
+    api_url, headers = _huggingface_request()
+    payload = {"inputs": prompt, "stream": True}
+    client = _get_http_client("HUGGINGFACE")
+
+    async with client.stream("POST", api_url, headers=headers, json=payload) as r:
+        if r.status_code != 200:
+            await r.aread()
+            _check_response("HuggingFace", r.status_code, r.text)
+
+        # Server-sent events: data:{"token": {"text": "..."}, ...}
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = json.loads(line[len("data:"):])
+            token = (data.get("token") or {}).get("text")
+            if token and not (data.get("token") or {}).get("special"):
+                yield token
+
 
 # -------------------------------
 # Unified LLM Router
 # -------------------------------
-def ask_llm(prompt):
+_PROVIDERS = {
+    "GEMINI": (_ask_gemini, _stream_gemini),
+    "OLLAMA": (_ask_ollama, _stream_ollama),
+    "HUGGINGFACE": (_ask_huggingface, _stream_huggingface),
+}
+
+
+def _provider():
+    provider = settings.LLM_PROVIDER.upper()
+    if provider not in _PROVIDERS:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    return _PROVIDERS[provider]
+
+
+async def ask_llm(prompt, throttle=False):
+    """
+    throttle=True waits for the provider's LLM_RATE_LIMITS token bucket
+    before each attempt (batch fan-out); single queries aren't limited.
+    """
+    ask, _ = _provider()
     provider = settings.LLM_PROVIDER.upper()
+    with stage("llm_call", provider=provider):
+        answer = await _with_retries(ask, prompt, throttle)
+    record_llm_tokens(provider, estimate_tokens(prompt), estimate_tokens(answer or ""))
+    return answer
 
-    if provider == "GEMINI":
-        return _ask_gemini(prompt)
 
-    if provider == "OLLAMA":
-        return _ask_ollama(prompt)
+async def stream_llm(prompt):
+    """
+    Yields the answer as text pieces as the provider generates them.
+    """
+    _, stream = _provider()
+    provider = settings.LLM_PROVIDER.upper()
+    start = time.perf_counter()
+    pieces = []
 
-    if provider == "HUGGINGFACE":
-        return _ask_huggingface(prompt)
+    with stage("llm_stream", provider=provider):
+        async for token in _stream_with_retries(stream, prompt):
+            if not pieces:
+                observe("llm_first_token", time.perf_counter() - start)
+            pieces.append(token)
+            yield token
 
-    raise ValueError(f"Unsupported LLM provider: {provider}")
+    record_llm_tokens(provider, estimate_tokens(prompt), estimate_tokens("".join(pieces)))
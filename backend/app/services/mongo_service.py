@@ -1,19 +1,47 @@
-from pymongo import MongoClient
+import re
+import socket
+import logging
+from pymongo import MongoClient, ReturnDocument, ASCENDING
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 from datetime import datetime
 from app.core.config import settings
+from app.core.container import Lazy, lazy
 
-client = MongoClient(settings.MONGO_URI)
-db = client[settings.MONGO_DB]
-documents = db.documents
-chunks_collection = db.chunks
+logger = logging.getLogger(__name__)
 
+# Nothing connects at import time: the client is built on first use (or by
+# the startup warm-up) and the collections below resolve through it
+client = lazy(
+    "mongo",
+    lambda: MongoClient(settings.MONGO_URI, serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS),
+    close=lambda mongo_client: mongo_client.close()
+)
+db = Lazy("mongo_db", lambda: client.instance()[settings.MONGO_DB])
+documents = Lazy("documents", lambda: db.instance().documents)
+chunks_collection = Lazy("chunks", lambda: db.instance().chunks)
+jobs = Lazy("jobs", lambda: db.instance().jobs)
+document_aliases = Lazy("document_aliases", lambda: db.instance().document_aliases)
+counters = Lazy("counters", lambda: db.instance().counters)
 
 
-def save_document(filename, s3_url):
+def ping():
+    """Round trip to the server; raises PyMongoError when it is unreachable."""
+    client.admin.command("ping")
+
+
+def _object_id(value):
+    # Invalid ids from the URL simply don't match anything
+    if not ObjectId.is_valid(value):
+        return None
+    return ObjectId(value)
+
+
+def save_document(filename, s3_url, content_hash=None):
     doc = {
         "filename": filename,
         "s3_url": s3_url,
+        "content_hash": content_hash,
         "status": "processing",
         "chunk_count": 0,
         "created_at": datetime.utcnow(),
@@ -22,14 +50,83 @@ def save_document(filename, s3_url):
     result = documents.insert_one(doc)
     return str(result.inserted_id)
 
-def save_chunk(document_id, index, text):
-    chunk_doc = {
-        "document_id": document_id,
-        "index": index,
-        "text": text,
-        "created_at": datetime.utcnow()
-    }
-    chunks_collection.insert_one(chunk_doc)
+def save_chunks(document_id, chunks, start_index=0, pages=None, hashes=None, indexes=None):
+    """
+    Bulk-inserts chunk rows with insert_many, CHUNK_INSERT_BATCH_SIZE per round trip.
+    `pages` optionally gives the source page number of each chunk and
+    `hashes` its content hash; `indexes` overrides start_index + i.
+    Returns the number of rows written.
+    """
+    batch_size = max(1, settings.CHUNK_INSERT_BATCH_SIZE)
+    now = datetime.utcnow()
+    written = 0
+
+    batch = []
+    for i, text in enumerate(chunks):
+        chunk_doc = {
+            "document_id": document_id,
+            "index": indexes[i] if indexes is not None else start_index + i,
+            "text": text,
+            "created_at": now
+        }
+        if pages is not None:
+            chunk_doc["page"] = pages[i]
+        if hashes is not None:
+            chunk_doc["hash"] = hashes[i]
+        batch.append(chunk_doc)
+        if len(batch) >= batch_size:
+            chunks_collection.insert_many(batch, ordered=settings.CHUNK_INSERT_ORDERED)
+            written += len(batch)
+            batch = []
+
+    if batch:
+        chunks_collection.insert_many(batch, ordered=settings.CHUNK_INSERT_ORDERED)
+        written += len(batch)
+
+    return written
+
+
+def get_chunk_hashes(document_id):
+    """
+    {index: content hash} of a document's stored chunks (hash is None for
+    rows written before chunks were hashed, so they always count as changed).
+    """
+    rows = chunks_collection.find({"document_id": document_id}, projection={"_id": 0, "index": 1, "hash": 1})
+    return {row["index"]: row.get("hash") for row in rows}
+
+
+def delete_chunks(document_id, indexes=None, from_index=None):
+    """
+    Deletes a document's chunk rows: all of them, the given indexes, or
+    every index >= from_index. Returns the number of rows deleted.
+    """
+    query = {"document_id": document_id}
+    if indexes is not None:
+        query["index"] = {"$in": list(indexes)}
+    elif from_index is not None:
+        query["index"] = {"$gte": from_index}
+    return chunks_collection.delete_many(query).deleted_count
+
+
+def get_chunks_page(document_id, after=None, limit=None):
+    """
+    Returns (items, next_cursor) for a document's chunks ordered by index.
+    The cursor is the last index returned; pass it back as `after`.
+    """
+    limit = limit or settings.CHUNKS_PAGE_SIZE
+
+    query = {"document_id": document_id}
+    if after is not None:
+        query["index"] = {"$gt": after}
+
+    items = list(
+        chunks_collection.find(query, projection={"_id": 0, "index": 1, "text": 1, "page": 1})
+        .sort("index", ASCENDING)
+        .limit(limit)
+    )
+
+    next_cursor = items[-1]["index"] if len(items) == limit else None
+    return items, next_cursor
 
 
 def update_document(document_id, chunk_count):
@@ -43,3 +140,243 @@ def update_document(document_id, chunk_count):
             }
         }
     )
+
+
+def set_document_fields(document_id, fields):
+    documents.update_one(
+        {"_id": ObjectId(document_id)},
+        {"$set": {**fields, "updated_at": datetime.utcnow()}}
+    )
+
+
+def mark_document_failed(document_id, error):
+    set_document_fields(document_id, {"status": "failed", "error": error})
+
+
+def get_document(document_id):
+    oid = _object_id(document_id)
+    if oid is None:
+        return None
+    return documents.find_one({"_id": oid})
+
+
+def delete_document_record(document_id):
+    """Removes the document row, its aliases and its jobs (chunks: see delete_chunks)."""
+    oid = _object_id(document_id)
+    if oid is None:
+        return False
+    document_aliases.delete_many({"document_id": document_id})
+    jobs.delete_many({"document_id": document_id})
+    return documents.delete_one({"_id": oid}).deleted_count == 1
+
+
+def bump_index_version():
+    """
+    Increments the shared index version (every change to the vector / BM25
+    indexes); other API processes poll it to drop cached retrievals.
+    """
+    counter = counters.find_one_and_update(
+        {"_id": "index_version"},
+        {"$inc": {"value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["value"]
+
+
+def get_index_version():
+    counter = counters.find_one({"_id": "index_version"})
+    return counter["value"] if counter else 0
+
+
+def ensure_indexes():
+    """
+    Creates the indexes the API relies on (no-op if they already exist).
+    """
+    chunks_collection.create_index([("document_id", ASCENDING), ("index", ASCENDING)])
+    _ensure_content_hash_index()
+    documents.create_index([("created_at", ASCENDING)])
+    documents.create_index([("status", ASCENDING)])
+    document_aliases.create_index([("document_id", ASCENDING)])
+    jobs.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+    jobs.create_index([("document_id", ASCENDING), ("created_at", ASCENDING)])
+
+
+# Documents that count for upload dedup; failed and "deleting" ones don't
+LIVE_STATUSES = ["processing", "ready"]
+
+
+def _ensure_content_hash_index():
+    """
+    At most one live document per content hash, so two concurrent uploads of
+    the same bytes can't both insert (see enqueue_document). A partial
+    filter with $in needs MongoDB 6.0+.
+    """
+    info = documents.index_information()
+    if "content_hash_1" in info and not info["content_hash_1"].get("unique"):
+        documents.drop_index("content_hash_1")  # the plain index of earlier versions
+
+    try:
+        documents.create_index(
+            [("content_hash", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"content_hash": {"$type": "string"}, "status": {"$in": LIVE_STATUSES}}
+        )
+    except DuplicateKeyError:
+        # Duplicates stored before the index existed: dedup still works through
+        # find_document_by_hash, only concurrent uploads can race
+        logger.warning("Live documents share a content_hash; the unique content_hash index was not created")
+
+
+def find_document_by_hash(content_hash):
+    """
+    Returns the live (not failed or being deleted) document ingested from these exact bytes, if any.
+    """
+    return documents.find_one(
+        {"content_hash": content_hash, "status": {"$in": LIVE_STATUSES}},
+        sort=[("created_at", 1)]
+    )
+
+
+def save_document_alias(document_id, filename):
+    document_aliases.insert_one({
+        "document_id": document_id,
+        "filename": filename,
+        "created_at": datetime.utcnow()
+    })
+
+
+def get_document_aliases(document_id):
+    items = document_aliases.find({"document_id": document_id}).sort("created_at", ASCENDING)
+    return [item["filename"] for item in items]
+
+
+def find_document_ids(document_ids=None, filename=None, created_after=None, created_before=None):
+    """
+    Resolves query filters to the matching document ids.
+
+    - document_ids restricts the candidates to these ids
+    - filename is a case-insensitive substring match on the original
+      filename or any alias
+    - created_after / created_before bound the upload time
+
+    Only "ready" documents match: see unready_document_ids.
+    """
+    query = {"status": "ready"}
+
+    if document_ids is not None:
+        query["_id"] = {"$in": [oid for oid in map(_object_id, document_ids) if oid is not None]}
+
+    if filename:
+        pattern = re.compile(re.escape(filename), re.IGNORECASE)
+        alias_ids = document_aliases.distinct("document_id", {"filename": pattern})
+        query["$or"] = [
+            {"filename": pattern},
+            {"_id": {"$in": [oid for oid in map(_object_id, alias_ids) if oid is not None]}},
+        ]
+
+    created = {}
+    if created_after is not None:
+        created["$gte"] = created_after
+    if created_before is not None:
+        created["$lte"] = created_before
+    if created:
+        query["created_at"] = created
+
+    return [str(doc["_id"]) for doc in documents.find(query, projection={"_id": 1})]
+
+
+def unready_document_ids():
+    """
+    Ids of documents whose chunks searches must skip: being ingested or
+    re-ingested, failed or being deleted. A re-ingest that fails partway
+    leaves new chunks next to the previous version's, so nothing of such a
+    document is served until it is ready again.
+    """
+    return sorted(str(_id) for _id in documents.distinct("_id", {"status": {"$ne": "ready"}}))
+
+
+# -------------------------------
+# Ingestion job queue
+# -------------------------------
+# Jobs belong to the host that queued them: spool files and the local
+# indexes only exist there (see INDEX_WRITER in config)
+_HOST = socket.gethostname()
+
+
+def create_job(document_id, filename, spool_path, s3_key, kind="ingest"):
+    """
+    Queues a job: "ingest" a spooled file, or "delete" a document (queued by
+    API processes that aren't the index writer; spool_path / s3_key unused).
+    """
+    job = {
+        "kind": kind,
+        "host": _HOST,
+        "document_id": document_id,
+        "filename": filename,
+        "spool_path": spool_path,
+        "s3_key": s3_key,
+        "status": "queued",
+        "stage": "queued",
+        "progress": {"chunks": 0},
+        "error": None,
+        "attempts": 0,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+    result = jobs.insert_one(job)
+    return str(result.inserted_id)
+
+
+def claim_next_job():
+    """
+    Atomically moves this host's oldest queued job to "running" and returns it.
+    """
+    return jobs.find_one_and_update(
+        # host None also matches jobs queued before jobs carried one
+        {"status": "queued", "host": {"$in": [_HOST, None]}},
+        {
+            "$set": {
+                "status": "running",
+                "stage": "starting",
+                "started_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def update_job(job_id, fields):
+    jobs.update_one(
+        {"_id": ObjectId(job_id)},
+        {"$set": {**fields, "updated_at": datetime.utcnow()}}
+    )
+
+
+def requeue_running_jobs():
+    """
+    Puts this host's jobs left "running" by a crashed or stopped worker back in the queue.
+    """
+    result = jobs.update_many(
+        {"status": "running", "host": {"$in": [_HOST, None]}},
+        {"$set": {"status": "queued", "stage": "queued", "updated_at": datetime.utcnow()}}
+    )
+    return result.modified_count
+
+
+def get_job(job_id):
+    oid = _object_id(job_id)
+    if oid is None:
+        return None
+    return jobs.find_one({"_id": oid})
+
+
+def get_latest_job_for_document(document_id):
+    return jobs.find_one({"document_id": document_id}, sort=[("created_at", -1)])
+
+
+def has_active_job(document_id):
+    return jobs.count_documents({"document_id": document_id, "status": {"$in": ["queued", "running"]}}, limit=1) > 0
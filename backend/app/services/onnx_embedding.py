@@ -0,0 +1,99 @@
+# onnx_embedding.py
+import os
+import threading
+import numpy as np
+
+_quantize_lock = threading.Lock()
+
+
+def _find(model_dir, filename):
+    for candidate in (os.path.join(model_dir, filename), os.path.join(model_dir, "onnx", filename)):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+class OnnxEmbeddingFunction:
+    """
+    Runs a sentence-transformers model (BERT-style encoder + mean pooling +
+    L2 normalization) with ONNX Runtime instead of PyTorch.
+
+    - model_name is a local directory holding model.onnx and tokenizer.json,
+      or a Hub repo whose ONNX export is downloaded once into cache_dir
+    - quantize=True converts the weights to int8 (dynamic quantization) the
+      first time and caches the result next to the fp32 model
+    - Never imports torch; callable like the Chroma embedding functions
+    """
+
+    def __init__(self, model_name, cache_dir, quantize=True, max_seq_tokens=256, threads=0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = self._model_dir(model_name, cache_dir)
+        model_path = _find(model_dir, "model.onnx")
+        if model_path is None:
+            raise FileNotFoundError(f"No model.onnx under {model_dir}")
+        if quantize:
+            model_path = self._quantized(model_path)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_tokens)
+        pad_id = self.tokenizer.token_to_id("[PAD]")
+        self.tokenizer.enable_padding(pad_id=pad_id or 0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        outputs = [o.name for o in self.session.get_outputs()]
+        self._output = "last_hidden_state" if "last_hidden_state" in outputs else outputs[0]
+        self.model_path = model_path
+
+    @staticmethod
+    def _model_dir(model_name, cache_dir):
+        if os.path.isdir(model_name):
+            return model_name
+
+        repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        model_dir = os.path.join(cache_dir, repo.replace("/", "--"))
+        if _find(model_dir, "model.onnx") is None or not os.path.exists(os.path.join(model_dir, "tokenizer.json")):
+            from huggingface_hub import hf_hub_download
+
+            for filename in ("onnx/model.onnx", "tokenizer.json"):
+                hf_hub_download(repo_id=repo, filename=filename, local_dir=model_dir)
+        return model_dir
+
+    @staticmethod
+    def _quantized(model_path):
+        quantized_path = model_path[:-len(".onnx")] + "_int8.onnx"
+        with _quantize_lock:
+            if not os.path.exists(quantized_path):
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+
+                tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+                quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, quantized_path)
+        return quantized_path
+
+    def __call__(self, texts):
+        if not texts:
+            return []
+
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self.session.run([self._output], feeds)[0]
+
+        # Mean pooling over real tokens, then unit length (as sentence-transformers does)
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return list(pooled.astype(np.float32))
@@ -0,0 +1,70 @@
+# query_cache.py
+import threading
+from collections import OrderedDict
+
+
+def normalize_query(text):
+    return " ".join(text.split())
+
+
+class LRUCache:
+    """
+    Size-bounded in-process LRU map for the query path (question ->
+    embedding, question + scope -> retrieved hits).
+
+    - Entries past max_entries are evicted least-recently-used first
+    - get()/put() take an optional version: an entry stored under another
+      version is dropped on lookup (counted as stale), so bumping the
+      version invalidates everything without walking the map
+    - Values are shared with callers and must be treated as read-only
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, version=None):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
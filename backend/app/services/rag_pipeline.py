@@ -1,17 +1,372 @@
-from app.utils.pdf_utils import extract_text_from_pdf
-from app.utils.chunk_utils import chunk_text
-from app.services.vector_service import store_embeddings
+import os
+from itertools import islice
 
+from app.core.config import settings
+from app.utils.pdf_utils import iter_pdf_pages
+from app.utils.ocr_utils import OcrOptions, ocr_available
+from app.utils.chunk_utils import iter_chunks, iter_token_chunks
+from app.services.vector_service import (
+    embed_queries,
+    search_chunks_many,
+    store_embeddings,
+    delete_stale_chunks,
+    delete_document_chunks,
+    embed_query_async,
+    search_chunks_async,
+)
+from app.services.mongo_service import find_document_ids, get_chunk_hashes
+from app.services.answer_cache import answer_cache
+from app.services.rerank_service import rerank
+from app.services.context_builder import build_context
+from app.utils.token_utils import estimate_tokens, load_tokenizer
+from app.services.llm_service import ask_llm, stream_llm
+from app.core.metrics import stage, observe
+
+import time
+import asyncio
 from io import BytesIO
-import pdfplumber
 
-def process_document(pdf_data, document_id, is_bytes=False):
+
+def make_chunks(pages):
+    """Chunks (page_number, text) pairs with the configured CHUNKER."""
+    if settings.CHUNKER.lower() == "char":
+        return iter_chunks(pages, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+
+    return iter_token_chunks(
+        pages,
+        load_tokenizer(settings.EMBED_MODEL_NAME),
+        max_tokens=min(settings.CHUNK_MAX_TOKENS, settings.EMBED_MAX_SEQ_TOKENS - 2),
+        overlap_tokens=settings.CHUNK_OVERLAP_TOKENS
+    )
+
+
+def ocr_options():
+    """OcrOptions for one document (its time budget starts now), or None when OCR is off."""
+    if not settings.OCR_ENABLED:
+        return None
+    return OcrOptions(
+        min_chars=settings.OCR_MIN_CHARS_PER_PAGE,
+        min_image_coverage=settings.OCR_MIN_IMAGE_COVERAGE,
+        dpi=settings.OCR_DPI,
+        lang=settings.OCR_LANG,
+        workers=settings.OCR_WORKERS,
+        page_timeout=settings.OCR_PAGE_TIMEOUT_SECONDS,
+        deadline=time.time() + settings.OCR_DOCUMENT_BUDGET_SECONDS,
+        cache_dir=os.path.join(os.getcwd(), settings.OCR_CACHE_DIR) if settings.OCR_CACHE_ENABLED else None,
+    )
+
+
+def _timed_pages(pages, extract_seconds):
+    """
+    Observes how long the pipeline waits for each extracted page (all of the
+    extraction on the sequential path; what the process pool did not hide
+    otherwise) and adds it to extract_seconds[0].
+    """
+    pages = iter(pages)
+    while True:
+        start = time.perf_counter()
+        page = next(pages, None)
+        elapsed = time.perf_counter() - start
+        extract_seconds[0] += elapsed
+        if page is None:
+            return
+        observe("pdf_extract_page", elapsed)
+        yield page
+
+
+def process_document(pdf_data, document_id, is_bytes=False, on_progress=None):
+    """
+    Streams a PDF through extraction -> chunking -> embedding/storage.
+
+    Pages are read lazily, chunks carry their page number, and at most
+    INGEST_CHUNK_BATCH_SIZE chunks are held in memory at a time.
+    on_progress(chunks_stored) is called after each batch.
+
+    Idempotent: chunks already stored with the same text at the same index
+    (a resumed job or a re-ingested, partly changed document) are not
+    embedded or written again, and chunks past the new end are deleted.
+    """
     # Read PDF from bytes
     if is_bytes:
         pdf_file = BytesIO(pdf_data)
     else:
-        pdf_file = pdf_data  # old behavior
+        pdf_file = pdf_data  # path or file object
+
+    pages = iter_pdf_pages(
+        pdf_file,
+        workers=settings.PDF_EXTRACT_WORKERS,
+        parallel_min_pages=settings.PDF_PARALLEL_MIN_PAGES,
+        pages_per_task=settings.PDF_PAGES_PER_TASK,
+        ocr=ocr_options()
+    )
+    existing_hashes = get_chunk_hashes(document_id)
+
+    extract_seconds = [0.0]
+    chunks = make_chunks(_timed_pages(pages, extract_seconds))
+
+    stored = 0
+    while True:
+        # Pulling a batch runs extraction and chunking; the page waits are
+        # booked as pdf_extract_page, the rest as chunking
+        start = time.perf_counter()
+        extract_seconds[0] = 0.0
+        batch = list(islice(chunks, settings.INGEST_CHUNK_BATCH_SIZE))
+        if not batch:
+            break
+        observe("chunking", time.perf_counter() - start - extract_seconds[0])
+
+        stored += store_embeddings(
+            [text for text, _ in batch],
+            document_id,
+            start_index=stored,
+            pages=[page for _, page in batch],
+            existing_hashes=existing_hashes
+        )
+        if on_progress:
+            on_progress(stored)
+
+    if stored == 0:
+        if not (settings.OCR_ENABLED and ocr_available()):
+            raise ValueError(
+                "No text could be extracted from the PDF. Scanned documents need the OCR "
+                "fallback (OCR_ENABLED, with pytesseract and the tesseract binary installed)."
+            )
+        raise ValueError("No text could be extracted from the PDF.")
+
+    delete_stale_chunks(document_id, stored, existing_hashes)
+
+    # Cached answers built from the previous version of this document are stale
+    answer_cache.invalidate_document(document_id)
+
+    return stored
+
+
+def remove_document_chunks(document_id):
+    """Deletes a document's chunks everywhere and drops answers built from them."""
+    deleted = delete_document_chunks(document_id)
+    answer_cache.invalidate_document(document_id)
+    return deleted
+
+
+def build_prompt(question, context):
+    return f"""
+    Use the following context to answer the question.
+
+    Context:
+    {context}
+
+    Question:
+    {question}
+
+    Answer based only on the context:
+    """
+
+
+NO_MATCHING_DOCUMENTS = "No documents match the given filters."
+
+
+def resolve_scope(document_ids=None, filename=None, created_after=None, created_before=None):
+    """
+    Turns query filters into the list of document ids to search.
+    Returns None when the query is unscoped (search everything).
+    """
+    if document_ids is None and not filename and created_after is None and created_before is None:
+        return None
+
+    return find_document_ids(
+        document_ids=document_ids,
+        filename=filename,
+        created_after=created_after,
+        created_before=created_before
+    )
+
+
+def _semantic_hit(query_embedding, document_ids):
+    # Semantic hit skips retrieval too; it ignores scope, so only unscoped queries use it
+    if settings.ANSWER_CACHE_ENABLED and document_ids is None:
+        return answer_cache.get_semantic(query_embedding)
+    return None
+
+
+def _fetch_k(top_k):
+    return max(top_k, settings.RERANK_CANDIDATES) if settings.RERANK_ENABLED else top_k
+
+
+async def _select_hits(question, top_k, query_embedding, candidates):
+    """
+    Exact-cache lookup and optional rerank over retrieved candidates.
+    Returns the same tuple as _retrieve.
+    """
+    if settings.ANSWER_CACHE_ENABLED:
+        answer = answer_cache.get_exact(question, [hit["id"] for hit in candidates])
+        if answer is not None:
+            return answer, "exact", query_embedding, candidates, candidates[:top_k]
+
+    if settings.RERANK_ENABLED:
+        with stage("rerank", candidates=len(candidates)):
+            hits = await asyncio.to_thread(rerank, question, candidates, top_k)
+    else:
+        hits = candidates
+
+    return None, None, query_embedding, candidates, hits
+
+
+async def _retrieve(question, top_k, document_ids=None):
+    """
+    Runs the cache lookups and retrieval shared by answer_question / stream_answer.
+    Returns (cached_answer, cache_level, query_embedding, candidates, hits).
+
+    With RERANK_ENABLED, RERANK_CANDIDATES chunks are fetched and the
+    cross-encoder keeps the best top_k. The exact cache is keyed on the
+    candidates, so a hit skips the rerank as well as the LLM.
+    """
+    query_embedding = await embed_query_async(question)
+
+    answer = _semantic_hit(query_embedding, document_ids)
+    if answer is not None:
+        return answer, "semantic", query_embedding, [], []
+
+    candidates = await search_chunks_async(query_embedding, _fetch_k(top_k), document_ids, query_text=question)
+    return await _select_hits(question, top_k, query_embedding, candidates)
+
+
+def _remember(question, query_embedding, candidates, answer, scoped=False):
+    if not settings.ANSWER_CACHE_ENABLED:
+        return
+    answer_cache.put(
+        question,
+        [hit["id"] for hit in candidates],
+        {hit["document_id"] for hit in candidates if hit["document_id"]},
+        answer,
+        # Scoped answers must not be served to unscoped semantic lookups
+        query_embedding=None if scoped else query_embedding
+    )
+
+
+def _prompt(question, hits):
+    """Returns (prompt, usage) with the hits packed into the provider's context budget."""
+    context, usage = build_context(hits)
+    prompt = build_prompt(question, context)
+    usage["prompt_tokens"] = estimate_tokens(prompt)
+    return prompt, usage
+
+
+async def _generate(question, query_embedding, candidates, hits, scoped, throttle=False):
+    """LLM call for a cache miss; remembers the answer. Returns (answer, usage)."""
+    prompt, usage = _prompt(question, hits)
+    answer = await ask_llm(prompt, throttle=throttle)
+    usage["completion_tokens"] = estimate_tokens(answer)
+    _remember(question, query_embedding, candidates, answer, scoped=scoped)
+    return answer, usage
+
+
+async def answer_question(question, top_k=4, document_ids=None):
+    """
+    Retrieval + LLM with the answer cache in front of both.
+    document_ids scopes retrieval (None = all documents, see resolve_scope).
+    Returns {"answer", "cache", "usage"} where cache is "semantic", "exact" or
+    None and usage holds token counts (None when no LLM call was made).
+    """
+    if document_ids is not None and not document_ids:
+        return {"answer": NO_MATCHING_DOCUMENTS, "cache": None, "usage": None}
+
+    cached, cache_level, query_embedding, candidates, hits = await _retrieve(question, top_k, document_ids)
+    if cached is not None:
+        return {"answer": cached, "cache": cache_level, "usage": None}
+
+    answer, usage = await _generate(question, query_embedding, candidates, hits, scoped=document_ids is not None)
+    return {"answer": answer, "cache": None, "usage": usage}
+
+
+async def stream_answer(question, top_k=4, document_ids=None):
+    """
+    Streaming answer_question: yields {"token": text} events as the LLM
+    generates, then a final {"done": True, "cache": ..., "usage": ...} event.
+    """
+    if document_ids is not None and not document_ids:
+        yield {"token": NO_MATCHING_DOCUMENTS}
+        yield {"done": True, "cache": None, "usage": None}
+        return
+
+    cached, cache_level, query_embedding, candidates, hits = await _retrieve(question, top_k, document_ids)
+    if cached is not None:
+        yield {"token": cached}
+        yield {"done": True, "cache": cache_level, "usage": None}
+        return
+
+    prompt, usage = _prompt(question, hits)
+    pieces = []
+    async for token in stream_llm(prompt):
+        pieces.append(token)
+        yield {"token": token}
+
+    answer = "".join(pieces)
+    usage["completion_tokens"] = estimate_tokens(answer)
+    _remember(question, query_embedding, candidates, answer, scoped=document_ids is not None)
+    yield {"done": True, "cache": None, "usage": usage}
+
+
+async def answer_batch(questions, top_k=4, document_ids=None, concurrency=None):
+    """
+    Answers many questions; yields {"index", "question", "answer", "cache",
+    "usage"} (or {"index", "question", "error"}) in completion order.
+
+    - All questions are embedded in one model call
+    - Cache misses are searched with one multi-query vector-store call
+    - LLM calls run at most `concurrency` at a time (BATCH_LLM_CONCURRENCY);
+      each call also waits for the provider's rate limit (LLM_RATE_LIMITS)
+    """
+    if document_ids is not None and not document_ids:
+        for index, question in enumerate(questions):
+            yield {"index": index, "question": question, "answer": NO_MATCHING_DOCUMENTS,
+                   "cache": None, "usage": None}
+        return
+
+    embeddings = await asyncio.to_thread(embed_queries, questions)
+
+    to_search = []
+    for index, (question, query_embedding) in enumerate(zip(questions, embeddings)):
+        answer = _semantic_hit(query_embedding, document_ids)
+        if answer is not None:
+            yield {"index": index, "question": question, "answer": answer, "cache": "semantic", "usage": None}
+        else:
+            to_search.append(index)
+
+    candidate_lists = await asyncio.to_thread(
+        search_chunks_many,
+        [embeddings[i] for i in to_search],
+        _fetch_k(top_k),
+        document_ids,
+        [questions[i] for i in to_search]
+    )
+
+    semaphore = asyncio.Semaphore(concurrency or settings.BATCH_LLM_CONCURRENCY)
+
+    async def run(index, candidates):
+        question = questions[index]
+        try:
+            async with semaphore:
+                cached, cache_level, query_embedding, candidates, hits = await _select_hits(
+                    question, top_k, embeddings[index], candidates
+                )
+                if cached is not None:
+                    return {"index": index, "question": question, "answer": cached,
+                            "cache": cache_level, "usage": None}
+
+                answer, usage = await _generate(
+                    question, query_embedding, candidates, hits,
+                    scoped=document_ids is not None, throttle=True
+                )
+                return {"index": index, "question": question, "answer": answer, "cache": None, "usage": usage}
+        except Exception as e:
+            # One failed question must not sink the rest of the batch
+            return {"index": index, "question": question, "error": str(e)}
 
-    text = extract_text_from_pdf(pdf_file, is_bytes=True)
-    chunks = chunk_text(text)
-    return store_embeddings(chunks, document_id)
\ No newline at end of file
+    tasks = [asyncio.create_task(run(i, c)) for i, c in zip(to_search, candidate_lists)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away: don't keep spending LLM calls on it
+        for task in tasks:
+            task.cancel()
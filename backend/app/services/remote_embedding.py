@@ -0,0 +1,30 @@
+# remote_embedding.py
+import numpy as np
+import httpx
+
+
+class RemoteEmbeddingFunction:
+    """
+    Embeds through app.embedding_server, so N API processes share one copy
+    of the model (and its embedding cache) instead of loading one each.
+
+    - POST {base_url}/embed with {"texts": [...]}
+    - The response is the float32 matrix as raw bytes, shape given by the
+      X-Embedding-Dim header (no JSON float parsing on either side)
+    - Callable like the Chroma / ONNX embedding functions
+    """
+
+    def __init__(self, base_url, timeout=30.0):
+        self.client = httpx.Client(base_url=base_url.rstrip("/"), timeout=timeout)
+
+    def __call__(self, texts):
+        response = self.client.post("/embed", json={"texts": list(texts)})
+        response.raise_for_status()
+        dim = int(response.headers["X-Embedding-Dim"])
+        vectors = np.frombuffer(response.content, dtype="<f4").reshape(-1, dim)
+        if vectors.shape[0] != len(texts):
+            raise ValueError(f"Embedding server returned {vectors.shape[0]} vectors for {len(texts)} texts")
+        return list(vectors)
+
+    def close(self):
+        self.client.close()
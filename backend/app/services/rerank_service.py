@@ -0,0 +1,90 @@
+# rerank_service.py
+import time
+import logging
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "calls": 0,
+    "pairs_scored": 0,
+    "budget_exceeded": 0,
+    "total_ms": 0.0,
+    "max_ms": 0.0,
+}
+
+
+def _get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import CrossEncoder
+
+                kwargs = {}
+                if settings.RERANK_BACKEND.lower() == "onnx":
+                    # Quantized ONNX export shipped in the model repo
+                    kwargs = {"backend": "onnx", "model_kwargs": {"file_name": settings.RERANK_ONNX_FILE}}
+
+                _model = CrossEncoder(settings.RERANK_MODEL, max_length=settings.RERANK_MAX_LENGTH, **kwargs)
+    return _model
+
+
+def rerank(question, hits, top_k):
+    """
+    Re-orders retrieval hits with a cross-encoder and keeps the best top_k.
+
+    Candidates are scored in RERANK_BATCH_SIZE batches in retrieval order;
+    once RERANK_TIMEOUT_MS has elapsed no further batch is started and the
+    unscored candidates keep their retrieval order after the scored ones.
+    """
+    if not hits:
+        return hits
+
+    model = _get_model()
+    start = time.perf_counter()
+    deadline = start + settings.RERANK_TIMEOUT_MS / 1000
+    batch_size = max(1, settings.RERANK_BATCH_SIZE)
+
+    scored = []
+    budget_exceeded = False
+    for i in range(0, len(hits), batch_size):
+        if scored and time.perf_counter() >= deadline:
+            budget_exceeded = True
+            break
+
+        batch = hits[i:i + batch_size]
+        scores = model.predict([(question, hit["text"]) for hit in batch], batch_size=len(batch))
+        scored.extend(
+            {**hit, "rerank_score": float(score)} for hit, score in zip(batch, scores)
+        )
+
+    ranked = sorted(scored, key=lambda hit: hit["rerank_score"], reverse=True) + hits[len(scored):]
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["pairs_scored"] += len(scored)
+        _stats["budget_exceeded"] += int(budget_exceeded)
+        _stats["total_ms"] += elapsed_ms
+        _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+
+    if budget_exceeded:
+        logger.info("Rerank budget hit after %d/%d candidates (%.1f ms)", len(scored), len(hits), elapsed_ms)
+
+    return ranked[:top_k]
+
+
+def rerank_stats():
+    with _stats_lock:
+        calls = _stats["calls"]
+        return {
+            "enabled": settings.RERANK_ENABLED,
+            **_stats,
+            "avg_ms": _stats["total_ms"] / calls if calls else 0.0,
+        }
@@ -1,25 +1,86 @@
-import boto3
 from app.core.config import settings
+from app.core.container import lazy
+from app.core.metrics import stage
+
+
+def _create_s3_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+        # Set for MinIO / moto / LocalStack; None means AWS
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        config=Config(
+            # One pooled connection per concurrent multipart part
+            max_pool_connections=max(10, settings.S3_MAX_CONCURRENCY),
+            s3={"addressing_style": settings.S3_ADDRESSING_STYLE},
+        ),
+    )
+
+
+def _create_transfer_config():
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNK_SIZE,
+        max_concurrency=settings.S3_MAX_CONCURRENCY,
+        use_threads=True,
+    )
+
+
+# boto3 is imported and the client built on the first upload
+s3_client = lazy("s3", _create_s3_client)
+_transfer_config = lazy("s3_transfer_config", _create_transfer_config)
+
+
+def _object_exists(bucket, key):
+    from botocore.exceptions import ClientError
+
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        # Without s3:ListBucket, S3 answers a missing key with 403 rather than
+        # 404: upload anyway and let PutObject permissions decide
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound", "403", "Forbidden"):
+            return False
+        raise
 
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION,
-)
 
 def upload_to_s3(data, key, is_bytes=False):
+    """
+    Uploads a PDF and returns its s3:// URL.
+
+    - is_bytes: data is the file content, sent with a single put_object
+    - otherwise data is a file path, streamed from disk with a multipart
+      upload (S3_MULTIPART_CHUNK_SIZE parts, S3_MAX_CONCURRENCY in flight)
+      so the file is never held in memory. Keys are content-addressed, so
+      an object that already exists is not uploaded again.
+    """
     bucket = settings.AWS_BUCKET_NAME  # <-- use your env variable
 
     if is_bytes:
-        s3_client.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=data,
-            ContentType="application/pdf"
-        )
+        with stage("s3_put", bytes=len(data)):
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=data,
+                ContentType="application/pdf"
+            )
         return f"s3://{bucket}/{key}"
 
-    # fallback: uploading from file path (not used now)
-    with open(data, "rb") as f:
-        s3_client.upload_fileobj(f, bucket, key)
+    with stage("s3_put"):
+        if not _object_exists(bucket, key):
+            s3_client.upload_file(
+                data,
+                bucket,
+                key,
+                ExtraArgs={"ContentType": "application/pdf"},
+                Config=_transfer_config.instance()
+            )
+    return f"s3://{bucket}/{key}"
@@ -1,74 +1,658 @@
 import os
-import chromadb
-from chromadb.utils import embedding_functions
-from app.services.mongo_service import save_chunk
-
-# Chroma persistent storage
-CHROMA_DIR = os.path.join(os.getcwd(), ".chromadb")
-client = chromadb.PersistentClient(path=CHROMA_DIR)
-
-# Chroma collection
-collection = client.get_or_create_collection(
-    name="rag_collection",
-    metadata={"hnsw:space": "cosine"} 
+import asyncio
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+from app.core.container import lazy
+from app.core.index_writer import is_index_writer
+from app.core.metrics import stage
+from app.services.mongo_service import (
+    save_chunks, delete_chunks, bump_index_version, get_index_version, unready_document_ids
 )
+from app.services.embedding_cache import EmbeddingCache
+from app.services.answer_cache import answer_cache
+from app.services.query_cache import LRUCache, normalize_query
+from app.services.vector_store import create_vector_store
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from app.utils.token_utils import estimate_tokens
 
-# Local embedding model
-embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="all-MiniLM-L6-v2"
+logger = logging.getLogger(__name__)
+
+# Everything below is built on first use or by the startup warm-up (see main.py)
+
+# Vector index (Chroma HNSW, exact NumPy or FAISS; see VECTOR_BACKEND).
+# Only the index writer process opens the local backends for writing
+vector_store = lazy("vector_store", lambda: create_vector_store(read_only=not is_index_writer()))
+
+# BM25 inverted index kept alongside the vectors (always maintained;
+# HYBRID_SEARCH_ENABLED only controls whether queries use it)
+lexical_index = lazy(
+    "lexical_index",
+    lambda: LexicalIndex(
+        os.path.join(os.getcwd(), settings.LEXICAL_INDEX_DIR),
+        read_only=not is_index_writer()
+    )
 )
 
-def store_embeddings(chunks, document_id):
+
+def _create_embed_fn():
+    if settings.EMBED_SERVER_URL:
+        from app.services.remote_embedding import RemoteEmbeddingFunction
+
+        embed = RemoteEmbeddingFunction(settings.EMBED_SERVER_URL, timeout=settings.EMBED_SERVER_TIMEOUT_SECONDS)
+    elif settings.EMBED_BACKEND.lower() == "onnx":
+        from app.services.onnx_embedding import OnnxEmbeddingFunction
+
+        embed = OnnxEmbeddingFunction(
+            settings.EMBED_MODEL_NAME,
+            cache_dir=os.path.join(os.getcwd(), settings.EMBED_ONNX_DIR),
+            quantize=settings.EMBED_ONNX_QUANTIZE,
+            max_seq_tokens=settings.EMBED_MAX_SEQ_TOKENS,
+            threads=settings.EMBED_ONNX_THREADS
+        )
+    else:
+        # Imports chromadb / sentence-transformers / torch: only done here
+        from chromadb.utils import embedding_functions
+
+        embed = embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name=settings.EMBED_MODEL_NAME
+        )
+
+    # First inference allocates runtime buffers; pay for it before serving
+    embed(["warm-up"])
+    return embed
+
+
+# Local embedding model (PyTorch sentence-transformers or ONNX Runtime; see EMBED_BACKEND),
+# or a client of the shared embedding server when EMBED_SERVER_URL is set
+embed_fn = lazy("embedding_model", _create_embed_fn)
+
+# Cache entries are per model *and* runtime: int8 vectors differ slightly from fp32 ones
+_cache_model_key = settings.EMBED_MODEL_NAME
+if settings.EMBED_BACKEND.lower() == "onnx":
+    _cache_model_key += ":onnx-int8" if settings.EMBED_ONNX_QUANTIZE else ":onnx"
+
+# Content-addressed cache consulted before every model call
+# (with EMBED_SERVER_URL the server keeps it, next to the model)
+embedding_cache = None
+if settings.EMBED_CACHE_ENABLED and not settings.EMBED_SERVER_URL:
+    embedding_cache = lazy(
+        "embedding_cache",
+        lambda: EmbeddingCache(
+            os.path.join(os.getcwd(), settings.EMBED_CACHE_PATH),
+            settings.EMBED_CACHE_MAX_ENTRIES
+        )
+    )
+
+# In-process LRU caches for repeated questions: question -> embedding, and
+# question + scope + top_k -> hits (tagged with the collection version)
+query_embedding_cache = retrieval_cache = None
+if settings.QUERY_CACHE_ENABLED:
+    query_embedding_cache = LRUCache(settings.QUERY_EMBED_CACHE_MAX_ENTRIES)
+    retrieval_cache = LRUCache(settings.RETRIEVAL_CACHE_MAX_ENTRIES)
+
+# Bumped whenever the indexes change; cached hits from another version are never served
+_collection_version = 0
+_version_lock = threading.Lock()
+
+# All model calls run here, off the event loop and one batch at a time
+# (remote calls can overlap: the server queues them on its own model thread)
+_embed_executor = ThreadPoolExecutor(max_workers=4 if settings.EMBED_SERVER_URL else 1, thread_name_prefix="embed")
+
+
+# -------------------------------
+# Embedding service
+# -------------------------------
+def _token_batches(texts):
     """
-    - Saves chunk text into MongoDB (save_chunk)
-    - Generates embeddings
-    - Saves embeddings + chunk text + metadata into ChromaDB
+    Splits texts into batches bounded by EMBED_BATCH_TOKENS and EMBED_MAX_BATCH_SIZE.
+    """
+    batch, batch_tokens = [], 0
+    for text in texts:
+        tokens = min(estimate_tokens(text), settings.EMBED_MAX_SEQ_TOKENS)
+        if batch and (batch_tokens + tokens > settings.EMBED_BATCH_TOKENS
+                      or len(batch) >= settings.EMBED_MAX_BATCH_SIZE):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def _embed(texts):
+    """
+    Embeds texts, serving cached vectors and only running the model on misses.
+    Must run on _embed_executor.
+    """
+    if embedding_cache is None:
+        with stage("embed_batch", texts=len(texts)):
+            return embed_fn(texts)
+
+    vectors = embedding_cache.get_many(_cache_model_key, texts)
+    missing = [i for i, v in enumerate(vectors) if v is None]
+
+    if missing:
+        with stage("embed_batch", texts=len(missing)):
+            computed = embed_fn([texts[i] for i in missing])
+        embedding_cache.put_many(_cache_model_key, [texts[i] for i in missing], computed)
+        for i, vector in zip(missing, computed):
+            vectors[i] = vector
+
+    return vectors
+
+
+def embed_batches(texts):
+    """
+    Yields (batch_texts, batch_embeddings) for ingestion, one bounded batch at a time.
+    """
+    for batch in _token_batches(texts):
+        embeddings = _embed_executor.submit(_embed, batch).result()
+        if embeddings is None or len(embeddings) != len(batch):
+            raise ValueError("Embedding generation failed.")
+        yield batch, embeddings
+
+
+def embed_queries(queries):
+    queries = list(queries)
+    if query_embedding_cache is None:
+        return _embed_executor.submit(_embed, queries).result()
+
+    keys = [normalize_query(query) for query in queries]
+    vectors = [query_embedding_cache.get(key) for key in keys]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+        computed = _embed_executor.submit(_embed, [queries[i] for i in missing]).result()
+        for i, vector in zip(missing, computed):
+            vectors[i] = vector
+            query_embedding_cache.put(keys[i], vector)
+
+    return vectors
+
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into one model call.
+
+    Requests arriving within QUERY_BATCH_WINDOW_MS of the first pending one
+    (or until QUERY_MAX_BATCH_SIZE is reached) share a single batch.
+    """
+
+    def __init__(self, window_ms, max_batch_size):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._timer = None
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        # Identical questions in the same window are embedded once
+        unique_texts = list(dict.fromkeys(text for text, _ in pending))
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(_embed_executor, _embed, unique_texts)
+
+        def _resolve(done):
+            error = done.exception()
+            if error is None:
+                by_text = dict(zip(unique_texts, done.result()))
+            for text, future in pending:
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(by_text[text])
+
+        task.add_done_callback(_resolve)
+
+
+_query_batcher = QueryEmbeddingBatcher(settings.QUERY_BATCH_WINDOW_MS, settings.QUERY_MAX_BATCH_SIZE)
+
+
+def embedding_cache_stats():
+    if embedding_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_cache.stats()}
+
+
+def query_cache_stats():
+    if retrieval_cache is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "collection_version": _collection_version,
+        "embeddings": query_embedding_cache.stats(),
+        "retrieval": retrieval_cache.stats(),
+    }
+
+
+# -------------------------------
+# Collection version
+# -------------------------------
+def collection_version():
+    return _collection_version
+
+
+def _bump_collection_version():
+    global _collection_version
+    with _version_lock:
+        _collection_version += 1
+
+
+@contextmanager
+def _indexes_changing():
+    """
+    Wraps a write to the indexes: the version is bumped before (hits cached
+    from the old contents stop being served) and after (hits cached from a
+    half-written state are dropped), then published to Mongo so the other
+    API processes drop theirs (see _refresh_loop).
+    """
+    _bump_collection_version()
+    try:
+        yield
+    finally:
+        _bump_collection_version()
+    bump_index_version()
+
+
+# -------------------------------
+# Storage
+# -------------------------------
+def chunk_id(document_id, index):
+    """Deterministic vector / lexical id of a chunk: re-ingesting overwrites it."""
+    return f"{document_id}_{index}"
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def store_embeddings(chunks, document_id, start_index=0, pages=None, existing_hashes=None):
+    """
+    - Generates embeddings in token-bounded batches
+    - Upserts embeddings + chunk text + metadata into the vector store and
+      the BM25 index batch by batch (ids from chunk_id, so re-runs overwrite)
+    - Then saves the chunk rows into MongoDB (save_chunks, batched insert_many)
+
+    start_index / pages let callers store a document in several calls
+    (see process_document); pages holds the source page of each chunk.
+
+    existing_hashes ({index: hash} from get_chunk_hashes) skips chunks whose
+    text is unchanged at their index. Mongo rows are written last, so a row
+    with a hash means the chunk is in every index: after a crash the rows
+    are the checkpoint and a re-run only redoes what is missing.
     """
     if not chunks:
         raise ValueError("store_embeddings() received no chunks.")
 
-    clean_chunks = [c.strip() for c in chunks if c.strip()]
-    if not clean_chunks:
+    if pages is None:
+        pages = [None] * len(chunks)
+
+    kept = [(c.strip(), p) for c, p in zip(chunks, pages) if c.strip()]
+    if not kept:
         raise ValueError("All chunks are empty after cleaning.")
 
-    # 1️⃣ SAVE CHUNKS TO MONGO
-    for i, chunk in enumerate(clean_chunks):
-        save_chunk(document_id, i, chunk)
+    clean_chunks = [c for c, _ in kept]
+    clean_pages = [p for _, p in kept]
+    hashes = [chunk_hash(c) for c in clean_chunks]
 
-    # 2️⃣ PREPARE IDs FOR CHROMA
-    ids = [f"{document_id}_{i}" for i in range(len(clean_chunks))]
+    existing_hashes = existing_hashes or {}
+    todo = [
+        i for i in range(len(clean_chunks))
+        if existing_hashes.get(start_index + i) != hashes[i]
+    ]
+    if not todo:
+        return len(clean_chunks)
 
-    # 3️⃣ GENERATE EMBEDDINGS
-    embeddings = embed_fn(clean_chunks)
-    if embeddings is None or len(embeddings) != len(clean_chunks):
-        raise ValueError("Embedding generation failed.")
+    # 1️⃣ GENERATE EMBEDDINGS + 2️⃣ UPSERT INTO THE VECTOR / BM25 INDEXES, one batch at a time
+    position = 0
+    for batch, embeddings in embed_batches([clean_chunks[i] for i in todo]):
+        positions = todo[position:position + len(batch)]
+        position += len(batch)
 
-    # 4️⃣ STORE INTO CHROMADB
-    collection.add(
-        ids=ids,
-        documents=clean_chunks,
-        embeddings=embeddings,
-        metadatas=[{"document_id": document_id} for _ in clean_chunks]
-    )
+        ids, metadatas = [], []
+        for i in positions:
+            metadata = {"document_id": document_id, "index": start_index + i, "hash": hashes[i]}
+            if clean_pages[i] is not None:
+                metadata["page"] = clean_pages[i]
+            ids.append(chunk_id(document_id, start_index + i))
+            metadatas.append(metadata)
+
+        with _indexes_changing():
+            with stage("vector_add", chunks=len(batch)):
+                vector_store.upsert(
+                    ids=ids,
+                    documents=batch,
+                    embeddings=embeddings,
+                    metadatas=metadatas
+                )
+            with stage("lexical_add", chunks=len(batch)):
+                lexical_index.upsert(ids, batch, document_id)
+
+    with stage("index_flush"), _indexes_changing():
+        vector_store.flush()
+        lexical_index.flush()
+
+    # 3️⃣ SAVE CHUNKS TO MONGO (replacing rows whose text changed)
+    with stage("mongo_write", chunks=len(todo)):
+        replaced = [start_index + i for i in todo if start_index + i in existing_hashes]
+        if replaced:
+            delete_chunks(document_id, indexes=replaced)
+        save_chunks(
+            document_id,
+            [clean_chunks[i] for i in todo],
+            pages=[clean_pages[i] for i in todo] if any(p is not None for p in clean_pages) else None,
+            hashes=[hashes[i] for i in todo],
+            indexes=[start_index + i for i in todo]
+        )
 
     return len(clean_chunks)
 
 
-def get_similar_chunks(query, top_k=4):
+def delete_stale_chunks(document_id, chunk_count, existing_hashes):
+    """
+    Removes chunks at index >= chunk_count (left over from a longer previous
+    version of the document) from Mongo and both indexes.
+    """
+    stale = [index for index in existing_hashes if index >= chunk_count]
+    if not stale:
+        return 0
+
+    ids = [chunk_id(document_id, index) for index in stale]
+    with _indexes_changing():
+        vector_store.delete(ids)
+        lexical_index.delete(ids)
+        vector_store.flush()
+        lexical_index.flush()
+    delete_chunks(document_id, from_index=chunk_count)
+    return len(stale)
+
+
+def delete_document_chunks(document_id):
+    """Removes every chunk of a document from both indexes and Mongo."""
+    with _indexes_changing():
+        vector_store.delete_document(document_id)
+        lexical_index.delete_document(document_id)
+        vector_store.flush()
+        lexical_index.flush()
+    return delete_chunks(document_id)
+
+
+# -------------------------------
+# Reader processes: follow the index writer
+# -------------------------------
+_refresh_stop = threading.Event()
+_refresh_thread = None
+
+
+def refresh_indexes():
+    """Loads what the writer process appended to the local indexes (no-op in the writer)."""
+    for index in (vector_store, lexical_index):
+        if index.initialized:
+            index.refresh()
+
+
+def _refresh_loop():
+    seen = None
+    while not _refresh_stop.wait(settings.INDEX_REFRESH_SECONDS):
+        try:
+            # Version first: the writer publishes it after flushing, so the
+            # files read next hold at least everything it covers
+            version = get_index_version()
+            refresh_indexes()
+            if version != seen:
+                _bump_collection_version()
+                # Only the writer knows which documents changed: a re-ingest
+                # keeps chunk ids, so cached answers could outlive their chunks
+                answer_cache.clear()
+                seen = version
+        except Exception:
+            logger.exception("Index refresh failed")
+
+
+def start_index_refresh():
+    global _refresh_thread
+    if is_index_writer() or _refresh_thread is not None:
+        return
+    _refresh_stop.clear()
+    _refresh_thread = threading.Thread(target=_refresh_loop, name="index-refresh", daemon=True)
+    _refresh_thread.start()
+
+
+def stop_index_refresh():
+    global _refresh_thread
+    _refresh_stop.set()
+    if _refresh_thread is not None:
+        _refresh_thread.join()
+        _refresh_thread = None
+
+
+# -------------------------------
+# Retrieval
+# -------------------------------
+def document_filter(document_ids, excluded=()):
+    """
+    Builds the vector-store `where` filter scoping a search to document_ids,
+    or, for an unscoped search, leaving out the excluded documents.
+    """
+    if document_ids is None:
+        return {"document_id": {"$nin": list(excluded)}} if excluded else None
+    if len(document_ids) == 1:
+        return {"document_id": document_ids[0]}
+    return {"document_id": {"$in": list(document_ids)}}
+
+
+def _hit(chunk_id, text, metadata, distance, score=None):
+    index = metadata.get("index")
+    if index is None:
+        # Chunks stored before the index was kept in metadata: ids are "<document_id>_<index>"
+        suffix = chunk_id.rpartition("_")[2]
+        index = int(suffix) if suffix.isdigit() else None
+
+    return {
+        "id": chunk_id,
+        "text": text,
+        "document_id": metadata.get("document_id"),
+        "index": index,
+        "page": metadata.get("page"),
+        "distance": distance,
+        "score": score,
+    }
+
+
+def _excluded_documents(document_ids):
+    """
+    Documents an unscoped search leaves out (see unready_document_ids);
+    scoped searches were already resolved to ready documents.
+    """
+    return () if document_ids is not None else tuple(unready_document_ids())
+
+
+def _retrieval_key(query_text, top_k, document_ids, excluded):
+    scope = None if document_ids is None else tuple(sorted(set(document_ids)))
+    return normalize_query(query_text), top_k, scope, excluded
+
+
+def search_chunks_many(query_embeddings, top_k=4, document_ids=None, query_texts=None):
+    """
+    search_chunks for several queries at once: one multi-query vector-store
+    call (and one get() for BM25-only hits) instead of one per question.
+    Returns one hit list per query embedding.
+
+    With query_texts, hits are served from / stored in the retrieval cache
+    (valid until the next collection version) and only misses are searched.
+    """
+    if not query_embeddings:
+        return []
+    excluded = _excluded_documents(document_ids)
+    if retrieval_cache is None or not query_texts:
+        return _search_many(query_embeddings, top_k, document_ids, query_texts, excluded)
+
+    version = _collection_version
+    keys = [_retrieval_key(text, top_k, document_ids, excluded) for text in query_texts]
+    results = [retrieval_cache.get(key, version) for key in keys]
+    missing = [i for i, hits in enumerate(results) if hits is None]
+
+    if missing:
+        searched = _search_many(
+            [query_embeddings[i] for i in missing], top_k, document_ids, [query_texts[i] for i in missing], excluded
+        )
+        for i, hits in zip(missing, searched):
+            results[i] = hits
+            retrieval_cache.put(keys[i], hits, version)
+
+    return [list(hits) for hits in results]
+
+
+def _search_many(query_embeddings, top_k, document_ids, query_texts, excluded=()):
+    where = document_filter(document_ids, excluded)
+
+    if not (settings.HYBRID_SEARCH_ENABLED and query_texts):
+        with stage("vector_query", queries=len(query_embeddings)):
+            dense_lists = vector_store.query(list(query_embeddings), top_k, where=where)
+        return [
+            [_hit(h["id"], h["text"], h["metadata"], h["distance"]) for h in hits]
+            for hits in dense_lists
+        ]
+
+    candidates = max(top_k, settings.HYBRID_CANDIDATES)
+    with stage("vector_query", queries=len(query_embeddings)):
+        dense_lists = vector_store.query(list(query_embeddings), candidates, where=where)
+
+    fused_lists, dense_maps = [], []
+    for dense, query_text in zip(dense_lists, query_texts):
+        with stage("lexical_search"):
+            lexical = lexical_index.search(
+                query_text, candidates, document_ids=document_ids, excluded_document_ids=excluded
+            )
+        fused_lists.append(reciprocal_rank_fusion(
+            [[h["id"] for h in dense], [chunk_id for chunk_id, _, _ in lexical]],
+            k=settings.RRF_K
+        )[:top_k])
+        # Per query: the same chunk has a different distance for each question
+        dense_maps.append({h["id"]: h for h in dense})
+
+    missing = list({
+        chunk_id
+        for fused, dense_map in zip(fused_lists, dense_maps)
+        for chunk_id, _ in fused
+        if chunk_id not in dense_map
+    })
+    fetched = vector_store.get(missing) if missing else {}
+
+    results = []
+    for fused, dense_map in zip(fused_lists, dense_maps):
+        hits = []
+        for chunk_id, score in fused:
+            found = dense_map.get(chunk_id) or fetched.get(chunk_id)
+            if found is not None:
+                hits.append(_hit(chunk_id, found["text"], found["metadata"], found.get("distance"), score))
+        results.append(hits)
+    return results
+
+
+def search_chunks(query_embedding, top_k=4, document_ids=None, query_text=None):
+    """
+    Returns the top-k hits for an embedding as dicts
+    (id, text, document_id, index, page, distance, score).
+    document_ids scopes the search (pushed down as a vector-store filter);
+    unscoped searches skip documents that aren't ready (unready_document_ids).
+
+    With HYBRID_SEARCH_ENABLED and query_text, dense and BM25 candidates are
+    fused with reciprocal-rank fusion; score is then the fused score.
+    """
+    return search_chunks_many(
+        [query_embedding], top_k, document_ids,
+        query_texts=[query_text] if query_text else None
+    )[0]
+
+
+def get_similar_chunks(query, top_k=4, document_ids=None):
     """
     Returns the top-k most similar chunk texts for a query.
     """
     if not query or not query.strip():
         return []
 
-    query_embedding = embed_fn([query])[0]
+    query_embedding = embed_queries([query])[0]
+    return [hit["text"] for hit in search_chunks(query_embedding, top_k, document_ids, query_text=query)]
 
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=top_k,
-    )
 
-    if "documents" not in results or not results["documents"]:
+async def embed_query_async(query):
+    """
+    Embeds one query: from the query embedding cache, or coalesced with
+    other in-flight queries.
+    """
+    if query_embedding_cache is None:
+        return await _query_batcher.embed(query)
+
+    key = normalize_query(query)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        vector = await _query_batcher.embed(query)
+        query_embedding_cache.put(key, vector)
+    return vector
+
+
+async def embed_texts_async(texts):
+    """
+    Embeds texts off the event loop: up to QUERY_MAX_BATCH_SIZE texts are
+    coalesced with other in-flight queries, longer lists run as one batch.
+    """
+    if len(texts) <= settings.QUERY_MAX_BATCH_SIZE:
+        return await asyncio.gather(*(_query_batcher.embed(text) for text in texts))
+    return await asyncio.get_running_loop().run_in_executor(_embed_executor, _embed, list(texts))
+
+
+async def search_chunks_async(query_embedding, top_k=4, document_ids=None, query_text=None):
+    if retrieval_cache is None or not query_text:
+        return await asyncio.to_thread(search_chunks, query_embedding, top_k, document_ids, query_text)
+
+    # Cache hits are answered on the event loop; unscoped queries first look
+    # up the documents to leave out
+    excluded = () if document_ids is not None else await asyncio.to_thread(_excluded_documents, None)
+    key = _retrieval_key(query_text, top_k, document_ids, excluded)
+    version = _collection_version
+    hits = retrieval_cache.get(key, version)
+    if hits is None:
+        hits = (await asyncio.to_thread(
+            _search_many, [query_embedding], top_k, document_ids, [query_text], excluded
+        ))[0]
+        retrieval_cache.put(key, hits, version)
+    return list(hits)
+
+
+async def get_similar_chunks_async(query, top_k=4, document_ids=None):
+    """
+    Async variant for request handlers: the query embedding is coalesced with
+    other in-flight queries and the vector search runs in a worker thread.
+    """
+    if not query or not query.strip():
         return []
 
-    return results["documents"][0]
+    query_embedding = await embed_query_async(query)
+    hits = await search_chunks_async(query_embedding, top_k, document_ids, query_text=query)
+    return [hit["text"] for hit in hits]
@@ -0,0 +1,838 @@
+# vector_store.py
+import os
+import json
+import threading
+import numpy as np
+
+from app.core.config import settings
+
+
+def _unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def matches_where(metadata, where):
+    """
+    Evaluates the subset of Chroma's `where` syntax the local backends support:
+    {"key": value}, {"key": {"$eq"|"$ne"|"$in"|"$nin"|"$gt"|"$gte"|"$lt"|"$lte": v}},
+    {"$and": [...]}, {"$or": [...]}.
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_where(metadata, c) for c in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op == "$in" and value not in expected:
+                return False
+            if op == "$nin" and value in expected:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > expected:
+                    return False
+                if op == "$gte" and not value >= expected:
+                    return False
+                if op == "$lt" and not value < expected:
+                    return False
+                if op == "$lte" and not value <= expected:
+                    return False
+
+    return True
+
+
+class VectorStore:
+    """
+    Interface shared by the vector backends.
+
+    query() returns, for each query embedding, a list of hits:
+    {"id", "text", "metadata", "distance"} where distance is cosine distance.
+    """
+
+    def add(self, ids, embeddings, documents, metadatas):
+        raise NotImplementedError
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        """add() that replaces rows whose id already exists."""
+        self.delete(ids)
+        self.add(ids, embeddings, documents, metadatas)
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def delete_document(self, document_id):
+        """Deletes every row whose metadata document_id matches."""
+        raise NotImplementedError
+
+    def query(self, query_embeddings, top_k, where=None):
+        raise NotImplementedError
+
+    def get(self, ids):
+        """Returns {id: {"id", "text", "metadata"}} for the ids that exist."""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def flush(self):
+        """Persists buffered state; called after each ingestion batch."""
+
+    def refresh(self):
+        """
+        Picks up rows another process wrote since the last call (read-only
+        stores in multi-worker deployments). No-op for server-backed stores.
+        """
+
+
+# -------------------------------
+# Chroma (HNSW)
+# -------------------------------
+class ChromaVectorStore(VectorStore):
+    """
+    Chroma collection with tunable HNSW parameters, either embedded
+    (PersistentClient in `path`) or on a Chroma server (HttpClient, when
+    host is set) shared by every API process.
+
+    M and ef_construction are fixed when the collection is created;
+    ef_search is applied to existing collections on startup.
+    """
+
+    def __init__(self, path, collection_name, m, ef_construction, ef_search, host=None, port=8000, ssl=False):
+        import chromadb
+
+        if host:
+            self.client = chromadb.HttpClient(host=host, port=port, ssl=ssl)
+        else:
+            self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            metadata={
+                "hnsw:space": "cosine",
+                "hnsw:M": m,
+                "hnsw:construction_ef": ef_construction,
+                "hnsw:search_ef": ef_search,
+            }
+        )
+
+        hnsw = (self.collection.configuration or {}).get("hnsw") or {}
+        if hnsw.get("ef_search") not in (None, ef_search):
+            self.collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.add(
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas
+        )
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas
+        )
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def delete_document(self, document_id):
+        self.collection.delete(where={"document_id": document_id})
+
+    def query(self, query_embeddings, top_k, where=None):
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            where=where or None,
+        )
+
+        if "documents" not in results or not results["documents"]:
+            return [[] for _ in query_embeddings]
+
+        return [
+            [
+                {"id": chunk_id, "text": text, "metadata": metadata or {}, "distance": distance}
+                for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                results["ids"],
+                results["documents"],
+                results["metadatas"],
+                results["distances"],
+            )
+        ]
+
+    def get(self, ids):
+        results = self.collection.get(ids=list(ids), include=["documents", "metadatas"])
+        return {
+            chunk_id: {"id": chunk_id, "text": text, "metadata": metadata or {}}
+            for chunk_id, text, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+        }
+
+    def count(self):
+        return self.collection.count()
+
+
+# -------------------------------
+# Exact search over a memory-mapped matrix
+# -------------------------------
+class NumpyVectorStore(VectorStore):
+    """
+    Brute-force cosine search over a memory-mapped float32/float16/int8 matrix.
+    Exact for float32; intended for small and medium corpora.
+
+    Rows are partitioned by document_id, so searches scoped to a few
+    documents only scan those documents' rows.
+
+    float16/int8 shrink the scanned matrix 2x/4x. With rescore_factor > 0 a
+    float32 copy is also kept on disk (memory-mapped, only the candidate
+    rows are read): the compact matrix picks top_k * rescore_factor
+    candidates and the float32 rows rank them exactly.
+
+    Files in `path`:
+    - vectors.bin     raw row-major matrix of unit vectors (append-only)
+    - scales.bin      per-row float32 dequantization scale (int8 only)
+    - vectors_f32.bin float32 copy for rescoring (float16/int8 with rescoring)
+    - records.jsonl   one {"id", "text", "metadata"} line per row (append-only)
+    - tombstones.txt  deleted row numbers, one per line (append-only)
+    - meta.json       dimension, dtype and whether the float32 copy exists
+
+    delete() only tombstones rows: they stay in the files but are never
+    returned again; upsert() tombstones the old row and appends a new one.
+
+    With read_only=True (reader processes) the files are never written or
+    repaired; refresh() reads whatever the writer appended since.
+    """
+
+    def __init__(self, path, dtype="float32", rescore_factor=0, read_only=False):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.rescore_factor = rescore_factor
+        self.read_only = read_only
+        self._vectors_path = os.path.join(path, "vectors.bin")
+        self._scales_path = os.path.join(path, "scales.bin")
+        self._full_path = os.path.join(path, "vectors_f32.bin")
+        self._records_path = os.path.join(path, "records.jsonl")
+        self._tombstones_path = os.path.join(path, "tombstones.txt")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock = threading.Lock()
+
+        self.dim = None
+        self.keep_full = self.dtype != np.float32 and rescore_factor > 0
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._matrix = self._scales = self._full = None
+        self._deleted = set()
+        self._deleted_rows = np.zeros(0, dtype=np.int64)
+        self._rows_by_document = {}
+        self._row_by_id = {}
+
+        if read_only:
+            # Byte offsets of what refresh() has consumed so far
+            self._records_offset = self._tombstones_offset = 0
+            self._read_appended()
+            return
+
+        self._load_meta()
+        if os.path.exists(self._records_path):
+            with open(self._records_path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._ids.append(record["id"])
+                    self._texts.append(record["text"])
+                    self._metadatas.append(record["metadata"])
+
+        self._repair()
+        self._remap()
+
+        if os.path.exists(self._tombstones_path):
+            with open(self._tombstones_path) as f:
+                self._deleted = {int(line) for line in f if line.strip()}
+            # Rows dropped by _repair can't be tombstoned
+            self._deleted = {row for row in self._deleted if row < len(self._ids)}
+        self._deleted_rows = np.array(sorted(self._deleted), dtype=np.int64)
+
+        self._index_partitions(0)
+
+    def _load_meta(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        # Layout is fixed at creation; rescoring needs the float32 copy
+        self.keep_full = meta.get("full", False)
+
+    def _row_files(self):
+        """[(path, dtype, row width)] of every per-row binary file."""
+        files = [(self._vectors_path, self.dtype, self.dim)]
+        if self.dtype == np.int8:
+            files.append((self._scales_path, np.dtype(np.float32), 1))
+        if self.keep_full:
+            files.append((self._full_path, np.dtype(np.float32), self.dim))
+        return files
+
+    def _repair(self):
+        """
+        Truncates all files to the rows they have in common, so a crash
+        between the appends can't misalign later rows.
+        """
+        if self.dim is None:
+            return
+
+        rows = len(self._ids)
+        for file_path, dtype, width in self._row_files():
+            file_rows = os.path.getsize(file_path) // (width * dtype.itemsize) if os.path.exists(file_path) else 0
+            rows = min(rows, file_rows)
+
+        for file_path, dtype, width in self._row_files():
+            size = rows * width * dtype.itemsize
+            if os.path.exists(file_path) and os.path.getsize(file_path) != size:
+                with open(file_path, "r+b") as f:
+                    f.truncate(size)
+
+        if len(self._ids) > rows:
+            del self._ids[rows:], self._texts[rows:], self._metadatas[rows:]
+            with open(self._records_path, "w") as f:
+                for chunk_id, text, metadata in zip(self._ids, self._texts, self._metadatas):
+                    f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata}) + "\n")
+
+    def _file_rows(self):
+        """Rows present in every per-row binary file."""
+        return min(
+            os.path.getsize(file_path) // (width * dtype.itemsize) if os.path.exists(file_path) else 0
+            for file_path, dtype, width in self._row_files()
+        )
+
+    def refresh(self):
+        if self.read_only:
+            with self._lock:
+                self._read_appended()
+
+    def _read_appended(self):
+        """
+        Reads the rows and tombstones the writer appended since the last
+        call. add() writes records.jsonl before the binary files, so a row
+        counts once every binary file has it; tombstone lines are only read
+        up to the size seen *before* the rows, so they never name a row this
+        reader hasn't loaded yet.
+        """
+        tombstones_size = os.path.getsize(self._tombstones_path) if os.path.exists(self._tombstones_path) else 0
+
+        if self.dim is None:
+            try:
+                self._load_meta()
+            except ValueError:
+                return  # meta.json is being written
+            if self.dim is None:
+                return
+
+        start = len(self._ids)
+        rows = self._file_rows()
+        if rows > start:
+            with open(self._records_path, "rb") as f:
+                f.seek(self._records_offset)
+                for _ in range(rows - start):
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    record = json.loads(line)
+                    self._ids.append(record["id"])
+                    self._texts.append(record["text"])
+                    self._metadatas.append(record["metadata"])
+                    self._records_offset += len(line)
+            self._index_partitions(start)
+            self._remap()
+
+        if tombstones_size > self._tombstones_offset:
+            with open(self._tombstones_path, "rb") as f:
+                f.seek(self._tombstones_offset)
+                data = f.read(tombstones_size - self._tombstones_offset)
+            data = data[:data.rfind(b"\n") + 1]
+            self._tombstones_offset += len(data)
+            self._forget_rows([row for row in map(int, data.split()) if row < len(self._ids)])
+
+    def _index_partitions(self, start):
+        for row in range(start, len(self._metadatas)):
+            if row in self._deleted:
+                continue
+            document_id = self._metadatas[row].get("document_id")
+            self._rows_by_document.setdefault(document_id, []).append(row)
+            self._row_by_id[self._ids[row]] = row
+
+    def _remap(self):
+        rows = len(self._ids)
+        if not rows:
+            self._matrix = self._scales = self._full = None
+            return
+
+        self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        if self.dtype == np.int8:
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(rows,))
+        if self.keep_full:
+            self._full = np.memmap(self._full_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def _encode(self, vectors):
+        """Returns (stored rows, per-row scales or None) in the store's dtype."""
+        if self.dtype != np.int8:
+            return vectors.astype(self.dtype), None
+
+        # Symmetric per-row quantization: the largest component maps to +/-127
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("This vector store is read-only (another process is the index writer)")
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self._check_writable()
+        vectors = _unit_rows(embeddings)
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._meta_path, "w") as f:
+                    json.dump({"dim": self.dim, "dtype": self.dtype.name, "full": self.keep_full}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} != store dimension {self.dim}")
+
+            codes, scales = self._encode(vectors)
+
+            with open(self._records_path, "a") as f:
+                for chunk_id, text, metadata in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata}) + "\n")
+            with open(self._vectors_path, "ab") as f:
+                f.write(codes.tobytes())
+            if scales is not None:
+                with open(self._scales_path, "ab") as f:
+                    f.write(scales.tobytes())
+            if self.keep_full:
+                with open(self._full_path, "ab") as f:
+                    f.write(vectors.tobytes())
+
+            start = len(self._ids)
+            self._ids.extend(ids)
+            self._texts.extend(documents)
+            self._metadatas.extend(metadatas)
+            self._index_partitions(start)
+            self._remap()
+
+    def delete(self, ids):
+        self._check_writable()
+        with self._lock:
+            rows = [self._row_by_id[chunk_id] for chunk_id in ids if chunk_id in self._row_by_id]
+            if not rows:
+                return
+
+            with open(self._tombstones_path, "a") as f:
+                f.write("".join(f"{row}\n" for row in rows))
+            self._forget_rows(rows)
+
+    def _forget_rows(self, rows):
+        dead = set(rows) - self._deleted
+        if not dead:
+            return
+
+        for row in dead:
+            if self._row_by_id.get(self._ids[row]) == row:
+                del self._row_by_id[self._ids[row]]
+        self._deleted |= dead
+        for document_id in {self._metadatas[row].get("document_id") for row in dead}:
+            self._rows_by_document[document_id] = [
+                row for row in self._rows_by_document.get(document_id, ()) if row not in dead
+            ]
+        self._deleted_rows = np.array(sorted(self._deleted), dtype=np.int64)
+
+    def delete_document(self, document_id):
+        rows = self._rows_by_document.get(document_id, ())
+        self.delete([self._ids[row] for row in rows])
+
+    def _excluded_rows(self, where):
+        """Rows a {"document_id": {"$nin": [...]}} filter leaves out, or None for any other filter."""
+        condition = where.get("document_id") if list(where) == ["document_id"] else None
+        if not isinstance(condition, dict) or list(condition) != ["$nin"]:
+            return None
+        return {row for document_id in condition["$nin"] for row in self._rows_by_document.get(document_id, ())}
+
+    def _candidate_rows(self, where, row_count):
+        if not where:
+            return None
+
+        # Fast path: document-scoped search reads the partitions directly
+        if list(where) == ["document_id"]:
+            condition = where["document_id"]
+            if not isinstance(condition, dict):
+                condition = {"$in": [condition]}
+            elif list(condition) == ["$eq"]:
+                condition = {"$in": [condition["$eq"]]}
+
+            if list(condition) == ["$in"]:
+                rows = [
+                    row
+                    for document_id in dict.fromkeys(condition["$in"])
+                    for row in self._rows_by_document.get(document_id, ())
+                    if row < row_count
+                ]
+                return np.array(sorted(rows), dtype=np.int64)
+
+        # Unscoped search leaving a few documents out: everything but their partitions
+        excluded = self._excluded_rows(where)
+        if excluded is not None:
+            keep = np.ones(row_count, dtype=bool)
+            keep[[row for row in excluded | self._deleted if row < row_count]] = False
+            return np.flatnonzero(keep)
+
+        deleted = self._deleted
+        return np.fromiter(
+            (
+                i for i, metadata in enumerate(self._metadatas[:row_count])
+                if i not in deleted and matches_where(metadata, where)
+            ),
+            dtype=np.int64
+        )
+
+    @staticmethod
+    def _scores(matrix, scales, rows, queries, block_rows=65536):
+        """
+        (n_rows, n_queries) cosine scores over `rows` of matrix (all rows when
+        None), computed in float32 blocks for float16/int8 storage.
+        """
+        if matrix.dtype == np.float32:
+            searched = matrix if rows is None else matrix[rows]
+            return searched @ queries.T
+
+        n_rows = matrix.shape[0] if rows is None else len(rows)
+        scores = np.empty((n_rows, queries.shape[0]), dtype=np.float32)
+        for start in range(0, n_rows, block_rows):
+            selected = slice(start, start + block_rows) if rows is None else rows[start:start + block_rows]
+            block = np.asarray(matrix[selected], dtype=np.float32)
+            block_scores = block @ queries.T
+            if scales is not None:
+                block_scores *= np.asarray(scales[selected])[:, None]
+            scores[start:start + block_rows] = block_scores
+        return scores
+
+    def _hit(self, row, score):
+        return {
+            "id": self._ids[row],
+            "text": self._texts[row],
+            "metadata": self._metadatas[row],
+            "distance": float(1.0 - score),
+        }
+
+    def query(self, query_embeddings, top_k, where=None):
+        # Snapshot: add() / delete() swap in new maps
+        matrix, scales, full, deleted_rows = self._matrix, self._scales, self._full, self._deleted_rows
+        if matrix is None:
+            return [[] for _ in query_embeddings]
+
+        rows = self._candidate_rows(where, matrix.shape[0])
+        if rows is not None and len(rows) == 0:
+            return [[] for _ in query_embeddings]
+
+        queries = _unit_rows(query_embeddings)
+        scores = self._scores(matrix, scales, rows, queries)
+
+        live = scores.shape[0]
+        if rows is None and len(deleted_rows):
+            # Unfiltered scans cover tombstoned rows too: push them to the bottom
+            deleted_rows = deleted_rows[deleted_rows < scores.shape[0]]
+            scores[deleted_rows] = -np.inf
+            live -= len(deleted_rows)
+
+        k = min(top_k, live)
+        if k < 1:
+            return [[] for _ in query_embeddings]
+
+        rescore = full is not None and self.rescore_factor > 0
+        n_candidates = min(k * self.rescore_factor, live) if rescore else k
+
+        results = []
+        for q in range(scores.shape[1]):
+            column = scores[:, q]
+            top = np.argpartition(-column, n_candidates - 1)[:n_candidates]
+            absolute = top if rows is None else rows[top]
+
+            if rescore:
+                # Exact float32 scores for the candidates only
+                column = np.asarray(full[absolute], dtype=np.float32) @ queries[q]
+                order = np.argsort(-column)[:k]
+            else:
+                column = column[top]
+                order = np.argsort(-column)
+
+            results.append([self._hit(int(absolute[i]), column[i]) for i in order])
+        return results
+
+    def get(self, ids):
+        found = {}
+        for chunk_id in ids:
+            row = self._row_by_id.get(chunk_id)
+            if row is not None:
+                found[chunk_id] = {"id": chunk_id, "text": self._texts[row], "metadata": self._metadatas[row]}
+        return found
+
+    def count(self):
+        return 0 if self._matrix is None else self._matrix.shape[0] - len(self._deleted)
+
+
+# -------------------------------
+# FAISS (optional dependency)
+# -------------------------------
+class FaissVectorStore(NumpyVectorStore):
+    """
+    FAISS HNSW or IVF index on top of the float32 memory-mapped matrix.
+
+    The matrix stays the source of truth: the index is rebuilt or topped up
+    from it on startup, and IVF falls back to exact search until enough
+    vectors exist to train it.
+
+    flush() writes the index to a new versioned file, then publishes it by
+    atomically replacing faiss_<type>.json ({"version", "file", "rows"}).
+    A process only loads the file the manifest names, and only if it holds
+    no more rows than the process has loaded from the matrix: a reader
+    never pairs an index with records it hasn't read. The previous version's
+    file is kept for readers that read the manifest just before the switch.
+    """
+
+    def __init__(self, path, index_type, m, ef_construction, ef_search, nlist, nprobe, read_only=False):
+        try:
+            import faiss
+        except ImportError as e:
+            raise ImportError("VECTOR_BACKEND=faiss requires the faiss-cpu package") from e
+
+        super().__init__(path, dtype="float32", read_only=read_only)
+        self.faiss = faiss
+        self.index_type = index_type
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._manifest_path = os.path.join(path, f"faiss_{index_type}.json")
+        self._index_version = 0
+        self._published_rows = None  # rows in the published file, if self.index came from it
+
+        self.index = self._load_index()
+        self._sync_index()
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _load_index(self, attempts=3):
+        """The published index, or None when there is none this process can use."""
+        for _ in range(attempts):
+            manifest = self._read_manifest()
+            if manifest is None:
+                return None
+            self._index_version = manifest["version"]
+
+            if self.read_only and manifest["rows"] > self._matrix_rows():
+                # The writer appended and flushed since __init__ read the files
+                self._read_appended()
+            if manifest["rows"] > self._matrix_rows():
+                # Rows the matrix doesn't have (a crash truncated them): rebuild
+                return None
+
+            try:
+                index = self.faiss.read_index(os.path.join(self.path, manifest["file"]))
+            except RuntimeError:
+                continue  # that version was removed meanwhile: read the manifest again
+            if index.ntotal != manifest["rows"]:
+                return None
+            self._configure(index)
+            self._published_rows = index.ntotal
+            return index
+        return None
+
+    def _matrix_rows(self):
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    def _configure(self, index):
+        if self.index_type == "hnsw":
+            index.hnsw.efSearch = self.ef_search
+        else:
+            index.nprobe = self.nprobe
+
+    def _new_index(self):
+        faiss = self.faiss
+        if self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self.dim, self.m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.ef_construction
+        elif self.index_type == "ivf":
+            quantizer = faiss.IndexFlatIP(self.dim)
+            index = faiss.IndexIVFFlat(quantizer, self.dim, self.nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            raise ValueError(f"Unsupported FAISS index type: {self.index_type}")
+        self._configure(index)
+        return index
+
+    def _sync_index(self):
+        """Adds matrix rows the index hasn't seen yet (training IVF when possible)."""
+        if self._matrix is None:
+            return
+
+        if self.index is None:
+            self.index = self._new_index()
+
+        if not self.index.is_trained:
+            # IVF needs ~39 points per list to train well
+            if self._matrix.shape[0] < self.nlist * 39:
+                return
+            self.index.train(np.ascontiguousarray(self._matrix))
+
+        if self.index.ntotal < self._matrix.shape[0]:
+            self.index.add(np.ascontiguousarray(self._matrix[self.index.ntotal:]))
+
+    def add(self, ids, embeddings, documents, metadatas):
+        super().add(ids, embeddings, documents, metadatas)
+        with self._lock:
+            self._sync_index()
+
+    def flush(self):
+        with self._lock:
+            if self.index is None or not self.index.is_trained or self.index.ntotal == self._published_rows:
+                return  # nothing new (deletes only write tombstones)
+
+            version = self._index_version + 1
+            file_name = f"faiss_{self.index_type}.{version}.index"
+            self.faiss.write_index(self.index, os.path.join(self.path, file_name))
+
+            # The manifest switch is the only step readers observe
+            tmp_path = self._manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": version, "file": file_name, "rows": self.index.ntotal}, f)
+            os.replace(tmp_path, self._manifest_path)
+            self._index_version = version
+            self._published_rows = self.index.ntotal
+
+            self._remove_index_files(keep={file_name, f"faiss_{self.index_type}.{version - 1}.index"})
+
+    def _remove_index_files(self, keep):
+        prefix = f"faiss_{self.index_type}."
+        for name in os.listdir(self.path):
+            # Includes faiss_<type>.index, written before the manifest existed
+            if name.startswith(prefix) and name.endswith(".index") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+
+    def refresh(self):
+        if self.read_only:
+            with self._lock:
+                self._read_appended()
+                self._sync_index()
+
+    def query(self, query_embeddings, top_k, where=None):
+        index = self.index
+        excluded = self._excluded_rows(where) if where else set()
+        if excluded is None or index is None or not index.is_trained or index.ntotal == 0:
+            # Exact path for filtered queries and untrained IVF
+            return super().query(query_embeddings, top_k, where=where)
+
+        # Tombstoned rows and excluded documents are still in the index:
+        # over-fetch and drop them
+        deleted = self._deleted | excluded if excluded else self._deleted
+        queries = _unit_rows(query_embeddings)
+        scores, rows = index.search(queries, min(top_k + len(deleted), index.ntotal))
+        return [
+            [
+                self._hit(int(row), score)
+                for row, score in zip(row_list, score_list)
+                if row >= 0 and int(row) not in deleted
+            ][:top_k]
+            for row_list, score_list in zip(rows, scores)
+        ]
+
+
+def check_reader_backend():
+    """
+    Raises when a reader process (see is_index_writer) would open a store it
+    can't follow: embedded Chroma has no read-only mode and doesn't pick up
+    another process's writes.
+    """
+    if settings.VECTOR_BACKEND.lower() == "chroma" and not settings.CHROMA_HOST:
+        raise RuntimeError(
+            "This process is not the index writer, and embedded Chroma can't be shared between "
+            "processes. Set CHROMA_HOST to use a Chroma server, use VECTOR_BACKEND=numpy or faiss, "
+            "or run a single API process."
+        )
+
+
+def create_vector_store(read_only=False):
+    """
+    Builds the VECTOR_BACKEND store. read_only opens the local backends
+    without writing to them (reader processes; see is_index_writer).
+    """
+    backend = settings.VECTOR_BACKEND.lower()
+    base_dir = os.getcwd()
+
+    if read_only:
+        check_reader_backend()
+
+    if backend == "chroma":
+        return ChromaVectorStore(
+            path=os.path.join(base_dir, ".chromadb"),
+            collection_name=settings.CHROMA_COLLECTION,
+            m=settings.HNSW_M,
+            ef_construction=settings.HNSW_EF_CONSTRUCTION,
+            ef_search=settings.HNSW_EF_SEARCH,
+            host=settings.CHROMA_HOST,
+            port=settings.CHROMA_PORT,
+            ssl=settings.CHROMA_SSL,
+        )
+
+    if backend == "numpy":
+        return NumpyVectorStore(
+            path=os.path.join(base_dir, settings.LOCAL_VECTOR_DIR, "numpy"),
+            dtype=settings.NUMPY_VECTOR_DTYPE,
+            rescore_factor=settings.NUMPY_RESCORE_FACTOR,
+            read_only=read_only,
+        )
+
+    if backend == "faiss":
+        return FaissVectorStore(
+            path=os.path.join(base_dir, settings.LOCAL_VECTOR_DIR, "faiss"),
+            index_type=settings.FAISS_INDEX_TYPE,
+            m=settings.HNSW_M,
+            ef_construction=settings.HNSW_EF_CONSTRUCTION,
+            ef_search=settings.HNSW_EF_SEARCH,
+            nlist=settings.FAISS_IVF_NLIST,
+            nprobe=settings.FAISS_IVF_NPROBE,
+            read_only=read_only,
+        )
+
+    raise ValueError(f"Unsupported vector backend: {backend}")
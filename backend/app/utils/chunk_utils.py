@@ -1,3 +1,6 @@
+import re
+
+
 def chunk_text(text, chunk_size=500, overlap=50):
     if not text or not text.strip():
         return []
@@ -15,3 +18,195 @@ def chunk_text(text, chunk_size=500, overlap=50):
         start += chunk_size - overlap
 
     return chunks
+
+
+def iter_chunks(pages, chunk_size=500, overlap=50):
+    """
+    Streaming chunk_text over (page_number, text) pairs.
+
+    Produces the same windows chunk_text would over the joined page texts,
+    carrying the overlap across page boundaries, and yields (chunk, page_number)
+    where page_number is the page the chunk starts on.
+    """
+    step = chunk_size - overlap
+
+    buffer = ""
+    buffer_start = 0      # absolute offset of buffer[0]
+    pos = 0               # next window start, relative to buffer
+    page_starts = []      # [(absolute offset, page_number)] still referenced by the buffer
+
+    def page_at(offset):
+        while len(page_starts) > 1 and page_starts[1][0] <= offset:
+            page_starts.pop(0)
+        return page_starts[0][1]
+
+    for page_number, text in pages:
+        page_starts.append((buffer_start + len(buffer), page_number))
+        buffer = buffer[pos:] + text + "\n"
+        buffer_start += pos
+        pos = 0
+
+        # Only emit windows that are complete; the tail waits for the next page
+        while pos + chunk_size <= len(buffer):
+            chunk = buffer[pos:pos + chunk_size].strip()
+            if chunk:
+                yield chunk, page_at(buffer_start + pos)
+            pos += step
+
+    while pos < len(buffer):
+        chunk = buffer[pos:pos + chunk_size].strip()
+        if chunk:
+            yield chunk, page_at(buffer_start + pos)
+        pos += step
+
+
+# -------------------------------
+# Structure-aware token chunker
+# -------------------------------
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n+")
+# Sentence end: terminal punctuation (plus closing quotes/brackets), then space and a likely sentence start
+_SENTENCE_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+# "2.1 Methods", "ABSTRACT", "Chapter 3 ..." on a line of their own
+_HEADING_RE = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?\s+[A-Z][^.!?]*|[A-Z][A-Z0-9 ,:&/()-]{2,}|(?:Chapter|Section|Appendix|Part)\s+\S[^.!?]*)$"
+)
+_MAX_HEADING_CHARS = 80
+
+
+def _segment(text):
+    """
+    Splits page text into units in one linear pass.
+    Yields (text, kind) with kind "heading", "paragraph" (first sentence of
+    a paragraph) or "sentence". Wrapped lines inside a paragraph are joined.
+    """
+    for block in _PARAGRAPH_RE.split(text):
+        lines = []
+        for line in block.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) <= _MAX_HEADING_CHARS and _HEADING_RE.match(line):
+                yield from _sentences(lines)
+                lines = []
+                yield line, "heading"
+            else:
+                lines.append(line)
+        yield from _sentences(lines)
+
+
+def _sentences(lines):
+    if not lines:
+        return
+    for i, sentence in enumerate(_SENTENCE_RE.split(" ".join(lines))):
+        if sentence:
+            yield sentence, "paragraph" if i == 0 else "sentence"
+
+
+def _token_windows(text, encoding, max_tokens, overlap_tokens, first_budget):
+    """
+    Splits one overlong sentence into windows of at most max_tokens tokens
+    (the first at most first_budget), cut between words so re-tokenizing a
+    window gives the same count.
+    """
+    words = encoding.words
+    offsets = encoding.offsets
+    n_tokens = len(offsets)
+
+    start, budget = 0, max(1, first_budget)
+    while start < n_tokens:
+        end = min(start + budget, n_tokens)
+        while start + 1 < end < n_tokens and words[end] == words[end - 1]:
+            end -= 1
+        yield text[offsets[start][0]:offsets[end - 1][1]]
+        if end == n_tokens:
+            return
+
+        next_start = max(start + 1, end - overlap_tokens)
+        while next_start < end and words[next_start] == words[next_start - 1]:
+            next_start += 1
+        start, budget = next_start, max_tokens
+
+
+def iter_token_chunks(pages, tokenizer, max_tokens=200, overlap_tokens=32):
+    """
+    Structure-aware chunking over (page_number, text) pairs, measured in
+    model tokens.
+
+    - Chunks never exceed max_tokens and break only between sentences; a
+      single sentence longer than max_tokens is split on token offsets
+    - Headings always start a new chunk; a paragraph start closes a chunk
+      that is already 3/4 full
+    - Consecutive chunks share up to overlap_tokens of whole trailing
+      sentences (not across headings)
+    - Each page's units are tokenized in one batched call; overall cost is
+      linear in the text length
+
+    Yields (chunk, page_number) where page_number is where the chunk starts.
+    """
+    fill_target = max_tokens * 3 // 4
+    current = []          # [(text, kind, tokens, page_number)]
+    size = 0
+    fresh = 0             # units added since the last flush (excludes carried overlap)
+
+    def emit(units):
+        parts = []
+        for text, kind, _, _ in units:
+            if parts and kind in ("heading", "paragraph"):
+                parts.append("\n")
+            elif parts:
+                parts.append(" ")
+            parts.append(text)
+        return "".join(parts), units[0][3]
+
+    def carry(units):
+        tail, tail_size = [], 0
+        for unit in reversed(units[1:]):
+            if unit[1] == "heading" or tail_size + unit[2] > overlap_tokens:
+                break
+            tail.insert(0, unit)
+            tail_size += unit[2]
+        return tail, tail_size
+
+    for page_number, text in pages:
+        units = list(_segment(text))
+        if not units:
+            continue
+        encodings = tokenizer.encode_batch([unit for unit, _ in units], add_special_tokens=False)
+
+        for (unit, kind), encoding in zip(units, encodings):
+            n_tokens = len(encoding.ids)
+            oversized = n_tokens > max_tokens
+            # A heading right before an overlong sentence leads its first window
+            heading_only = fresh and all(u[1] == "heading" for u in current)
+
+            closes = (
+                kind == "heading"
+                or oversized
+                or size + n_tokens > max_tokens
+                or (kind == "paragraph" and size >= fill_target)
+            )
+            if closes and fresh and not (oversized and heading_only):
+                yield emit(current)
+                current, size = carry(current) if kind != "heading" else ([], 0)
+                fresh = 0
+
+            if oversized:
+                prefix = current if heading_only else []
+                for window in _token_windows(unit, encoding, max_tokens, overlap_tokens,
+                                             first_budget=max_tokens - sum(u[2] for u in prefix)):
+                    if prefix:
+                        window = emit(prefix + [(window, "paragraph", 0, page_number)])[0]
+                        prefix = []
+                    yield window, page_number
+                current, size, fresh = [], 0, 0
+                continue
+
+            if kind == "heading" or size + n_tokens > max_tokens:
+                current, size = [], 0
+
+            current.append((unit, kind, n_tokens, page_number))
+            size += n_tokens
+            fresh += 1
+
+    if fresh:
+        yield emit(current)
@@ -0,0 +1,173 @@
+import os
+import time
+import hashlib
+import logging
+from typing import NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_available = None
+
+
+class OcrOptions(NamedTuple):
+    """OCR fallback settings, passed to the page extractors (picklable for the process pool)."""
+    min_chars: int = 50                # pages with less extracted text ...
+    min_image_coverage: float = 0.5    # ... and at least this much of their area in images get OCR'd
+    dpi: int = 300
+    lang: str = "eng"
+    workers: int = 2                   # concurrent tesseract processes
+    page_timeout: float = 60.0
+    deadline: Optional[float] = None   # time.time() after which no new page is OCR'd
+    cache_dir: Optional[str] = None
+
+
+def ocr_available():
+    """Whether pytesseract and the tesseract binary are installed (checked once per process)."""
+    global _available
+    if _available is None:
+        try:
+            import pytesseract
+
+            pytesseract.get_tesseract_version()
+            _available = True
+        except (ImportError, OSError) as e:
+            logger.warning("OCR fallback unavailable, image-only pages will be skipped: %s", e)
+            _available = False
+    return _available
+
+
+def needs_ocr(page, text, options):
+    """
+    Text-density check: the page yielded fewer than min_chars characters and
+    images cover at least min_image_coverage of it (a scan, not a blank page).
+    """
+    if len(text.strip()) >= options.min_chars:
+        return False
+
+    page_area = float(page.width * page.height) or 1.0
+    covered = sum(
+        max(0.0, float(image["x1"] - image["x0"])) * max(0.0, float(image["bottom"] - image["top"]))
+        for image in page.images
+    )
+    return covered / page_area >= options.min_image_coverage
+
+
+def _page_key(page, options):
+    """Content address of a page's OCR output: its embedded image bytes + render settings."""
+    digest = hashlib.sha256()
+    for image in page.images:
+        digest.update(image["stream"].get_rawdata() or b"")
+    digest.update(f"\0{page.width}x{page.height}\0{options.dpi}\0{options.lang}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cache_path(options, key):
+    return os.path.join(options.cache_dir, key[:2], key + ".txt")
+
+
+def _cached_text(options, key):
+    if options.cache_dir is None:
+        return None
+    try:
+        with open(_cache_path(options, key), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _store_text(options, key, text):
+    if options.cache_dir is None:
+        return
+    path = _cache_path(options, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Atomic rename: concurrent extraction processes may race on the same page
+    os.replace(tmp_path, path)
+
+
+def _recognize(image, options, key, timeout):
+    import pytesseract
+
+    text = pytesseract.image_to_string(image, lang=options.lang, timeout=timeout)
+    _store_text(options, key, text)
+    return text
+
+
+class PageOcr:
+    """
+    OCR for one extraction pass.
+
+    - Candidate pages are rasterized with pdfium on the caller's thread (one
+      document handle per pass, not one per page; it isn't thread-safe) and
+      recognized on `workers` threads; tesseract runs as a subprocess, so
+      they overlap with each other and with extraction
+    - Output is cached per page content (embedded image bytes, DPI and
+      language), so re-ingesting or resuming a scanned document skips both
+      rasterization and recognition
+    - Past the deadline no new page is started; those pages are skipped
+    """
+
+    def __init__(self, options, source):
+        self.options = options
+        self.recognized = self.cached = self.skipped = 0
+        self._source = source  # file path or file object of the PDF being extracted
+        self._document = None
+        self._pool = None
+        if options.workers > 1:
+            # Parallel tesseracts each wanting every core only thrash
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+            self._pool = ThreadPoolExecutor(max_workers=options.workers, thread_name_prefix="ocr")
+
+    def submit(self, page):
+        """Returns the page's text, a Future of it, or None when the budget is spent."""
+        options = self.options
+        key = _page_key(page, options)
+        text = _cached_text(options, key)
+        if text is not None:
+            self.cached += 1
+            return text
+
+        remaining = options.page_timeout
+        if options.deadline is not None:
+            remaining = min(remaining, options.deadline - time.time())
+        if remaining <= 0:
+            self.skipped += 1
+            return None
+
+        image = self._rasterize(page.page_number)
+        self.recognized += 1
+        if self._pool is None:
+            return _recognize(image, options, key, remaining)
+        return self._pool.submit(_recognize, image, options, key, remaining)
+
+    def _rasterize(self, page_number):
+        if self._document is None:
+            import pypdfium2  # pdfplumber's own renderer
+
+            source = self._source
+            if isinstance(source, (str, os.PathLike)):
+                source = os.fspath(source)
+            else:
+                source.seek(0)
+            self._document = pypdfium2.PdfDocument(source)
+
+        page = self._document[page_number - 1]
+        try:
+            return page.render(scale=self.options.dpi / 72).to_pil().convert("L")
+        finally:
+            page.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._document is not None:
+            self._document.close()
+            self._document = None
+        if self.recognized or self.cached or self.skipped:
+            logger.info(
+                "OCR: %d pages recognized, %d from cache, %d skipped (time budget)",
+                self.recognized, self.cached, self.skipped
+            )
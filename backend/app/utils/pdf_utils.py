@@ -1,21 +1,206 @@
+import os
+import mmap
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
 import pdfplumber
 
-def extract_text_from_pdf(pdf_source, is_bytes=False):
-    if is_bytes:
-        with pdfplumber.open(pdf_source) as pdf:
-            text = ""
-            for page in pdf.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + "\n"
-            return text
-
-    # old path mode
-    with pdfplumber.open(pdf_source) as pdf:
-        text = ""
+from app.utils.ocr_utils import PageOcr, needs_ocr, ocr_available
+
+logger = logging.getLogger(__name__)
+
+# Shared by the ingestion worker threads; _extract_pool_lock guards all three
+_extract_pool = None
+_extract_pool_size = 0
+_extract_pool_users = 0
+_extract_pool_lock = threading.Lock()
+
+
+@contextmanager
+def _use_extract_pool(workers):
+    """
+    The shared process pool, counted as in use until the block exits.
+    A pool of another size is only replaced while nobody uses it; until
+    then the caller shares the existing one.
+    """
+    global _extract_pool, _extract_pool_size, _extract_pool_users
+    with _extract_pool_lock:
+        if _extract_pool is None or (_extract_pool_size != workers and _extract_pool_users == 0):
+            if _extract_pool is not None:
+                _extract_pool.shutdown(wait=False)
+            # spawn: workers only import this module, never the API's clients/models
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _extract_pool_size = workers
+        pool = _extract_pool
+        _extract_pool_users += 1
+    try:
+        yield pool
+    finally:
+        with _extract_pool_lock:
+            _extract_pool_users -= 1
+
+
+def shutdown_extract_pool():
+    """
+    Stops the pool and cancels queued ranges (app shutdown, benchmarks).
+    A document still being extracted fails; the next one starts a new pool.
+    """
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(wait=False, cancel_futures=True)
+            _extract_pool = None
+
+
+@contextmanager
+def _open_pdf(pdf_source, pages=None):
+    """
+    pdfplumber.open that memory-maps file paths: the parser reads straight
+    from the page cache instead of through another buffered copy.
+    """
+    if not isinstance(pdf_source, (str, os.PathLike)):
+        with pdfplumber.open(pdf_source, pages=pages) as pdf:
+            yield pdf
+        return
+
+    with open(pdf_source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with pdfplumber.open(mapped, pages=pages) as pdf:
+            yield pdf
+
+
+def _extract_pages(pdf, ocr=None, source=None):
+    """
+    Yields (page_number, text) in page order. With ocr (OcrOptions) and
+    tesseract installed, pages failing the text-density check are rendered
+    from source and OCR'd in the background while extraction moves on; at
+    most 2 * ocr.workers pages are held back waiting for their text.
+    """
+    runner = PageOcr(ocr, source) if ocr is not None and ocr_available() else None
+    window = 2 * max(ocr.workers, 1) if runner is not None else 0
+    pending = deque()  # (page_number, text or Future of it)
+
+    def resolve(page_number, text):
+        if isinstance(text, Future):
+            try:
+                text = text.result()
+            except Exception as e:
+                logger.warning("OCR of page %d failed: %s", page_number, e)
+                text = ""
+        return page_number, text
+
+    try:
         for page in pdf.pages:
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-        return text
+            extracted = page.extract_text() or ""
+            page_number = page.page_number
+
+            if runner is not None and needs_ocr(page, extracted, ocr):
+                try:
+                    recognized = runner.submit(page)
+                except Exception as e:
+                    logger.warning("OCR of page %d failed: %s", page_number, e)
+                    recognized = None
+                if recognized is not None:
+                    extracted = recognized
+
+            # Drop the page's cached layout objects before moving on
+            page.close()
+            pending.append((page_number, extracted))
+
+            # Hand out pages in order as soon as their text is there
+            while pending and (
+                not isinstance(pending[0][1], Future) or pending[0][1].done() or len(pending) > window
+            ):
+                number, text = resolve(*pending.popleft())
+                if text:
+                    yield number, text
+
+        while pending:
+            number, text = resolve(*pending.popleft())
+            if text:
+                yield number, text
+    finally:
+        if runner is not None:
+            runner.close()
+
+
+def _extract_page_range(path, first_page, last_page, ocr=None):
+    """
+    Process-pool task: opens the file on its own and extracts pages
+    first_page..last_page (1-based, inclusive).
+    """
+    with _open_pdf(path, pages=range(first_page, last_page + 1)) as pdf:
+        return list(_extract_pages(pdf, ocr, source=path))
+
+
+def _iter_pages_parallel(path, page_count, workers, pages_per_task, ocr=None):
+    with _use_extract_pool(workers) as pool:
+        yield from _iter_ranges(pool, path, page_count, workers, pages_per_task, ocr)
+
+
+def _iter_ranges(pool, path, page_count, workers, pages_per_task, ocr):
+    if ocr is not None:
+        # The pool already runs `workers` ranges at once: one tesseract each
+        ocr = ocr._replace(workers=1)
+    ranges = (
+        (first, min(first + pages_per_task - 1, page_count))
+        for first in range(1, page_count + 1, pages_per_task)
+    )
+
+    # Keep a bounded number of ranges in flight and yield them in page order
+    in_flight = deque()
+    try:
+        for _ in range(workers * 2):
+            page_range = next(ranges, None)
+            if page_range is None:
+                break
+            in_flight.append(pool.submit(_extract_page_range, path, *page_range, ocr))
+
+        while in_flight:
+            pages = in_flight.popleft().result()
+
+            page_range = next(ranges, None)
+            if page_range is not None:
+                in_flight.append(pool.submit(_extract_page_range, path, *page_range, ocr))
+
+            yield from pages
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def iter_pdf_pages(pdf_source, workers=1, parallel_min_pages=32, pages_per_task=16, ocr=None):
+    """
+    Yields (page_number, text) in page order (1-based page numbers).
+    Pages without extractable text are skipped.
+
+    ocr (OcrOptions) enables the OCR fallback for image-only pages; digital
+    pages stay on the pdfplumber text path.
+
+    When pdf_source is a file path, workers > 1 and the document has at least
+    parallel_min_pages pages, page ranges are extracted in a process pool;
+    each worker opens the file itself, so the PDF bytes are never pickled.
+    Everything else takes the sequential path.
+    """
+    is_path = isinstance(pdf_source, (str, os.PathLike))
+
+    if is_path and workers > 1:
+        with _open_pdf(pdf_source) as pdf:
+            page_count = len(pdf.pages)
+
+        if page_count >= parallel_min_pages:
+            yield from _iter_pages_parallel(pdf_source, page_count, workers, pages_per_task, ocr)
+            return
+
+    with _open_pdf(pdf_source) as pdf:
+        yield from _extract_pages(pdf, ocr, source=pdf_source)
+
 
+def extract_text_from_pdf(pdf_source, is_bytes=False, ocr=None):
+    # pdfplumber accepts both paths and file objects, so is_bytes is kept for callers only
+    return "".join(text + "\n" for _, text in iter_pdf_pages(pdf_source, ocr=ocr))
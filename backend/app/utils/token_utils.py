@@ -0,0 +1,39 @@
+import os
+import threading
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text with WordPiece/BPE tokenizers
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+
+def load_tokenizer(model_name):
+    """
+    Fast (Rust) tokenizer for a Hugging Face model, cached per name.
+    Bare sentence-transformers names ("all-MiniLM-L6-v2") resolve to that org;
+    a local model directory is read from its tokenizer.json.
+    """
+    with _tokenizers_lock:
+        if model_name not in _tokenizers:
+            from tokenizers import Tokenizer
+
+            if os.path.isdir(model_name):
+                tokenizer = Tokenizer.from_file(os.path.join(model_name, "tokenizer.json"))
+            else:
+                repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+                tokenizer = Tokenizer.from_pretrained(repo)
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+            _tokenizers[model_name] = tokenizer
+        return _tokenizers[model_name]
+
+
+def count_tokens(tokenizer, texts):
+    """Token counts for many texts in one batched (multi-threaded) encode call."""
+    return [len(e.ids) for e in tokenizer.encode_batch(list(texts), add_special_tokens=False)]
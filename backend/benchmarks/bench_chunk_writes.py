@@ -0,0 +1,119 @@
+"""
+Chunk persistence benchmark: per-row insert_one vs batched insert_many.
+
+Run from backend/:
+    python -m benchmarks.bench_chunk_writes                      # mongomock
+    python -m benchmarks.bench_chunk_writes --mongo-uri mongodb://localhost:27017
+
+Reports Mongo round trips and wall time per 1k chunks.
+"""
+import time
+import argparse
+from datetime import datetime
+
+from benchmarks.common import bench_env
+
+bench_env()
+
+from pymongo import MongoClient, monitoring
+
+from app.core.config import settings
+from app.services import mongo_service
+
+
+class InsertCounter(monitoring.CommandListener):
+    """Counts insert commands actually sent to a real mongod."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name == "insert":
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class CountingCollection:
+    """Counts insert calls on a mongomock collection (one call = one round trip)."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.count = 0
+
+    def insert_one(self, *args, **kwargs):
+        self.count += 1
+        return self._collection.insert_one(*args, **kwargs)
+
+    def insert_many(self, *args, **kwargs):
+        self.count += 1
+        return self._collection.insert_many(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+def _make_collection(mongo_uri):
+    if mongo_uri:
+        counter = InsertCounter()
+        client = MongoClient(mongo_uri, event_listeners=[counter])
+        collection = client["rag_bench"]["chunks"]
+        collection.drop()
+        return collection, lambda: counter.count
+
+    import mongomock
+    collection = CountingCollection(mongomock.MongoClient()["rag_bench"]["chunks"])
+    return collection, lambda: collection.count
+
+
+def _run(label, write, n_chunks, mongo_uri):
+    collection, round_trips = _make_collection(mongo_uri)
+    mongo_service.chunks_collection = collection
+
+    chunks = [f"chunk {i} " + "lorem ipsum " * 40 for i in range(n_chunks)]
+
+    start = time.perf_counter()
+    write(chunks)
+    elapsed = time.perf_counter() - start
+
+    per_1k = 1000 / n_chunks
+    print(f"{label:<32} round trips/1k: {round_trips() * per_1k:8.1f}   "
+          f"wall ms/1k: {elapsed * 1000 * per_1k:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=None, help="real mongod URI (default: mongomock)")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-sizes", default="100,500,1000")
+    args = parser.parse_args()
+
+    backend = args.mongo_uri or "mongomock"
+    print(f"{args.chunks} chunks against {backend}\n")
+
+    def per_row(chunks):
+        # The pre-batching write path: one insert_one round trip per chunk
+        for i, chunk in enumerate(chunks):
+            mongo_service.chunks_collection.insert_one({
+                "document_id": "bench-doc",
+                "index": i,
+                "text": chunk,
+                "created_at": datetime.utcnow(),
+            })
+
+    _run("insert_one per chunk", per_row, args.chunks, args.mongo_uri)
+
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        for ordered in (True, False):
+            settings.CHUNK_INSERT_BATCH_SIZE = batch_size
+            settings.CHUNK_INSERT_ORDERED = ordered
+            label = f"insert_many b={batch_size} {'ordered' if ordered else 'unordered'}"
+            _run(label, lambda chunks: mongo_service.save_chunks("bench-doc", chunks), args.chunks, args.mongo_uri)
+
+
+if __name__ == "__main__":
+    main()
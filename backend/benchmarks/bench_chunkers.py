@@ -0,0 +1,177 @@
+"""
+Character-window chunker vs structure-aware token chunker.
+
+Run from backend/:
+    python -m benchmarks.bench_chunkers --pages 200
+    python -m benchmarks.bench_chunkers --tokenizer-file tokenizer.json   # offline
+    python -m benchmarks.bench_chunkers --dense                           # + embedding retrieval
+
+Uses a synthetic paper-like corpus (headings, wrapped paragraphs) with
+planted facts. Reports throughput, chunk lengths in model tokens (and how
+many tokens the embedding model would truncate), how many facts survive
+chunking intact, and hit@k for fact queries with BM25 (and dense retrieval
+with --dense, which needs the embedding model).
+"""
+import re
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import bench_env, write_json
+
+bench_env()
+
+from app.core.config import settings
+from app.utils.chunk_utils import iter_chunks, iter_token_chunks
+from app.utils.token_utils import load_tokenizer, count_tokens
+from app.services.lexical_index import LexicalIndex
+
+_WORDS = (
+    "analysis method sample result model value data signal protein cell layer "
+    "network process system measure effect response factor rate group control "
+    "structure function pattern energy surface region field phase level source "
+    "observed reported significant increased reduced stable linear relative "
+    "initial higher lower typical overall independent consistent"
+).split()
+_ATTRS = ["melting point", "half-life", "mean diameter", "binding energy", "decay constant"]
+_UNITS = ["kelvin", "seconds", "nanometres", "electronvolts", "per hour"]
+
+
+def _sentence(rng):
+    words = rng.choices(_WORDS, k=rng.randint(8, 28))
+    return words[0].capitalize() + " " + " ".join(words[1:]) + "."
+
+
+def _wrap(text, width=90):
+    lines, line = [], []
+    for word in text.split():
+        if line and len(" ".join(line + [word])) > width:
+            lines.append(" ".join(line))
+            line = []
+        line.append(word)
+    lines.append(" ".join(line))
+    return "\n".join(lines)
+
+
+def _corpus(n_pages, seed=0):
+    """Returns ([(page_number, text)], [(query, fact_sentence)])."""
+    rng = random.Random(seed)
+    pages, facts = [], []
+    for page_number in range(1, n_pages + 1):
+        blocks = [f"{page_number}. Section {rng.choice(_WORDS).capitalize()}"]
+        for _ in range(rng.randint(3, 5)):
+            sentences = [_sentence(rng) for _ in range(rng.randint(3, 7))]
+            entity = f"compound X{len(facts)}"
+            attr, unit = rng.choice(_ATTRS), rng.choice(_UNITS)
+            condition = " ".join(rng.choices(_WORDS, k=rng.randint(10, 20)))
+            fact = f"The {attr} of {entity}, measured for {condition}, is {rng.randint(10, 999)} {unit}."
+            sentences.insert(rng.randrange(len(sentences) + 1), fact)
+            facts.append((f"{attr} of {entity}", fact))
+            blocks.append(_wrap(" ".join(sentences)))
+        pages.append((page_number, "\n\n".join(blocks)))
+    return pages, facts
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text)
+
+
+def _bm25_hits(chunks, facts, top_k, workdir):
+    index = LexicalIndex(workdir)
+    index.add([str(i) for i in range(len(chunks))], chunks, "bench")
+    hits = 0
+    for query, fact in facts:
+        results = index.search(query, top_k)
+        hits += any(fact in _normalize(chunks[int(chunk_id)]) for chunk_id, _, _ in results)
+    return hits / len(facts)
+
+
+def _dense_hits(chunks, facts, top_k):
+    from chromadb.utils import embedding_functions
+
+    embed = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=settings.EMBED_MODEL_NAME)
+    corpus = np.asarray(embed(chunks), dtype=np.float32)
+    queries = np.asarray(embed([query for query, _ in facts]), dtype=np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    hits = 0
+    for row, (_, fact) in zip(queries @ corpus.T, facts):
+        top = np.argsort(-row)[:top_k]
+        hits += any(fact in _normalize(chunks[i]) for i in top)
+    return hits / len(facts)
+
+
+def _measure(label, chunker, pages, facts, tokenizer, args, workdir):
+    start = time.perf_counter()
+    chunks = [chunk for chunk, _ in chunker(pages)]
+    elapsed = time.perf_counter() - start
+
+    limit = settings.EMBED_MAX_SEQ_TOKENS - 2
+    lengths = np.array(count_tokens(tokenizer, chunks))
+    joined = [_normalize(chunk) for chunk in chunks]
+    intact = sum(any(fact in chunk for chunk in joined) for _, fact in facts) / len(facts)
+    megabytes = sum(len(text) for _, text in pages) / 1e6
+
+    row = {
+        "chunker": label,
+        "chunks": len(chunks),
+        "mb_per_s": megabytes / elapsed,
+        "tokens_p50": float(np.median(lengths)),
+        "tokens_max": int(lengths.max()),
+        "chunks_over_limit": int(np.sum(lengths > limit)),
+        "truncated_tokens_pct": float(np.sum(np.maximum(lengths - limit, 0)) / lengths.sum() * 100),
+        "facts_intact": intact,
+        f"bm25_hit@{args.top_k}": _bm25_hits(chunks, facts, args.top_k, f"{workdir}/{label}"),
+    }
+    if args.dense:
+        row[f"dense_hit@{args.top_k}"] = _dense_hits(chunks, facts, args.top_k)
+
+    print(f"{label:<22} " + "  ".join(
+        f"{k}: {v:.3f}" if isinstance(v, float) else f"{k}: {v}" for k, v in row.items() if k != "chunker"
+    ))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--tokenizer-file", default=None, help="local tokenizer.json instead of the Hub")
+    parser.add_argument("--dense", action="store_true", help="also measure embedding retrieval")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args()
+
+    if args.tokenizer_file:
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_file(args.tokenizer_file)
+    else:
+        tokenizer = load_tokenizer(settings.EMBED_MODEL_NAME)
+
+    pages, facts = _corpus(args.pages)
+    print(f"{args.pages} pages, {len(facts)} planted facts, "
+          f"embedding limit {settings.EMBED_MAX_SEQ_TOKENS} tokens\n")
+
+    chunkers = {
+        "char 500/50": lambda p: iter_chunks(p, 500, 50),
+        "char 1000/100": lambda p: iter_chunks(p, 1000, 100),
+        "token 200/32": lambda p: iter_token_chunks(p, tokenizer, 200, 32),
+        "token 128/16": lambda p: iter_token_chunks(p, tokenizer, 128, 16),
+    }
+
+    workdir = tempfile.mkdtemp(prefix="rag_chunker_bench_")
+    try:
+        rows = [_measure(label, chunker, pages, facts, tokenizer, args, workdir)
+                for label, chunker in chunkers.items()]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    write_json(args.json, {"config": vars(args), "results": rows})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Embedding runtimes: sentence-transformers (PyTorch fp32) vs ONNX Runtime
+fp32 vs ONNX Runtime dynamic int8.
+
+Run from backend/:
+    python -m benchmarks.bench_embedding_backends --texts 2000
+    python -m benchmarks.bench_embedding_backends --model /path/to/onnx-model-dir --backends onnx-fp32,onnx-int8
+
+Each runtime is measured in a fresh process, so load time and peak RSS
+include its imports (torch or not). Recall@k compares each runtime's
+nearest-neighbour sets (queries vs corpus) with the first runtime listed.
+"""
+import sys
+import time
+import argparse
+import resource
+import multiprocessing
+
+import numpy as np
+
+from benchmarks.common import bench_env, write_json
+
+bench_env()
+
+from benchmarks.bench_chunkers import _corpus
+
+
+def _texts(n_texts, n_queries):
+    pages, facts = _corpus(max(1, n_texts // 20))
+    sentences = [s for _, text in pages for s in text.replace("\n", " ").split(". ") if s]
+    return sentences[:n_texts], [query for query, _ in facts[:n_queries]]
+
+
+def _run_backend(backend, model, texts, queries, batch_size, out):
+    """Child process: load the runtime, embed everything, report timings and vectors."""
+    try:
+        out.put(_measure_backend(backend, model, texts, queries, batch_size))
+    except Exception as e:
+        out.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def _measure_backend(backend, model, texts, queries, batch_size):
+    start = time.perf_counter()
+    if backend == "sentence-transformers":
+        from chromadb.utils import embedding_functions
+        embed = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model)
+    else:
+        import os
+        from app.services.onnx_embedding import OnnxEmbeddingFunction
+        embed = OnnxEmbeddingFunction(
+            model, cache_dir=os.path.join(os.getcwd(), ".onnx_models"), quantize=backend == "onnx-int8"
+        )
+    embed(["warm up"])
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    corpus = np.concatenate([np.asarray(embed(texts[i:i + batch_size]), dtype=np.float32)
+                             for i in range(0, len(texts), batch_size)])
+    embed_s = time.perf_counter() - start
+    query_vectors = np.asarray(embed(queries), dtype=np.float32)
+
+    return {
+        "load_s": load_s,
+        "texts_per_s": len(texts) / embed_s,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "torch_imported": "torch" in sys.modules,
+        "corpus": corpus,
+        "queries": query_vectors,
+    }
+
+
+def _neighbours(corpus, queries, k):
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return [set(np.argsort(-row)[:k]) for row in queries @ corpus.T]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="model name or local ONNX model dir")
+    parser.add_argument("--backends", default="sentence-transformers,onnx-fp32,onnx-int8")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args()
+
+    texts, queries = _texts(args.texts, args.queries)
+    print(f"{len(texts)} texts, {len(queries)} queries, model {args.model}\n")
+
+    context = multiprocessing.get_context("spawn")
+    rows, reference = [], None
+    for backend in args.backends.split(","):
+        out = context.Queue()
+        process = context.Process(target=_run_backend,
+                                  args=(backend, args.model, texts, queries, args.batch_size, out))
+        process.start()
+        result = out.get()
+        process.join()
+        if "error" in result:
+            print(f"{backend:<22} failed: {result['error']}")
+            continue
+
+        neighbours = _neighbours(result.pop("corpus"), result.pop("queries"), args.top_k)
+        if reference is None:
+            reference = neighbours
+        recall = float(np.mean([len(a & b) / args.top_k for a, b in zip(neighbours, reference)]))
+
+        row = {"backend": backend, **result, f"recall@{args.top_k}": recall}
+        rows.append(row)
+        print(f"{backend:<22} load: {row['load_s']:6.2f} s   texts/s: {row['texts_per_s']:8.1f}   "
+              f"peak RSS: {row['peak_rss_mb']:7.1f} MB   torch: {row['torch_imported']!s:<5}   "
+              f"recall@{args.top_k}: {recall:.4f}")
+
+    write_json(args.json, {"config": vars(args), "results": rows})
+
+
+if __name__ == "__main__":
+    main()
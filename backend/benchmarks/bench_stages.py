@@ -0,0 +1,188 @@
+"""
+Per-stage ingestion / retrieval micro-benchmarks, fully offline.
+
+Run from backend/:
+    python -m benchmarks.bench_stages --pages 100
+    python -m benchmarks.bench_stages --backends chroma,numpy --json stages.json
+    python -m benchmarks.bench_stages --real-embeddings      # the configured model (downloads it)
+
+Times each stage of the pipeline in isolation on a synthetic PDF:
+extract_text_from_pdf (sequential and process pool), chunk_text / the
+structure-aware chunker, embedding (HashingEmbedding unless
+--real-embeddings), and vector store add / query per backend.
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import bench_env, percentiles, write_json
+
+bench_env()
+
+from app.core.config import settings
+from app.utils.pdf_utils import extract_text_from_pdf, iter_pdf_pages, shutdown_extract_pool
+from app.utils.chunk_utils import chunk_text, iter_token_chunks
+from app.services.vector_store import ChromaVectorStore, NumpyVectorStore, FaissVectorStore
+from benchmarks.stand_ins import HashingEmbedding
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+
+def _timed(fn, repeat=1):
+    """(last result, best wall seconds over `repeat` runs)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _print(row):
+    print(f"{row['stage']:<28} " + "  ".join(
+        f"{k}: {v:.3f}" if isinstance(v, float) else f"{k}: {v}" for k, v in row.items() if k != "stage"
+    ))
+    return row
+
+
+def _bench_extraction(pdf_path, pages, workers):
+    rows = []
+    text, seconds = _timed(lambda: extract_text_from_pdf(pdf_path))
+    rows.append(_print({"stage": "extract_text_from_pdf", "seconds": seconds, "pages_per_s": pages / seconds}))
+
+    if workers > 1:
+        # First call pays for starting the pool; measure a warm second run
+        list(iter_pdf_pages(pdf_path, workers=workers, parallel_min_pages=1))
+        _, seconds = _timed(lambda: list(iter_pdf_pages(pdf_path, workers=workers, parallel_min_pages=1)))
+        rows.append(_print({
+            "stage": f"iter_pdf_pages x{workers}", "seconds": seconds, "pages_per_s": pages / seconds
+        }))
+        shutdown_extract_pool()
+    return text, rows
+
+
+def _bench_chunking(text, pdf_path, tokenizer_file):
+    rows = []
+    megabytes = len(text) / 1e6
+
+    chunks, seconds = _timed(lambda: chunk_text(text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP), repeat=3)
+    rows.append(_print({"stage": "chunk_text", "chunks": len(chunks), "mb_per_s": megabytes / seconds}))
+
+    if tokenizer_file:
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_file(tokenizer_file)
+        pages = list(iter_pdf_pages(pdf_path))
+        token_chunks, seconds = _timed(
+            lambda: [c for c, _ in iter_token_chunks(pages, tokenizer, settings.CHUNK_MAX_TOKENS,
+                                                     settings.CHUNK_OVERLAP_TOKENS)],
+            repeat=3
+        )
+        rows.append(_print({
+            "stage": "iter_token_chunks", "chunks": len(token_chunks), "mb_per_s": megabytes / seconds
+        }))
+    return chunks, rows
+
+
+def _bench_embedding(chunks, real_embeddings):
+    if real_embeddings:
+        from app.services.vector_service import _create_embed_fn
+        embed, label = _create_embed_fn(), f"embed ({settings.EMBED_BACKEND})"
+    else:
+        embed, label = HashingEmbedding(), "embed (hashing stand-in)"
+
+    batch_size = settings.EMBED_MAX_BATCH_SIZE
+    embed(chunks[:1])
+
+    def run():
+        return np.concatenate([np.asarray(embed(chunks[i:i + batch_size]), dtype=np.float32)
+                               for i in range(0, len(chunks), batch_size)])
+
+    vectors, seconds = _timed(run)
+    return embed, vectors, [_print({"stage": label, "texts": len(chunks), "texts_per_s": len(chunks) / seconds})]
+
+
+def _stores(backends, workdir):
+    for backend in backends:
+        path = os.path.join(workdir, backend)
+        if backend == "chroma":
+            yield backend, lambda: ChromaVectorStore(path, "bench", settings.HNSW_M,
+                                                     settings.HNSW_EF_CONSTRUCTION, settings.HNSW_EF_SEARCH)
+        elif backend == "numpy":
+            yield backend, lambda: NumpyVectorStore(path, settings.NUMPY_VECTOR_DTYPE, settings.NUMPY_RESCORE_FACTOR)
+        elif backend == "faiss":
+            yield backend, lambda: FaissVectorStore(path, settings.FAISS_INDEX_TYPE, settings.HNSW_M,
+                                                    settings.HNSW_EF_CONSTRUCTION, settings.HNSW_EF_SEARCH,
+                                                    settings.FAISS_IVF_NLIST, settings.FAISS_IVF_NPROBE)
+
+
+def _bench_store(label, make_store, chunks, vectors, query_vectors, top_k, batch_size):
+    try:
+        store = make_store()
+    except ImportError as e:
+        print(f"{label:<28} skipped: {e}")
+        return []
+
+    def fill():
+        for start in range(0, len(chunks), batch_size):
+            store.add(
+                ids=[f"bench_{i}" for i in range(start, min(start + batch_size, len(chunks)))],
+                embeddings=vectors[start:start + batch_size],
+                documents=chunks[start:start + batch_size],
+                metadatas=[{"document_id": "bench", "index": i}
+                           for i in range(start, min(start + batch_size, len(chunks)))],
+            )
+        store.flush()
+
+    _, seconds = _timed(fill)
+    rows = [_print({"stage": f"{label} add", "chunks": len(chunks), "chunks_per_s": len(chunks) / seconds})]
+
+    latencies = []
+    for query in query_vectors:
+        start = time.perf_counter()
+        store.query([query], top_k)
+        latencies.append(time.perf_counter() - start)
+    rows.append(_print({"stage": f"{label} query", **percentiles(latencies)}))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=settings.PDF_EXTRACT_WORKERS)
+    parser.add_argument("--backends", default="chroma,numpy,faiss")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--add-batch-size", type=int, default=settings.INGEST_CHUNK_BATCH_SIZE)
+    parser.add_argument("--tokenizer-file", default=None, help="also time the token chunker with this tokenizer.json")
+    parser.add_argument("--real-embeddings", action="store_true", help="use the configured embedding model")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rag_stage_bench_")
+    try:
+        pdf_path = os.path.join(workdir, "synthetic.pdf")
+        facts = write_synthetic_pdf(pdf_path, args.pages)
+        print(f"{args.pages}-page synthetic PDF ({os.path.getsize(pdf_path) / 1e6:.2f} MB), "
+              f"{len(facts)} fact queries\n")
+
+        text, rows = _bench_extraction(pdf_path, args.pages, args.workers)
+        chunks, chunk_rows = _bench_chunking(text, pdf_path, args.tokenizer_file)
+        embed, vectors, embed_rows = _bench_embedding(chunks, args.real_embeddings)
+        rows += chunk_rows + embed_rows
+
+        queries = [query for query, _ in facts][:args.queries]
+        query_vectors = np.asarray(embed(queries), dtype=np.float32)
+        for label, make_store in _stores(args.backends.split(","), workdir):
+            rows += _bench_store(label, make_store, chunks, vectors, query_vectors, args.top_k, args.add_batch_size)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    write_json(args.json, {"config": vars(args), "results": rows})
+
+
+if __name__ == "__main__":
+    main()
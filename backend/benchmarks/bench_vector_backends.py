@@ -0,0 +1,124 @@
+"""
+Recall vs latency for the vector store backends.
+
+Run from backend/:
+    python -m benchmarks.bench_vector_backends --vectors 20000 --queries 200
+
+Uses clustered synthetic unit vectors (no embedding model needed); ground
+truth is exact float32 cosine search. FAISS rows are skipped unless
+faiss-cpu is installed.
+"""
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import bench_env, percentiles, write_json
+
+bench_env()
+
+from app.services.vector_store import ChromaVectorStore, NumpyVectorStore, FaissVectorStore
+
+
+def _synthetic(n, n_queries, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assign = rng.integers(0, clusters, size=n + n_queries)
+    points = centers[assign] + 0.6 * rng.standard_normal((n + n_queries, dim)).astype(np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points[:n], points[n:]
+
+
+def _ground_truth(corpus, queries, k):
+    scores = queries @ corpus.T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+
+def _fill(store, corpus, batch=2000):
+    for start in range(0, len(corpus), batch):
+        rows = corpus[start:start + batch]
+        store.add(
+            ids=[str(start + i) for i in range(len(rows))],
+            embeddings=rows,
+            documents=[""] * len(rows),
+            metadatas=[{"document_id": "bench"}] * len(rows),
+        )
+    store.flush()
+
+
+def _measure(label, store, queries, truth, k):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = store.query([query], k)[0]
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({int(h["id"]) for h in hits} & expected) / k)
+
+    row = {"backend": label, f"recall@{k}": float(np.mean(recalls)), **percentiles(latencies)}
+    print(f"{label:<28} recall@{k}: {row[f'recall@{k}']:.4f}   "
+          f"p50: {row['p50_ms']:7.3f} ms   p95: {row['p95_ms']:7.3f} ms")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef-search", default="10,50,100,200")
+    parser.add_argument("--nprobe", default="1,8,32")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args()
+
+    corpus, queries = _synthetic(args.vectors, args.queries, args.dim, args.clusters)
+    truth = _ground_truth(corpus, queries, args.top_k)
+    ef_values = [int(v) for v in args.ef_search.split(",")]
+    nprobe_values = [int(v) for v in args.nprobe.split(",")]
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, k={args.top_k}\n")
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="rag_vector_bench_")
+
+    try:
+        for dtype, rescore in (("float32", 0), ("float16", 0), ("float16", 4), ("int8", 0), ("int8", 4)):
+            store = NumpyVectorStore(f"{workdir}/numpy_{dtype}_{rescore}", dtype=dtype, rescore_factor=rescore)
+            _fill(store, corpus)
+            label = f"numpy {dtype}" + (f" rescore x{rescore}" if rescore else "")
+            rows.append(_measure(label, store, queries, truth, args.top_k))
+
+        for ef in ef_values:
+            store = ChromaVectorStore(f"{workdir}/chroma", "bench", m=16, ef_construction=100, ef_search=ef)
+            if store.count() == 0:
+                _fill(store, corpus)
+            rows.append(_measure(f"chroma hnsw ef_search={ef}", store, queries, truth, args.top_k))
+
+        try:
+            for ef in ef_values:
+                store = FaissVectorStore(f"{workdir}/faiss_hnsw", "hnsw", m=32, ef_construction=200,
+                                         ef_search=ef, nlist=0, nprobe=0)
+                if store.count() == 0:
+                    _fill(store, corpus)
+                rows.append(_measure(f"faiss hnsw ef_search={ef}", store, queries, truth, args.top_k))
+
+            nlist = max(1, int(np.sqrt(args.vectors)))
+            for nprobe in nprobe_values:
+                store = FaissVectorStore(f"{workdir}/faiss_ivf", "ivf", m=0, ef_construction=0,
+                                         ef_search=0, nlist=nlist, nprobe=nprobe)
+                if store.count() == 0:
+                    _fill(store, corpus)
+                rows.append(_measure(f"faiss ivf{nlist} nprobe={nprobe}", store, queries, truth, args.top_k))
+        except ImportError as e:
+            print(f"\nskipping FAISS: {e}")
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    write_json(args.json, {"config": vars(args), "results": rows})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+import os
+import json
+import statistics
+
+_REQUIRED_SETTINGS = (
+    "MONGO_URI", "MONGO_DB", "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY",
+    "AWS_REGION", "AWS_BUCKET_NAME", "LLM_PROVIDER", "LLM_MODEL", "LLM_API_KEY",
+)
+
+
+def bench_env():
+    """
+    Fills in the settings the app requires at import time. Benchmarks never
+    use these values; real ones from the environment / .env still win.
+    """
+    for key in _REQUIRED_SETTINGS:
+        os.environ.setdefault(key, "bench")
+
+
+def percentiles(samples):
+    """p50/p95/p99 of a list of seconds, reported in milliseconds."""
+    ordered = sorted(samples)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "p50_ms": pick(50),
+        "p95_ms": pick(95),
+        "p99_ms": pick(99),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def write_json(path, payload):
+    if not path:
+        return
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nresults written to {path}")
@@ -0,0 +1,263 @@
+"""
+Concurrent load test of the API, fully offline.
+
+Run from backend/:
+    python -m benchmarks.load_test --pdfs 4 --pages 40 --requests 400 --concurrency 16
+    python -m benchmarks.load_test --endpoints query,stream,batch --json results.json
+
+Starts a stub Ollama server and the app (benchmarks.offline_app: mongomock,
+moto, hashing embeddings) in a scratch directory, uploads synthetic PDFs,
+waits for ingestion, then drives the query endpoints with `concurrency`
+clients. Reports p50/p95/p99 latency and RPS per endpoint, plus the app's
+own per-stage timings scraped from /metrics. --json output carries the git
+commit so runs can be compared across commits.
+"""
+import os
+import sys
+import time
+import socket
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from benchmarks.common import bench_env, percentiles, write_json
+
+bench_env()
+
+from benchmarks.stand_ins import start_stub_ollama
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _start_app(port, workdir, ollama_url, args):
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        # The stub speaks Ollama, whatever provider .env configures
+        "LLM_PROVIDER": "OLLAMA",
+        "OLLAMA_BASE_URL": ollama_url,
+        "ANSWER_CACHE_ENABLED": str(args.answer_cache).lower(),
+    }
+    command = [sys.executable, "-m", "benchmarks.offline_app", "--port", str(port)]
+    if args.real_embeddings:
+        command.append("--real-embeddings")
+    return subprocess.Popen(command, cwd=workdir, env=env)
+
+
+async def _wait_ready(client, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited with code {process.returncode}")
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise TimeoutError("app did not become ready")
+
+
+def _summary(label, latencies, errors, elapsed, extra=None):
+    row = {
+        "endpoint": label,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        **(percentiles(latencies) if latencies else {}),
+        **(extra or {}),
+    }
+    print(f"{label:<10} requests: {row['requests']:5d}   errors: {errors:3d}   rps: {row['rps']:8.1f}   "
+          + (f"p50: {row['p50_ms']:8.1f} ms   p95: {row['p95_ms']:8.1f} ms   p99: {row['p99_ms']:8.1f} ms"
+             if latencies else ""))
+    return row
+
+
+async def _ingest(client, paths, concurrency):
+    """Uploads every PDF, then polls until all jobs finish. Returns a result row."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors, documents = [], 0, []
+
+    async def upload(path):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            with open(path, "rb") as f:
+                r = await client.post("/api/v1/upload", files={"file": (os.path.basename(path), f, "application/pdf")})
+            if r.status_code != 200:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            documents.append(r.json()["document_id"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(path) for path in paths))
+
+    chunks, pending = 0, set(documents)
+    while pending:
+        for document_id in list(pending):
+            status = (await client.get(f"/api/v1/documents/{document_id}/status")).json()
+            if status["status"] in ("ready", "failed"):
+                pending.discard(document_id)
+                errors += status["status"] == "failed"
+                chunks += status.get("chunk_count", 0)
+        await asyncio.sleep(0.2)
+    elapsed = time.perf_counter() - start
+
+    return _summary("upload", latencies, errors, elapsed, {
+        "ingest_seconds": elapsed,
+        "chunks": chunks,
+        "chunks_per_s": chunks / elapsed if elapsed else 0.0,
+    })
+
+
+async def _drive(client, label, questions, n_requests, concurrency, args):
+    """Sends n_requests to one endpoint from `concurrency` workers."""
+    latencies, first_byte, errors = [], [], 0
+    counter = iter(range(n_requests))
+
+    async def one(i):
+        question = questions[i % len(questions)]
+        if label == "batch":
+            batch = [questions[(i * args.batch_size + j) % len(questions)] for j in range(args.batch_size)]
+            request = ("/api/v1/query/batch", {"questions": batch, "top_k": args.top_k})
+        elif label == "stream":
+            request = ("/api/v1/query/stream", {"question": question, "top_k": args.top_k})
+        else:
+            request = ("/api/v1/query", {"question": question, "top_k": args.top_k})
+
+        start = time.perf_counter()
+        async with client.stream("POST", request[0], json=request[1]) as r:
+            first = None
+            async for _ in r.aiter_bytes():
+                if first is None:
+                    first = time.perf_counter() - start
+            if r.status_code != 200:
+                return None, None
+        return time.perf_counter() - start, first
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            try:
+                total, first = await one(i)
+            except httpx.HTTPError:
+                total = first = None
+            if total is None:
+                errors += 1
+                continue
+            latencies.append(total)
+            if first is not None:
+                first_byte.append(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    extra = {}
+    if label == "stream" and first_byte:
+        extra = {f"first_byte_{k}": v for k, v in percentiles(first_byte).items()}
+    return _summary(label, latencies, errors, elapsed, extra)
+
+
+def _stage_timings(metrics_text):
+    """{stage: {"count", "mean_ms"}} from the app's rag_stage_seconds histogram."""
+    sums, counts = {}, {}
+    for line in metrics_text.splitlines():
+        if line.startswith("rag_stage_seconds_sum") or line.startswith("rag_stage_seconds_count"):
+            name, value = line.rsplit(" ", 1)
+            stage = name.split('stage="', 1)[1].split('"', 1)[0]
+            (sums if "_sum" in name else counts)[stage] = float(value)
+    return {
+        stage: {"count": int(counts[stage]), "mean_ms": sums.get(stage, 0.0) / counts[stage] * 1000}
+        for stage in counts if counts[stage]
+    }
+
+
+async def _run(args, workdir, base_url, process):
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await _wait_ready(client, process)
+
+        paths, questions = [], []
+        for i in range(args.pdfs):
+            path = os.path.join(workdir, f"synthetic_{i}.pdf")
+            facts = write_synthetic_pdf(path, args.pages, seed=i)
+            paths.append(path)
+            questions.extend(f"What is the {query}?" for query, _ in facts)
+
+        print(f"{args.pdfs} PDFs x {args.pages} pages, {len(questions)} distinct questions, "
+              f"concurrency {args.concurrency}\n")
+
+        rows = [await _ingest(client, paths, args.concurrency)]
+        for label in args.endpoints.split(","):
+            rows.append(await _drive(client, label, questions, args.requests, args.concurrency, args))
+
+        stages = {}
+        r = await client.get("/metrics")
+        if r.status_code == 200:
+            stages = _stage_timings(r.text)
+            print("\nstage                 count    mean ms")
+            for stage, timing in sorted(stages.items()):
+                print(f"{stage:<20} {timing['count']:6d} {timing['mean_ms']:10.2f}")
+
+        return rows, stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=400, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoints", default="query,stream", help="comma list of query, stream, batch")
+    parser.add_argument("--batch-size", type=int, default=16, help="questions per /query/batch request")
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--llm-first-token-ms", type=float, default=50)
+    parser.add_argument("--llm-token-ms", type=float, default=5)
+    parser.add_argument("--llm-tokens", type=int, default=64)
+    parser.add_argument("--answer-cache", action="store_true", help="leave the answer cache on")
+    parser.add_argument("--real-embeddings", action="store_true", help="use the configured embedding model")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args()
+
+    stub, ollama_url = start_stub_ollama(args.llm_first_token_ms, args.llm_token_ms, args.llm_tokens)
+    workdir = tempfile.mkdtemp(prefix="rag_load_test_")
+    port = _free_port()
+    process = _start_app(port, workdir, ollama_url, args)
+    try:
+        rows, stages = asyncio.run(_run(args, workdir, f"http://127.0.0.1:{port}", process))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        stub.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    write_json(args.json, {"commit": _git_commit(), "config": vars(args), "results": rows, "stages": stages})
+
+
+if __name__ == "__main__":
+    main()
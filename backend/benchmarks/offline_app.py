@@ -0,0 +1,53 @@
+"""
+Runs the FastAPI app with offline stand-ins, for the load test.
+
+Run from backend/ (load_test starts it for you, in a scratch directory):
+    OLLAMA_BASE_URL=http://127.0.0.1:11434 python -m benchmarks.offline_app --port 8765
+
+Mongo is mongomock, S3 is moto, the embedding model is HashingEmbedding
+(unless --real-embeddings) and the LLM is whatever OLLAMA_BASE_URL points
+at (load_test passes its stub). Stores and caches go to the working directory.
+"""
+import os
+import argparse
+
+# Offline defaults; anything set in the environment wins
+for key, value in {
+    "LLM_PROVIDER": "OLLAMA",
+    "LLM_MODEL": "stub",
+    "AWS_REGION": "us-east-1",
+    "AWS_BUCKET_NAME": "bench-bucket",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "CHUNKER": "char",  # the token chunker needs the tokenizer from the Hub
+}.items():
+    os.environ.setdefault(key, value)
+
+from benchmarks.common import bench_env
+
+bench_env()
+
+import uvicorn
+
+from app.core.config import settings
+from benchmarks.stand_ins import install_offline_services
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--real-embeddings", action="store_true", help="load the configured embedding model")
+    args = parser.parse_args()
+
+    mock = install_offline_services(settings.AWS_BUCKET_NAME, real_embeddings=args.real_embeddings)
+    try:
+        from app.main import app
+
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    finally:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Local stand-ins so benchmarks run fully offline:
+
+- HashingEmbedding: deterministic bag-of-words vectors instead of the
+  embedding model (no download; lexical overlap still drives similarity)
+- start_stub_ollama(): an HTTP server speaking Ollama's /api/generate
+  contract (streaming and not) with configurable latency
+- install_offline_services(): mongomock for Mongo and moto for S3, swapped
+  into the app's lazy service singletons
+"""
+import json
+import time
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from app.services.lexical_index import tokenize
+
+_WORDS = "the result of this analysis is consistent with the reported values".split()
+
+
+class HashingEmbedding:
+    """Signed feature hashing of BM25 terms into `dim` dimensions, L2-normalized."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term in tokenize(text):
+                h = zlib.crc32(term.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return list(vectors / norms)
+
+
+def _stub_handler(first_token_s, token_s, n_tokens):
+    class StubOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            tokens = [_WORDS[i % len(_WORDS)] + " " for i in range(n_tokens)]
+
+            if not body.get("stream", True):
+                time.sleep(first_token_s + token_s * n_tokens)
+                payload = json.dumps({"model": body.get("model"), "response": "".join(tokens), "done": True})
+                data = payload.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+
+            # Streaming: one JSON object per line, chunked transfer encoding
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            time.sleep(first_token_s)
+            for i, token in enumerate(tokens + [""]):
+                done = i == len(tokens)
+                line = (json.dumps({"model": body.get("model"), "response": token, "done": done}) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                if not done:
+                    time.sleep(token_s)
+            self.wfile.write(b"0\r\n\r\n")
+
+    return StubOllamaHandler
+
+
+def start_stub_ollama(first_token_ms=50, token_ms=5, n_tokens=64, port=0):
+    """Starts the stub in a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port),
+        _stub_handler(first_token_ms / 1000, token_ms / 1000, n_tokens)
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-ollama", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def install_offline_services(bucket, real_embeddings=False):
+    """
+    Points the app's Mongo and S3 clients at mongomock / moto (and the
+    embedding model at HashingEmbedding unless real_embeddings). Returns
+    the started moto mock; stop() it when done.
+    """
+    import boto3
+    import mongomock
+    from moto import mock_aws
+
+    from app.core.config import settings
+    from app.services import mongo_service, vector_service
+
+    mock = mock_aws()
+    mock.start()
+    location = {}
+    if settings.AWS_REGION != "us-east-1":
+        location = {"CreateBucketConfiguration": {"LocationConstraint": settings.AWS_REGION}}
+    boto3.client("s3", region_name=settings.AWS_REGION).create_bucket(Bucket=bucket, **location)
+
+    mongo_service.client.override(mongomock.MongoClient())
+    if not real_embeddings:
+        vector_service.embed_fn.override(HashingEmbedding())
+    return mock
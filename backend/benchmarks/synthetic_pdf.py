@@ -0,0 +1,99 @@
+"""
+Synthetic PDFs for the offline benchmarks (no PDF library needed).
+
+Run from backend/:
+    python -m benchmarks.synthetic_pdf --pages 200 --out paper.pdf
+
+Pages hold the paper-like text of bench_chunkers._corpus (a heading and
+wrapped paragraphs with planted facts), one text line per PDF line, so
+pdfplumber extracts roughly what was written.
+"""
+import argparse
+
+from benchmarks.common import bench_env
+
+bench_env()
+
+from benchmarks.bench_chunkers import _corpus
+
+_LINES_PER_PAGE = 68
+_LEADING = 11
+
+
+def _escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages_lines):
+    """
+    Builds a minimal PDF with one Helvetica text block per page; a page
+    with more than _LINES_PER_PAGE lines continues on the next one.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    page_blocks = [
+        lines[start:start + _LINES_PER_PAGE]
+        for lines in pages_lines
+        for start in range(0, max(len(lines), 1), _LINES_PER_PAGE)
+    ]
+
+    page_refs = []
+    for lines in page_blocks:
+        text = " ".join(f"({_escape(line)}) '" for line in lines)
+        content = f"BT /F1 9 Tf {_LEADING} TL 40 770 Td {text} ET".encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>".encode()
+        )
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_refs)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def synthetic_pdf(n_pages, seed=0):
+    """Returns (pdf bytes, [(query, fact_sentence)]) for an n_pages document."""
+    pages, facts = _corpus(n_pages, seed=seed)
+    pages_lines = [[line for line in text.split("\n") if line.strip()] for _, text in pages]
+    return make_pdf(pages_lines), facts
+
+
+def write_synthetic_pdf(path, n_pages, seed=0):
+    data, facts = synthetic_pdf(n_pages, seed=seed)
+    with open(path, "wb") as f:
+        f.write(data)
+    return facts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic.pdf")
+    args = parser.parse_args()
+
+    facts = write_synthetic_pdf(args.out, args.pages, seed=args.seed)
+    print(f"wrote {args.out}: {args.pages} pages, {len(facts)} planted facts")
+
+
+if __name__ == "__main__":
+    main()
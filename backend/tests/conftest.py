@@ -0,0 +1,75 @@
+"""
+Offline test setup: Mongo is mongomock, embeddings come from the
+HashingEmbedding stand-in, a "PDF" is the list of its page texts, and
+each test gets fresh numpy / BM25 indexes in its own working directory.
+
+Run from backend/:
+    python -m pytest
+"""
+import os
+import sys
+
+CHUNK_SIZE = 200
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings are read at import time: pin the ones the tests rely on
+os.environ.update({
+    "VECTOR_BACKEND": "numpy",
+    "CHUNKER": "char",              # the token chunker needs the tokenizer from the Hub
+    "CHUNK_SIZE": str(CHUNK_SIZE),
+    "CHUNK_OVERLAP": "0",
+    "INDEX_WRITER": "true",
+    "EMBED_CACHE_ENABLED": "false",
+    "METRICS_ENABLED": "false",
+    "LLM_PROVIDER": "OLLAMA",
+    "HF_HUB_OFFLINE": "1",          # no tokenizer download: context tokens are estimated
+})
+
+from benchmarks.common import bench_env
+
+bench_env()
+
+import mongomock
+import pytest
+
+from app.core.config import settings
+from app.core.container import Lazy
+from app.services import mongo_service, rag_pipeline, vector_service
+from app.services.answer_cache import AnswerCache
+from app.services.query_cache import LRUCache
+from benchmarks.stand_ins import HashingEmbedding
+
+
+@pytest.fixture(autouse=True)
+def offline_services(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(mongo_service, "client", Lazy("mongo", mongomock.MongoClient))
+    monkeypatch.setattr(vector_service, "embed_fn", HashingEmbedding())
+    answers = AnswerCache(settings.ANSWER_CACHE_MAX_ENTRIES, settings.ANSWER_CACHE_TTL_SECONDS)
+    monkeypatch.setattr(rag_pipeline, "answer_cache", answers)
+    monkeypatch.setattr(vector_service, "answer_cache", answers)
+    monkeypatch.setattr(vector_service, "query_embedding_cache", LRUCache(settings.QUERY_EMBED_CACHE_MAX_ENTRIES))
+    monkeypatch.setattr(vector_service, "retrieval_cache", LRUCache(settings.RETRIEVAL_CACHE_MAX_ENTRIES))
+    monkeypatch.setattr(rag_pipeline, "iter_pdf_pages", lambda pages, **options: enumerate(pages, start=1))
+    yield
+
+    # Next test rebuilds everything against its own directory and database
+    for service in (vector_service.vector_store, vector_service.lexical_index, *vars(mongo_service).values()):
+        if isinstance(service, Lazy):
+            service.close()
+
+
+def paragraph(topic, n):
+    """
+    Terms unique to topic and n ("<topic><n>term<i>"), padded so that with
+    its page break it is exactly one CHUNK_SIZE window: one page, one chunk.
+    """
+    text = f"Section {n} on {topic}: " + " ".join(f"{topic}{n}term{i}" for i in range(12))
+    return text + " " + "." * (CHUNK_SIZE - 2 - len(text))
+
+
+@pytest.fixture
+def pdf():
+    """pdf(topic, sections) -> page texts standing in for a PDF, one paragraph per section."""
+    return lambda topic, sections: [paragraph(topic, n) for n in sections]
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from app.core import container
+from app.core.container import close_all, lazy, readiness, warm_up
+
+
+@pytest.fixture
+def services():
+    """Registers Lazy services for one test and unregisters them after."""
+    names = []
+
+    def register(name, factory):
+        names.append(name)
+        return lazy(name, factory)
+
+    yield register
+    for name in names:
+        container._registry.pop(name).close()
+
+
+def test_warm_up_retries_failed_services(services):
+    calls = {"flaky": 0, "steady": 0}
+
+    def flaky():
+        calls["flaky"] += 1
+        if calls["flaky"] < 3:
+            raise ConnectionError("not up yet")
+        return "flaky"
+
+    def steady():
+        calls["steady"] += 1
+        return "steady"
+
+    services("test_flaky", flaky)
+    services("test_steady", steady)
+    started = threading.Event()
+
+    thread = warm_up(["test_flaky", "test_steady"], then=started.set, backoff=0.01)
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert started.is_set()
+    assert calls == {"flaky": 3, "steady": 1}
+    assert all(status["ready"] for status in readiness(["test_flaky", "test_steady"]).values())
+
+
+def test_close_all_stops_warm_up_retries(services):
+    def down():
+        raise ConnectionError("down")
+
+    services("test_down", down)
+    started = threading.Event()
+    thread = warm_up(["test_down"], then=started.set, backoff=0.01)
+
+    close_all()
+    thread.join(timeout=5)
+    assert not thread.is_alive() and not started.is_set()
+    assert readiness(["test_down"])["test_down"] == {"ready": False, "error": "ConnectionError: down"}
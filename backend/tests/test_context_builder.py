@@ -0,0 +1,53 @@
+import pytest
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from app.core.config import settings
+from app.services import context_builder
+from app.services.context_builder import build_context
+
+
+@pytest.fixture
+def word_tokenizer(monkeypatch):
+    """One token per word, whatever its length."""
+    tokenizer = Tokenizer(WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    monkeypatch.setattr(context_builder, "_tokenizer", lambda: tokenizer)
+    return tokenizer
+
+
+def _words(topic, count):
+    return " ".join(f"{topic}{i:02d}verylongword" for i in range(count))
+
+
+def test_budget_is_counted_with_the_tokenizer(word_tokenizer):
+    hits = [{"text": _words(topic, 10)} for topic in ("alpha", "beta", "gamma")]
+
+    # ~5 estimated tokens per word would overflow a 25-token budget on the first hit
+    context, usage = build_context(hits, budget=25)
+    assert usage["retrieved_tokens"] == 30
+    assert usage["context_tokens"] == 20 and usage["passages_used"] == 2
+    assert context == f"{hits[0]['text']}\n\n{hits[1]['text']}"
+
+
+def test_oversized_passage_is_cut_at_a_token_boundary(word_tokenizer):
+    context, usage = build_context([{"text": _words("alpha", 10)}], budget=4)
+    assert context == _words("alpha", 4)
+    assert usage["context_tokens"] == 4
+
+
+def test_overlap_is_capped_by_the_chunk_overlap(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNKER", "char")
+    shared = "shared sentence."
+    hits = [
+        {"text": f"first part {shared}", "document_id": "doc", "index": 0},
+        {"text": f"{shared} second part", "document_id": "doc", "index": 1},
+    ]
+
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", len(shared))
+    assert build_context(hits)[0] == f"first part {shared} second part"
+
+    # Chunks cut without overlap can't share text: a repeat is content, not overlap
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    assert build_context(hits)[0] == f"first part {shared} {shared} second part"
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.services import ingestion_service, rag_pipeline, vector_service
+from app.services.ingestion_service import delete_document
+from app.services.mongo_service import (
+    chunks_collection,
+    claim_next_job,
+    get_chunk_hashes,
+    get_document,
+    mark_document_failed,
+    save_document,
+    set_document_fields,
+    update_document,
+)
+from app.services.rag_pipeline import answer_question, process_document
+from app.services.vector_service import chunk_id, lexical_index, vector_store
+
+
+def _stored_ids(document_id):
+    return {chunk_id(document_id, index) for index in get_chunk_hashes(document_id)}
+
+
+def _assert_indexed(document_id, count):
+    """Mongo rows, vectors and BM25 rows all hold exactly chunks 0..count-1."""
+    expected = {chunk_id(document_id, index) for index in range(count)}
+    assert _stored_ids(document_id) == expected
+    assert set(vector_store.get(sorted(expected))) == expected
+    assert vector_store.count() == count
+    assert lexical_index.count() == count
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Stub LLM: returns "answer <n>" for its n-th call; the list holds the prompts."""
+    prompts = []
+
+    async def ask_llm(prompt, throttle=False):
+        prompts.append(prompt)
+        return f"answer {len(prompts)}"
+
+    monkeypatch.setattr(rag_pipeline, "ask_llm", ask_llm)
+    return prompts
+
+
+def _ask(question):
+    return asyncio.run(answer_question(question, top_k=2))
+
+
+def _context(prompt):
+    return prompt.partition("Question:")[0]
+
+
+def test_reingest_shrinking_document_drops_stale_chunks(pdf):
+    assert process_document(pdf("alpha", range(6)), "doc") == 6
+    _assert_indexed("doc", 6)
+
+    assert process_document(pdf("alpha", range(2)), "doc") == 2
+    _assert_indexed("doc", 2)
+
+    # Text only the removed chunks had is gone from both retrievers
+    assert lexical_index.search("alpha5term3", 10) == []
+    assert vector_store.get([chunk_id("doc", 5)]) == {}
+
+
+def test_reingest_only_embeds_changed_chunks(pdf, monkeypatch):
+    process_document(pdf("alpha", range(4)), "doc")
+
+    embedded = []
+    embed = vector_service.embed_fn
+    monkeypatch.setattr(vector_service, "embed_fn", lambda texts: embedded.extend(texts) or embed(texts))
+
+    # Same text: nothing to do
+    process_document(pdf("alpha", range(4)), "doc")
+    assert embedded == []
+
+    # Section 2 rewritten (same length, so chunk boundaries hold): only that chunk is re-embedded
+    process_document(pdf("alpha", [0, 1, 9, 3]), "doc")
+    assert len(embedded) == 1 and "alpha9term0" in embedded[0]
+    _assert_indexed("doc", 4)
+    assert [hit[0] for hit in lexical_index.search("alpha9term0", 10)] == [chunk_id("doc", 2)]
+    assert lexical_index.search("alpha2term0", 10) == []
+
+
+def test_delete_removes_chunks_and_records(pdf):
+    document_id = save_document("a.pdf", None, content_hash="hash-a")
+    process_document(pdf("alpha", range(3)), document_id)
+    process_document(pdf("beta", range(2)), "other")
+
+    result = delete_document(document_id)
+
+    assert result == {"document_id": document_id, "deleted": True, "chunks": 3}
+    assert get_document(document_id) is None
+    assert chunks_collection.count_documents({"document_id": document_id}) == 0
+    assert lexical_index.search("alpha1term1", 10) == []
+    assert vector_store.count() == 2
+    _assert_indexed("other", 2)
+
+
+def test_delete_on_reader_is_queued_for_the_writer(pdf, monkeypatch):
+    document_id = save_document("a.pdf", None, content_hash="hash-a")
+    process_document(pdf("alpha", range(3)), document_id)
+
+    monkeypatch.setattr(ingestion_service, "is_index_writer", lambda: False)
+    result = delete_document(document_id)
+    assert result["deleted"] is False and result["status"] == "deleting"
+    assert vector_store.count() == 3
+
+    # The writer's worker picks the job up
+    monkeypatch.setattr(ingestion_service, "_slots", threading.BoundedSemaphore(1))
+    ingestion_service._slots.acquire()
+    ingestion_service._run_job(claim_next_job())
+
+    assert get_document(document_id) is None
+    assert vector_store.count() == 0
+
+
+def test_answer_cache_dropped_on_reingest(pdf, llm_calls):
+    process_document(pdf("alpha", range(3)), "doc")
+
+    assert _ask("alpha1term3")["cache"] is None
+    assert _ask("alpha1term3") == {"answer": "answer 1", "cache": "exact", "usage": None}
+
+    # Same chunk ids, new text: the cached answer must not survive
+    process_document(pdf("alpha", [0, 7, 2]), "doc")
+    result = _ask("alpha1term3")
+    assert result["cache"] is None and result["answer"] == "answer 2"
+    assert "alpha1term3" in _context(llm_calls[0])
+    assert "alpha1term3" not in _context(llm_calls[-1])
+
+
+def test_answer_cache_dropped_on_delete(pdf, llm_calls):
+    document_id = save_document("a.pdf", None, content_hash="hash-a")
+    update_document(document_id, process_document(pdf("alpha", range(3)), document_id))
+    process_document(pdf("beta", range(3)), "other")
+
+    _ask("alpha1term3")
+    assert _ask("alpha1term3")["cache"] == "exact"
+
+    delete_document(document_id)
+    result = _ask("alpha1term3")
+    assert result["cache"] is None
+    assert "alpha1term3" not in _context(llm_calls[-1])
+
+
+def test_failed_reingest_is_not_served(pdf, llm_calls, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_BATCH_SIZE", 2)
+    document_id = save_document("a.pdf", None, content_hash="hash-a")
+    update_document(document_id, process_document(pdf("alpha", range(4)), document_id))
+    process_document(pdf("beta", range(2)), "other")
+    _ask("alpha3term1")
+    assert "alpha3term1" in _context(llm_calls[-1])
+
+    def pages():
+        # The first batch of the new version is stored before the PDF breaks
+        yield from pdf("gamma", range(2))
+        raise ValueError("corrupt page")
+
+    set_document_fields(document_id, {"status": "processing"})
+    with pytest.raises(ValueError):
+        process_document(pages(), document_id)
+    mark_document_failed(document_id, "corrupt page")
+
+    # Both versions are in the indexes, but neither is searched
+    assert lexical_index.search("gamma0term1", 5) and lexical_index.search("alpha3term1", 5)
+    for question in ("gamma0term1", "alpha3term1"):
+        result = _ask(question)
+        assert result["cache"] is None
+        assert "gamma0" not in _context(llm_calls[-1]) and "alpha" not in _context(llm_calls[-1])
+    _ask("beta1term1")
+    assert "beta1term1" in _context(llm_calls[-1])
@@ -0,0 +1,105 @@
+import os
+import threading
+
+import pytest
+
+from app.services import ingestion_service, mongo_service, rag_pipeline
+from app.services.ingestion_service import enqueue_document
+from app.services.mongo_service import (
+    claim_next_job,
+    create_job,
+    documents,
+    ensure_indexes,
+    get_document,
+    get_job,
+    mark_document_failed,
+    requeue_running_jobs,
+    save_document,
+)
+from app.utils.pdf_utils import iter_pdf_pages
+
+
+def _run_next_job(monkeypatch):
+    """Runs the next queued job on this thread, the way a worker does once it holds a slot."""
+    monkeypatch.setattr(ingestion_service, "_slots", threading.BoundedSemaphore(1))
+    ingestion_service._slots.acquire()
+    ingestion_service._run_job(claim_next_job())
+
+
+def _spool(tmp_path, name="upload.pdf"):
+    path = tmp_path / name
+    path.write_bytes(b"%PDF-1.4")
+    return str(path)
+
+
+def test_concurrent_duplicate_upload_returns_the_first_document(tmp_path, monkeypatch):
+    ensure_indexes()
+    first = enqueue_document("a.pdf", _spool(tmp_path, "a.pdf"), "hash-a")
+
+    # The second upload's lookup ran before the first one inserted
+    lookups = []
+
+    def find_document_by_hash(content_hash):
+        lookups.append(content_hash)
+        return None if len(lookups) == 1 else mongo_service.find_document_by_hash(content_hash)
+
+    monkeypatch.setattr(ingestion_service, "find_document_by_hash", find_document_by_hash)
+    spool_path = _spool(tmp_path, "b.pdf")
+    second = enqueue_document("b.pdf", spool_path, "hash-a")
+
+    assert second["duplicate"] is True and second["document_id"] == first["document_id"]
+    assert documents.count_documents({"content_hash": "hash-a"}) == 1
+    assert not os.path.exists(spool_path)
+
+
+def test_failed_document_does_not_block_a_new_upload(tmp_path):
+    ensure_indexes()
+    first = enqueue_document("a.pdf", _spool(tmp_path), "hash-a")
+    mark_document_failed(first["document_id"], "boom")
+
+    second = enqueue_document("a.pdf", _spool(tmp_path), "hash-a")
+    assert second["duplicate"] is False and second["document_id"] != first["document_id"]
+
+
+def test_enqueue_failure_removes_the_spool_file(tmp_path, monkeypatch):
+    def create_job(*args, **kwargs):
+        raise RuntimeError("queue down")
+
+    monkeypatch.setattr(ingestion_service, "create_job", create_job)
+    spool_path = _spool(tmp_path)
+    with pytest.raises(RuntimeError):
+        enqueue_document("a.pdf", spool_path, "hash-a")
+
+    assert not os.path.exists(spool_path)
+    # With no job the document would never leave "processing"
+    assert documents.find_one({"content_hash": "hash-a"})["status"] == "failed"
+
+
+def test_failed_job_removes_its_spool_file(tmp_path, monkeypatch):
+    spool_path = tmp_path / "upload.pdf"
+    spool_path.write_bytes(b"not a pdf")
+    document_id = save_document("upload.pdf", None, content_hash="hash-u")
+    job_id = create_job(document_id, "upload.pdf", str(spool_path), "documents/hash-u.pdf")
+
+    # Real extraction: it fails on these bytes
+    monkeypatch.setattr(rag_pipeline, "iter_pdf_pages", iter_pdf_pages)
+    monkeypatch.setattr(ingestion_service, "upload_to_s3", lambda path, key: f"s3://bucket/{key}")
+    _run_next_job(monkeypatch)
+
+    assert get_job(job_id)["status"] == "failed"
+    assert get_document(document_id)["status"] == "failed"
+    assert not spool_path.exists()
+
+
+def test_jobs_stay_on_the_host_that_queued_them(monkeypatch):
+    host = mongo_service._HOST
+    create_job("doc", "a.pdf", "/spool/a.pdf", "documents/a.pdf")
+    monkeypatch.setattr(mongo_service, "_HOST", "other-host")
+    create_job("doc", "b.pdf", "/spool/b.pdf", "documents/b.pdf")
+    assert claim_next_job()["filename"] == "b.pdf"
+    assert claim_next_job() is None
+
+    # Nor are another host's running jobs requeued here
+    monkeypatch.setattr(mongo_service, "_HOST", host)
+    assert requeue_running_jobs() == 0
+    assert claim_next_job()["filename"] == "a.pdf"
@@ -0,0 +1,16 @@
+from app.utils import pdf_utils
+
+
+def test_extract_pool_is_only_resized_when_idle():
+    try:
+        with pdf_utils._use_extract_pool(2) as pool:
+            # Another job asks for another size while the pool is busy: it shares it
+            with pdf_utils._use_extract_pool(3) as shared:
+                assert shared is pool
+            assert pdf_utils._extract_pool_users == 1
+
+        with pdf_utils._use_extract_pool(3) as resized:
+            assert resized is not pool
+        assert pdf_utils._extract_pool_size == 3 and pdf_utils._extract_pool_users == 0
+    finally:
+        pdf_utils.shutdown_extract_pool()
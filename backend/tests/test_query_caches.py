@@ -0,0 +1,21 @@
+from app.services import vector_service
+from app.services.rag_pipeline import process_document
+from app.services.vector_service import chunk_id, embed_queries, search_chunks
+
+
+def test_retrieval_cache_invalidated_by_index_writes(pdf):
+    process_document(pdf("alpha", range(3)), "doc")
+    cache = vector_service.retrieval_cache
+    [embedding] = embed_queries(["beta1term4"])
+
+    first = search_chunks(embedding, top_k=2, query_text="beta1term4")
+    hits = cache.hits
+    assert search_chunks(embedding, top_k=2, query_text="beta1term4") == first
+    assert cache.hits == hits + 1
+
+    # New chunks bump the collection version: the next lookup searches again
+    process_document(pdf("beta", range(3)), "other")
+    stale = cache.stale
+    hits = search_chunks(embedding, top_k=2, query_text="beta1term4")
+    assert cache.stale == stale + 1
+    assert hits[0]["id"] == chunk_id("other", 1)
@@ -0,0 +1,176 @@
+import os
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import vector_service
+from app.services.lexical_index import LexicalIndex
+from app.services.mongo_service import bump_index_version
+from app.services.vector_store import FaissVectorStore, NumpyVectorStore, check_reader_backend
+from benchmarks.stand_ins import HashingEmbedding
+
+embed = HashingEmbedding(dim=64)
+
+
+def _add(store, index, document_id, texts, start=0):
+    ids = [f"{document_id}_{i}" for i in range(start, start + len(texts))]
+    store.upsert(
+        ids=ids,
+        embeddings=embed(texts),
+        documents=texts,
+        metadatas=[{"document_id": document_id, "index": i} for i in range(start, start + len(texts))]
+    )
+    index.upsert(ids, texts, document_id)
+    store.flush()
+    index.flush()
+
+
+@pytest.fixture
+def writer_and_reader(tmp_path):
+    """A writer's vector store + BM25 index, and read-only copies opened on the same files."""
+    vectors, lexical = str(tmp_path / "vectors"), str(tmp_path / "lexical")
+    writer = NumpyVectorStore(vectors), LexicalIndex(lexical, max_segments=2)
+    _add(*writer, "doc", ["red apples", "green pears"])
+
+    reader = NumpyVectorStore(vectors, read_only=True), LexicalIndex(lexical, max_segments=2, read_only=True)
+    return writer, reader
+
+
+def _refresh(reader):
+    for index in reader:
+        index.refresh()
+
+
+def test_reader_sees_appended_chunks(writer_and_reader):
+    writer, reader = writer_and_reader
+    assert [index.count() for index in reader] == [2, 2]
+
+    _add(*writer, "other", ["yellow bananas"])
+    assert reader[1].search("bananas", 5) == []
+
+    _refresh(reader)
+    assert [index.count() for index in reader] == [3, 3]
+    assert [hit[0] for hit in reader[1].search("bananas", 5)] == ["other_0"]
+    [hits] = reader[0].query(embed(["yellow bananas"]), 1)
+    assert hits[0]["id"] == "other_0"
+
+
+def test_reader_sees_overwrites_and_deletes(writer_and_reader):
+    writer, reader = writer_and_reader
+
+    # Re-ingest: same id, new text
+    _add(*writer, "doc", ["ripe plums"], start=1)
+    writer[0].delete_document("missing")
+    writer[0].delete(["doc_0"])
+    writer[1].delete(["doc_0"])
+    writer[0].flush()
+    writer[1].flush()
+
+    _refresh(reader)
+    assert [index.count() for index in reader] == [1, 1]
+    assert reader[0].get(["doc_0"]) == {}
+    assert reader[0].get(["doc_1"])["doc_1"]["text"] == "ripe plums"
+    assert reader[1].search("pears", 5) == []
+    assert reader[1].search("apples", 5) == []
+    assert [hit[0] for hit in reader[1].search("plums", 5)] == ["doc_1"]
+
+
+def test_reader_reloads_after_compaction(writer_and_reader, tmp_path):
+    writer, reader = writer_and_reader
+    first_segment = tmp_path / "lexical" / "segment_00000001.npz"
+    assert first_segment.exists()
+
+    # More segments than max_segments: the writer compacts them away
+    for n in range(3):
+        _add(*writer, f"batch{n}", [f"cherry number{n}"])
+    assert not first_segment.exists()
+
+    _refresh(reader)
+    assert reader[1].count() == writer[1].count() == 5
+    assert sorted(hit[0] for hit in reader[1].search("cherry", 10)) == ["batch0_0", "batch1_0", "batch2_0"]
+
+
+def test_reader_refresh_clears_answer_cache(monkeypatch):
+    monkeypatch.setattr(vector_service, "is_index_writer", lambda: False)
+    monkeypatch.setattr(settings, "INDEX_REFRESH_SECONDS", 0.01)
+    answer_cache = vector_service.answer_cache
+
+    def wait_for(condition):
+        deadline = time.time() + 5
+        while not condition():
+            assert time.time() < deadline
+            time.sleep(0.01)
+
+    version = vector_service.collection_version()
+    vector_service.start_index_refresh()
+    try:
+        # First pass records the shared index version
+        wait_for(lambda: vector_service.collection_version() > version)
+
+        answer_cache.put("question", ["doc_0"], {"doc"}, "old answer")
+        time.sleep(0.05)
+        assert answer_cache.get_exact("question", ["doc_0"]) == "old answer"
+
+        # The writer re-ingested something: readers can't tell what, so drop it all
+        bump_index_version()
+        wait_for(lambda: answer_cache.stats()["entries"] == 0)
+    finally:
+        vector_service.stop_index_refresh()
+
+
+def test_reader_refuses_embedded_chroma(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(settings, "CHROMA_HOST", None)
+    with pytest.raises(RuntimeError, match="CHROMA_HOST"):
+        check_reader_backend()
+
+    monkeypatch.setattr(settings, "CHROMA_HOST", "chroma.internal")
+    check_reader_backend()
+
+
+def _faiss_store(path, read_only=False):
+    return FaissVectorStore(
+        str(path), "hnsw", m=16, ef_construction=40, ef_search=16, nlist=4, nprobe=2, read_only=read_only
+    )
+
+
+def _faiss_add(store, texts, start):
+    ids = [f"doc_{i}" for i in range(start, start + len(texts))]
+    store.add(ids, embed(texts), texts, [{"document_id": "doc"} for _ in ids])
+    store.flush()
+
+
+def test_faiss_reader_loads_the_published_index(tmp_path):
+    pytest.importorskip("faiss")
+    writer = _faiss_store(tmp_path)
+    _faiss_add(writer, ["red apples", "green pears"], 0)
+    _faiss_add(writer, ["yellow bananas"], 2)
+
+    # Only the published version and the one before it stay on disk
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".index")) == [
+        "faiss_hnsw.1.index", "faiss_hnsw.2.index"
+    ]
+    _faiss_add(writer, ["ripe plums"], 3)
+    assert not (tmp_path / "faiss_hnsw.1.index").exists()
+
+    reader = _faiss_store(tmp_path, read_only=True)
+    assert reader.index.ntotal == reader._published_rows == 4
+    [hits] = reader.query(embed(["yellow bananas"]), 1)
+    assert hits[0]["id"] == "doc_2"
+
+
+def test_faiss_index_with_rows_the_matrix_lacks_is_rebuilt(tmp_path):
+    pytest.importorskip("faiss")
+    writer = _faiss_store(tmp_path)
+    _faiss_add(writer, ["red apples", "green pears", "yellow bananas"], 0)
+
+    # A crash lost the last row's vector: the published index still has it
+    vectors = tmp_path / "vectors.bin"
+    os.truncate(vectors, vectors.stat().st_size * 2 // 3)
+
+    reopened = _faiss_store(tmp_path)
+    assert reopened.count() == reopened.index.ntotal == 2
+    assert reopened._published_rows is None
+    [hits] = reopened.query(embed(["yellow bananas"]), 3)
+    assert {hit["id"] for hit in hits} == {"doc_0", "doc_1"}
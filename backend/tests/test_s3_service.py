@@ -0,0 +1,67 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from app.core.container import Lazy
+from app.services import s3_service
+from app.services.s3_service import upload_to_s3
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """A moto S3 bucket behind s3_service's client; yields the client."""
+    monkeypatch.setattr(settings, "AWS_REGION", "us-east-1")
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", None)
+    with moto.mock_aws():
+        client = Lazy("s3", s3_service._create_s3_client)
+        monkeypatch.setattr(s3_service, "s3_client", client)
+        client.create_bucket(Bucket=settings.AWS_BUCKET_NAME)
+        yield client
+
+
+@pytest.fixture
+def upload_calls(bucket, monkeypatch):
+    """(bucket, key) of every upload_file call."""
+    calls = []
+    client = bucket.instance()
+    upload_file = client.upload_file
+
+    def recording(filename, bucket_name, key, **kwargs):
+        calls.append((bucket_name, key))
+        return upload_file(filename, bucket_name, key, **kwargs)
+
+    monkeypatch.setattr(client, "upload_file", recording)
+    return calls
+
+
+def _spooled(tmp_path, data):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_missing_object_is_uploaded(bucket, upload_calls, tmp_path):
+    url = upload_to_s3(_spooled(tmp_path, b"%PDF-1.7 one"), "pdfs/one.pdf")
+
+    assert url == f"s3://{settings.AWS_BUCKET_NAME}/pdfs/one.pdf"
+    assert upload_calls == [(settings.AWS_BUCKET_NAME, "pdfs/one.pdf")]
+    assert bucket.get_object(Bucket=settings.AWS_BUCKET_NAME, Key="pdfs/one.pdf")["Body"].read() == b"%PDF-1.7 one"
+
+
+def test_existing_object_is_not_uploaded_again(bucket, upload_calls, tmp_path):
+    bucket.put_object(Bucket=settings.AWS_BUCKET_NAME, Key="pdfs/one.pdf", Body=b"%PDF-1.7 one")
+
+    upload_to_s3(_spooled(tmp_path, b"%PDF-1.7 one"), "pdfs/one.pdf")
+    assert upload_calls == []
+
+
+def test_forbidden_head_counts_as_missing(bucket, upload_calls, tmp_path, monkeypatch):
+    # What S3 returns for a missing key when the caller lacks s3:ListBucket
+    def head_object(**kwargs):
+        raise ClientError({"Error": {"Code": "403", "Message": "Forbidden"}}, "HeadObject")
+
+    monkeypatch.setattr(bucket.instance(), "head_object", head_object)
+    upload_to_s3(_spooled(tmp_path, b"%PDF-1.7 one"), "pdfs/one.pdf")
+    assert upload_calls == [(settings.AWS_BUCKET_NAME, "pdfs/one.pdf")]
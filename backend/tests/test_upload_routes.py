@@ -0,0 +1,34 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes.rag import router
+
+
+@pytest.fixture
+def client():
+    # Just the routes: the real app's lifespan would warm up the services
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    return TestClient(app)
+
+
+def _file(name, data=b"%PDF-1.7 body"):
+    return {"file": (name, data, "application/octet-stream")}
+
+
+def test_upload_rejects_non_pdf_files(client):
+    response = client.post("/api/v1/upload", files=_file("notes.txt", b"plain text"))
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Only PDF files are accepted."}
+
+
+def test_replace_rejects_non_pdf_files(client):
+    response = client.put("/api/v1/documents/doc", files=_file("notes.docx"))
+    assert response.status_code == 400
+
+
+def test_upload_accepts_pdf_extension_in_any_case(client):
+    response = client.post("/api/v1/upload", files=_file("REPORT.PDF"))
+    assert response.status_code == 200
+    assert response.json()["status"] == "queued" and response.json()["duplicate"] is False
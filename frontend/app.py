@@ -164,14 +164,32 @@ if page == "Upload Documents":
             # Prepare file for upload
             files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/pdf")}
             
-            # Call FastAPI upload endpoint
+            # Call FastAPI upload endpoint (returns a job id right away)
             result = call_api("/upload", method="POST", files=files)
             
+            # Poll the ingestion job until the worker finishes
+            job = None
+            if result and result.get("duplicate"):
+                st.info("This file was already uploaded; reusing the existing document.")
+            if result and result.get("job_id"):
+                status_box = st.empty()
+                while True:
+                    job = call_api(f"/jobs/{result.get('job_id')}", method="GET")
+                    if not job or job.get("status") in ("done", "failed"):
+                        break
+                    status_box.info(f"Job status: {job.get('stage')}")
+                    time.sleep(1)
+                status_box.empty()
+            
+            if job and job.get("status") == "failed":
+                st.error(f"Processing failed: {job.get('error')}")
+                result = None
+            
             if result:
                 st.markdown('<div class="success-box">', unsafe_allow_html=True)
                 st.success("Document processed successfully!")
                 st.write(f"**Document ID:** `{result.get('document_id')}`")
-                st.write(f"**Number of chunks:** {result.get('chunks')}")
+                st.write(f"**Number of chunks:** {(job or {}).get('progress', {}).get('chunks', result.get('chunks'))}")
                 st.markdown('</div>', unsafe_allow_html=True)
                 
                 # Store document ID in session state for easy access
@@ -227,7 +245,9 @@ elif page == "Query Assistant":
             else:
                 with st.spinner("Searching documents and generating answer..."):
                     # Call FastAPI query endpoint
-                    data = {"question": query}
+                    data = {"question": query, "top_k": top_k}
+                    if doc_id_input.strip():
+                        data["document_ids"] = [doc_id_input.strip()]
                     result = call_api("/query", method="POST", data=data)
                     
                     if result:
@@ -236,6 +256,14 @@ elif page == "Query Assistant":
                         # Display answer
                         st.markdown("### Answer")
                         st.markdown(f'<div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem;">{answer}</div>', unsafe_allow_html=True)
+
+                        usage = result.get("usage")
+                        if usage:
+                            st.caption(
+                                f"Context: {usage['context_tokens']}/{usage['context_budget']} tokens "
+                                f"from {usage['chunks_retrieved']} chunks ({usage['passages_used']} passages) · "
+                                f"prompt ~{usage['prompt_tokens']} tokens"
+                            )
                         
 
 
@@ -261,8 +289,18 @@ elif page == "View Document Chunks":
     if doc_id:
         if st.button("Load Chunks"):
             with st.spinner("Loading document chunks..."):
-                # Call FastAPI chunks endpoint
-                result = call_api(f"/chunks/{doc_id}", method="GET")
+                # Call FastAPI chunks endpoint, following the pagination cursor
+                result = []
+                params = {"limit": 500}
+                while True:
+                    page_data = call_api(f"/chunks/{doc_id}", method="GET", data=params)
+                    if page_data is None:
+                        result = None
+                        break
+                    result.extend(page_data.get("items", []))
+                    if page_data.get("next_cursor") is None:
+                        break
+                    params["after"] = page_data["next_cursor"]
                 
                 if result is not None:
                     if len(result) > 0: